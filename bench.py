@@ -0,0 +1,290 @@
+"""
+Micro-benchmarks for every command and hot helper, run against a fake
+Discord context that records sends instead of hitting Discord.
+
+Each case runs for every combination of guild count (how many guilds are in
+memory; calls rotate through them) and bundle state (empty or half of every
+bundle checked). Reports ops/sec, p50/p99 latency and the peak memory
+allocated per call (tracemalloc, measured in a separate, shorter pass), plus
+the messages sent per call (each one a Discord API call in production).
+
+    python bench.py                         # 1 / 1k / 50k guilds, empty and half
+    python bench.py --guilds 1000 --states half --filter bundle
+    python bench.py --json after.json --compare before.json
+
+Bundle progress goes to a temporary store, never the real one. Mutating
+cases (check, uncheck, undo) drift the state a little from the scenario's
+starting point; that is fine for timing.
+"""
+import argparse
+import asyncio
+import gc
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+import types
+
+_TMP = tempfile.TemporaryDirectory(prefix='sdv-bench-')
+os.environ['BUNDLES_STATE_PATH'] = os.path.join(_TMP.name, 'bundles_state.json')
+os.environ.pop('BUNDLES_DB_PATH', None)
+
+import main  # noqa: E402  (must see the temporary state path)
+from bundle_progress import GuildProgress  # noqa: E402
+
+
+########################
+# Fake Discord objects
+########################
+
+class FakeChannel:
+    def __init__(self):
+        self.sent: list[tuple[str | None, dict]] = []
+
+    async def send(self, content=None, **kwargs):
+        self.sent.append((content, kwargs))
+
+
+class FakeContext:
+    """The parts of commands.Context the handlers use."""
+
+    def __init__(self, guild_id: int, user_id: int = 1):
+        self.guild = types.SimpleNamespace(id=guild_id)
+        self.author = types.SimpleNamespace(id=user_id)
+        self.channel = FakeChannel()
+        self.command = None
+
+    async def send(self, content=None, **kwargs):
+        await self.channel.send(content, **kwargs)
+
+
+class FakeInteraction:
+    """The parts of discord.Interaction the autocomplete callbacks use."""
+
+    def __init__(self, guild_id: int, **namespace):
+        self.guild_id = guild_id
+        self.namespace = types.SimpleNamespace(**namespace)
+
+
+########################
+# Cases
+########################
+
+def _cases() -> list[tuple[str, object]]:
+    """(name, fn(ctx)); fn may return an awaitable."""
+    m = main
+    spring_crops = m.SEASON_CATEGORIES['Spring']['crops']
+    return [
+        # Static-data commands
+        ('gift', lambda ctx: m.gift.callback(ctx, townsperson='Leah')),
+        ('gift miss', lambda ctx: m.gift.callback(ctx, townsperson='Leha')),
+        ('gift who', lambda ctx: m.gift_who.callback(ctx, item='Diamond')),
+        ('search', lambda ctx: m.search.callback(ctx, terms='ocean rain')),
+        ('char', lambda ctx: m.char.callback(ctx, townsperson='Leah')),
+        ('build', lambda ctx: m.build.callback(ctx, 'Big', 'Barn')),
+        ('upgrade', lambda ctx: m.upgrade.callback(ctx, 'Iridium', 'Pickaxe')),
+        ('fish', lambda ctx: m.fish.callback(ctx, 'Midnight', 'Carp')),
+        ('fish now', lambda ctx: m.fish_now.callback(ctx, 'summer', '9pm', 'rain', 'river')),
+        ('crop', lambda ctx: m.crop.callback(ctx, 'Blueberry')),
+        ('crop best', lambda ctx: m.crop_best.callback(ctx, 'summer', '20')),
+        ('crop best budget', lambda ctx: m.crop_best.callback(ctx, 'summer', '20', '1000')),
+        ('events season', lambda ctx: m.events.callback(ctx, 'winter')),
+        ('events day', lambda ctx: m.events.callback(ctx, 'winter', '3')),
+        ('season', lambda ctx: m.season.callback(ctx, 'spring')),
+        ('junimo help', lambda ctx: m.junimo_help.callback(ctx)),
+        # Guild-state commands
+        ('season bundle', lambda ctx: m.season.callback(ctx, 'spring', 'bundle')),
+        ('fish now bundle', lambda ctx: m.fish_now.callback(ctx, 'summer', '2pm', 'bundle')),
+        ('_digest_embeds', lambda ctx: m._digest_embeds(ctx.guild.id, 31)),
+        ('season crops bundle', lambda ctx: m.season.callback(ctx, 'spring', 'crops', 'bundle')),
+        ('bundle overview', lambda ctx: m.bundle.callback(ctx)),
+        ('bundle room', lambda ctx: m.bundle.callback(ctx, 'Pantry')),
+        ('bundle bundle', lambda ctx: m.bundle.callback(ctx, "Chef's", 'Bundle')),
+        ('bundle item', lambda ctx: m.bundle.callback(ctx, 'Parsnip')),
+        ('bundle miss', lambda ctx: m.bundle.callback(ctx, 'Parsnp')),
+        ('bundle find', lambda ctx: m.bundle_find.callback(ctx, 'Daffodil')),
+        ('bundle incomplete', lambda ctx: m.bundle_incomplete.callback(ctx)),
+        ('bundle plan', lambda ctx: m.bundle_plan.callback(ctx, 'from', 'summer', '5')),
+        ('bundle check', lambda ctx: m.bundle_check.callback(ctx, 'Spring Crops Bundle', item_name='Parsnip')),
+        ('bundle uncheck', lambda ctx: m.bundle_uncheck.callback(ctx, 'Spring Crops Bundle', item_name='Parsnip')),
+        ('bundle history', lambda ctx: m.bundle_history.callback(ctx, 10)),
+        ('bundle undo', lambda ctx: m.bundle_undo.callback(ctx)),
+        # Helpers
+        ('_init_bundles_state_for_guild', lambda ctx: m._init_bundles_state_for_guild(ctx.guild.id)),
+        ('_remaining_items_for_guild', lambda ctx: m._remaining_items_for_guild(ctx.guild.id)),
+        ('_filter_to_remaining', _filter_case(spring_crops)),
+        ('_season_category_lists', lambda ctx: m._season_category_lists('spring')),
+        ('_send_room_status', lambda ctx: m._send_room_status(ctx, 'Pantry')),
+        ('NAMES.resolve', lambda ctx: m.NAMES.resolve('fish', 'midnight carp')),
+        ('NAMES.suggest', lambda ctx: m.NAMES.suggest('fish', 'midnite crap')),
+        ('autocomplete item', lambda ctx: m._autocomplete('room', 'bundle', 'item', ranked=True)(FakeInteraction(ctx.guild.id), 'sp')),
+        ('autocomplete bundle item', lambda ctx: m._bundle_item_autocomplete(FakeInteraction(ctx.guild.id, bundle='Spring Crops Bundle'), '')),
+    ]
+
+def _filter_case(names: list[str]):
+    remaining_by_guild: dict[int, set[str]] = {}
+
+    async def run(ctx):
+        remaining = remaining_by_guild.get(ctx.guild.id)
+        if remaining is None:
+            remaining = remaining_by_guild[ctx.guild.id] = await main._remaining_items_for_guild(ctx.guild.id)
+        return main._filter_to_remaining(names, remaining)
+    return run
+
+
+########################
+# Scenarios
+########################
+
+def seed_guilds(count: int, state: str) -> list[int]:
+    """Replace the in-memory guilds with `count` synthetic ones; returns their ids."""
+    layout = main.BUNDLE_LAYOUT
+    if state == 'half':
+        template = layout.from_checked(
+            layout.items[bit] for slot in layout.bundles for bit in range(slot.start, slot.stop, 2)
+        )
+    else:
+        template = layout.empty()
+    main.STATE_CACHE = type(main.STATE_CACHE)(main.STATE_STORE, layout, history_size=main.BUNDLE_HISTORY_MAX)
+    guild_ids = [10_000 + i for i in range(count)]
+    for gid in guild_ids:
+        main.STATE_CACHE.seed(gid, GuildProgress(template.version, template.mask, bytearray(template.counts)))
+    return guild_ids
+
+
+async def _call(fn, ctx):
+    result = fn(ctx)
+    if asyncio.iscoroutine(result):
+        result = await result
+    return result
+
+
+async def run_case(fn, guild_ids: list[int], iterations: int, alloc_iterations: int) -> dict:
+    ctxs = [FakeContext(gid) for gid in guild_ids[:min(len(guild_ids), 1024)]]
+    # Rotate through every guild, reusing a bounded set of contexts.
+    def ctx_for(i: int) -> FakeContext:
+        ctx = ctxs[i % len(ctxs)]
+        ctx.guild.id = guild_ids[i % len(guild_ids)]
+        ctx.channel.sent.clear()
+        return ctx
+
+    for i in range(min(50, iterations)):   # warm-up
+        await _call(fn, ctx_for(i))
+
+    gc.collect()
+    samples = []
+    sends = 0
+    started = time.perf_counter()
+    for i in range(iterations):
+        ctx = ctx_for(i)
+        t0 = time.perf_counter_ns()
+        await _call(fn, ctx)
+        samples.append(time.perf_counter_ns() - t0)
+        sends += len(ctx.channel.sent)
+    wall = time.perf_counter() - started
+
+    peaks = []
+    tracemalloc.start()
+    for i in range(alloc_iterations):
+        ctx = ctx_for(i)
+        tracemalloc.reset_peak()
+        base = tracemalloc.get_traced_memory()[0]
+        await _call(fn, ctx)
+        peaks.append(tracemalloc.get_traced_memory()[1] - base)
+    tracemalloc.stop()
+
+    samples.sort()
+    return {
+        'iterations': iterations,
+        'ops_per_sec': round(iterations / sum(samples) * 1e9, 1),
+        'p50_us': round(samples[len(samples) // 2] / 1000, 2),
+        'p99_us': round(samples[min(len(samples) - 1, int(len(samples) * 0.99))] / 1000, 2),
+        'mean_us': round(statistics.fmean(samples) / 1000, 2),
+        'wall_s': round(wall, 3),
+        'alloc_peak_bytes': int(statistics.median(peaks)) if peaks else None,
+        'sends_per_call': round(sends / iterations, 2),
+    }
+
+
+########################
+# Reporting
+########################
+
+def _git_revision() -> str | None:
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=main.DATA_DIR,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def _key(result: dict) -> tuple:
+    return result['case'], result['guilds'], result['state']
+
+def print_table(results: list[dict], baseline: dict[tuple, dict] | None) -> None:
+    header = f"{'case':<32} {'guilds':>7} {'state':<6} {'ops/s':>11} {'p50 us':>9} {'p99 us':>9} {'alloc B':>9} {'sends':>6}"
+    if baseline is not None:
+        header += f" {'p50 vs base':>12}"
+    print(header)
+    for r in results:
+        line = (f"{r['case']:<32} {r['guilds']:>7} {r['state']:<6} {r['ops_per_sec']:>11.0f} "
+                f"{r['p50_us']:>9.1f} {r['p99_us']:>9.1f} {r['alloc_peak_bytes'] or 0:>9} {r.get('sends_per_call', 0):>6.2f}")
+        if baseline is not None:
+            old = baseline.get(_key(r))
+            line += f" {r['p50_us'] / old['p50_us']:>11.2f}x" if old and old['p50_us'] else f" {'—':>12}"
+        print(line)
+
+
+async def run_all(args) -> list[dict]:
+    cases = [(name, fn) for name, fn in _cases() if not args.filter or args.filter in name]
+    results = []
+    for count in args.guilds:
+        for state in args.states:
+            guild_ids = seed_guilds(count, state)
+            for name, fn in cases:
+                stats = await run_case(fn, guild_ids, args.iterations, args.alloc_iterations)
+                results.append({'case': name, 'guilds': count, 'state': state, **stats})
+                print(f"  {name} [{count} guilds, {state}]: {stats['p50_us']} us p50", file=sys.stderr)
+    return results
+
+
+def main_cli(argv: list[str]) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--guilds', default='1,1000,50000', type=lambda s: [int(x) for x in s.split(',')])
+    parser.add_argument('--states', default='empty,half', type=lambda s: s.split(','))
+    parser.add_argument('--iterations', type=int, default=2000)
+    parser.add_argument('--alloc-iterations', type=int, default=100)
+    parser.add_argument('--filter', help="only cases whose name contains this")
+    parser.add_argument('--json', help="write results to this file")
+    parser.add_argument('--compare', help="baseline JSON from an earlier run")
+    args = parser.parse_args(argv)
+
+    results = asyncio.run(run_all(args))
+    baseline = None
+    if args.compare:
+        with open(args.compare, 'r', encoding='utf-8') as f:
+            baseline = {_key(r): r for r in json.load(f)['results']}
+    print_table(results, baseline)
+
+    if args.json:
+        report = {
+            'meta': {
+                'revision': _git_revision(),
+                'python': platform.python_version(),
+                'platform': platform.platform(),
+                'timestamp': int(time.time()),
+                'iterations': args.iterations,
+            },
+            'results': results,
+        }
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main_cli(sys.argv[1:]))
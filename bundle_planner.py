@@ -0,0 +1,190 @@
+"""
+Bundle completion plans for `!bundle plan`: when to get each item a guild
+still needs, and when each room can be finished.
+
+Every bundle item gets its sources from the game data: crops (plant, then
+harvest `growth` days later, all within the crop's seasons), fish (catch in
+season; rain-only fish are marked), foraging (in season, within a day window
+like "Salmonberry (Spring 15-18)") and fruit trees (a sapling planted now
+fruits in its season once grown). Anything else (animal products, artisan
+goods, minerals, gold) can be had any time.
+
+For each source the planner keeps, for every day over three years, the next day
+the action is possible, so the earliest day for an item from any start is a
+table lookup. A plan then takes, for each incomplete bundle, the unchecked
+items it still needs that are ready soonest; a bundle is done when its last
+pick is, a room when its last bundle is. Picks that can't be ready before
+the end of the year are flagged as next year's.
+"""
+import re
+
+from bundle_progress import BundleLayout
+from farm_calendar import DAYS_PER_SEASON, DAYS_PER_YEAR
+from records import SEASONS, SEASON_BITS, WEATHER_RAIN, Crop, Fish, Season, Tree
+
+CROP, FISH, FORAGE, TREE, ANY_TIME = 'crop', 'fish', 'forage', 'tree', 'any'
+
+_WINDOW = re.compile(r'\((\w+) (\d+)-(\d+)\)')
+# next_ok tables cover this many days, enough for any start plus a year.
+_SPAN = 3 * DAYS_PER_YEAR
+
+
+def _season_bit(day: int) -> int:
+    return SEASON_BITS[SEASONS[day % DAYS_PER_YEAR // DAYS_PER_SEASON]]
+
+
+class Source:
+    """
+    One way to get an item, possible on the days of the year marked ok. A
+    crop is planted on an ok day and ready `lead` days later; fish and forage
+    are in hand the same day; a fruit tree's sapling goes in at the start and
+    fruits on the first ok day once `delay` days have passed.
+    """
+    __slots__ = ('kind', 'name', 'lead', 'delay', 'rain_only', 'next_ok')
+
+    def __init__(self, kind: str, name: str, ok: list[bool], lead: int = 0, delay: int = 0, rain_only: bool = False):
+        self.kind = kind
+        self.name = name
+        self.lead = lead
+        self.delay = delay
+        self.rain_only = rain_only
+        # next_ok[d]: first day >= d the action is possible, or None.
+        next_ok: list[int | None] = [None] * (_SPAN + 1)
+        for day in range(_SPAN - 1, -1, -1):
+            next_ok[day] = day if ok[day % DAYS_PER_YEAR] else next_ok[day + 1]
+        self.next_ok = tuple(next_ok)
+
+    def earliest(self, start: int) -> tuple[int, int] | None:
+        """(action day, ready day) from `start` (a day of the year), or None if never."""
+        first = self.next_ok[start + self.delay]
+        if first is None:
+            return None
+        return (start, first) if self.delay else (first, first + self.lead)
+
+
+class PlanStep:
+    """One pick: do `kind` (with `source`: the crop, fish or tree) on `day`, have the item on `ready`."""
+    __slots__ = ('day', 'ready', 'item', 'room', 'bundle', 'kind', 'source', 'rain_only')
+
+    def __init__(self, day: int, ready: int, item: str, room: str, bundle: str, kind: str, source: str, rain_only: bool):
+        self.day = day
+        self.ready = ready
+        self.item = item
+        self.room = room
+        self.bundle = bundle
+        self.kind = kind
+        self.source = source
+        self.rain_only = rain_only
+
+
+class BundlePlan:
+    """
+    steps: seasonal picks by action day; any_time: picks with no season;
+    rooms: (room, day its last pick is ready, or None if it can't be finished),
+    for rooms not yet complete; blocked: items no source can ever provide.
+    Days count from Spring 1 of the start's year, so >= DAYS_PER_YEAR is next year.
+    """
+    __slots__ = ('start', 'steps', 'any_time', 'rooms', 'blocked')
+
+    def __init__(self, start: int, steps: list[PlanStep], any_time: list[PlanStep],
+                 rooms: list[tuple[str, int | None]], blocked: list[PlanStep]):
+        self.start = start
+        self.steps = steps
+        self.any_time = any_time
+        self.rooms = rooms
+        self.blocked = blocked
+
+    @property
+    def next_year(self) -> list[PlanStep]:
+        return [step for step in self.steps if step.ready >= DAYS_PER_YEAR]
+
+
+class BundlePlanner:
+    """Sources for every bundle item in the layout, and plan() over a guild's progress."""
+
+    def __init__(self, layout: BundleLayout, crops: dict[str, Crop], fish: dict[str, Fish],
+                 trees: dict[str, Tree], seasons: dict[str, Season], base_name):
+        self.layout = layout
+        by_base: dict[str, list[Source]] = {}
+        for crop in crops.values():
+            if crop.growth_days:
+                by_base.setdefault(crop.name.lower(), []).append(self._crop_source(crop))
+        for record in fish.values():
+            ok = [bool(record.seasons & _season_bit(day)) for day in range(DAYS_PER_YEAR)]
+            by_base.setdefault(record.name.lower(), []).append(
+                Source(FISH, record.name, ok, rain_only=record.weather == WEATHER_RAIN))
+        for tree in trees.values():
+            ok = [bool(tree.season & _season_bit(day)) for day in range(DAYS_PER_YEAR)]
+            by_base.setdefault(tree.name.lower(), []).append(Source(TREE, tree.name, ok, delay=tree.growth_days or 0))
+        forage_days: dict[str, list[bool]] = {}     # display name -> ok days
+        for season_name, season in seasons.items():
+            first = SEASONS.index(season_name) * DAYS_PER_SEASON
+            for entry in season.foraging:
+                window = _WINDOW.search(entry)
+                lo, hi = (int(window.group(2)), int(window.group(3))) if window else (1, DAYS_PER_SEASON)
+                ok = forage_days.setdefault(entry.split('(')[0].strip(), [False] * DAYS_PER_YEAR)
+                for day in range(lo, hi + 1):
+                    ok[first + day - 1] = True
+        for name, ok in forage_days.items():
+            by_base.setdefault(name.lower(), []).append(Source(FORAGE, name, ok))
+
+        # bit -> sources for that bundle item; empty means any time.
+        self.sources: list[tuple[Source, ...]] = [
+            tuple(by_base.get(base_name(item), ())) for _, _, item in layout.items
+        ]
+
+    @staticmethod
+    def _crop_source(crop: Crop) -> Source:
+        growth = crop.growth_days
+        ok = [
+            all(crop.seasons & _season_bit(day + i) for i in range(growth + 1))
+            for day in range(DAYS_PER_YEAR)
+        ]
+        return Source(CROP, crop.name, ok, lead=growth)
+
+    def _pick(self, bit: int, start: int) -> tuple[int, int, Source | None] | None:
+        """(action day, ready day, source) for the soonest way to get an item; None if there is none."""
+        sources = self.sources[bit]
+        if not sources:
+            return start, start, None
+        best = None
+        for source in sources:
+            when = source.earliest(start)
+            if when and (best is None or (when[1], when[0]) < (best[1], best[0])):
+                best = (*when, source)
+        return best
+
+    def plan(self, mask: int, start: int) -> BundlePlan:
+        """Plan from day `start` of the year (0 = Spring 1) for a guild whose checked bits are `mask`."""
+        layout = self.layout
+        steps, any_time, blocked = [], [], []
+        room_done: dict[str, int | None] = {}
+        never = DAYS_PER_YEAR * 10
+        for slot in layout.bundles:
+            needed = slot.amount - (mask & slot.mask).bit_count()
+            if needed <= 0:
+                continue
+            candidates = []
+            for bit in range(slot.start, slot.stop):
+                if mask >> bit & 1:
+                    continue
+                pick = self._pick(bit, start)
+                ready = never if pick is None else pick[1]
+                candidates.append((ready, bit, pick))
+            candidates.sort(key=lambda c: (c[0], c[1]))
+            chosen = candidates[:needed]
+            for ready, bit, pick in chosen:
+                item = layout.items[bit][2]
+                if pick is None:
+                    blocked.append(PlanStep(start, never, item, slot.room, slot.name, ANY_TIME, item, False))
+                    continue
+                day, ready, source = pick
+                if source is None:
+                    any_time.append(PlanStep(day, ready, item, slot.room, slot.name, ANY_TIME, item, False))
+                else:
+                    steps.append(PlanStep(day, ready, item, slot.room, slot.name, source.kind, source.name, source.rain_only))
+            done = max(ready for ready, _, _ in chosen)
+            previous = room_done.get(slot.room, start)
+            room_done[slot.room] = None if done == never or previous is None else max(previous, done)
+        steps.sort(key=lambda s: (s.day, s.ready, s.item))
+        return BundlePlan(start, steps, any_time, list(room_done.items()), blocked)
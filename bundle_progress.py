@@ -0,0 +1,134 @@
+"""
+Compact per-guild bundle progress.
+
+BundleLayout numbers every Community Center item once (room order, then
+bundle order, then item order from communitycenter.json). A guild's progress
+is then just an int bitmask over those numbers plus a bytearray of checked
+counts per bundle, so completion queries never walk the item dicts.
+
+The layout's version is a hash of that numbering. A GuildProgress built for
+a different version (e.g. after the bundle data changed) is remapped by
+item name; checking the version is the whole shape check.
+"""
+import zlib
+
+
+class BundleSlot:
+    """One bundle's place in the layout: its bits are range(start, stop)."""
+    __slots__ = ('index', 'room', 'name', 'amount', 'start', 'stop', 'mask')
+
+    def __init__(self, index: int, room: str, name: str, amount: int, start: int, stop: int):
+        self.index = index
+        self.room = room
+        self.name = name
+        self.amount = amount
+        self.start = start
+        self.stop = stop
+        self.mask = ((1 << (stop - start)) - 1) << start
+
+
+class GuildProgress:
+    """Checked items as a bitmask, plus checked-item counts per bundle."""
+    __slots__ = ('version', 'mask', 'counts')
+
+    def __init__(self, version: int, mask: int, counts: bytearray):
+        self.version = version
+        self.mask = mask
+        self.counts = counts
+
+    def is_checked(self, bit: int) -> bool:
+        return (self.mask >> bit) & 1 == 1
+
+    def completed(self, slot: BundleSlot) -> int:
+        return self.counts[slot.index]
+
+    def is_complete(self, slot: BundleSlot) -> bool:
+        return self.counts[slot.index] >= slot.amount
+
+    def set(self, slot: BundleSlot, bit: int, checked: bool) -> bool:
+        """Set one item and keep the bundle count in step. Returns the previous value."""
+        prev = (self.mask >> bit) & 1 == 1
+        if checked and not prev:
+            self.mask |= 1 << bit
+            self.counts[slot.index] += 1
+        elif prev and not checked:
+            self.mask &= ~(1 << bit)
+            self.counts[slot.index] -= 1
+        return prev
+
+
+class BundleLayout:
+    """Canonical item numbering built once from communitycenter.json."""
+
+    def __init__(self, community_data: dict):
+        self.items: list[tuple[str, str, str]] = []           # bit -> (room, bundle, item)
+        self.item_slots: list[BundleSlot] = []                # bit -> owning bundle
+        self.bundles: list[BundleSlot] = []
+        self.rooms: dict[str, list[BundleSlot]] = {}
+        self.bundle_by_name: dict[str, BundleSlot] = {}       # exact bundle name
+        self._bits: dict[tuple[str, str], int] = {}           # (bundle, item) exact names
+        for room_name, room in community_data.items():
+            self.rooms[room_name] = []
+            for bundle_name, bundle in room.get('Bundles', {}).items():
+                start = len(self.items)
+                for item_name in bundle.get('items', {}).keys():
+                    self._bits[(bundle_name, item_name)] = len(self.items)
+                    self.items.append((room_name, bundle_name, item_name))
+                slot = BundleSlot(len(self.bundles), room_name, bundle_name, bundle.get('amount', 0), start, len(self.items))
+                self.item_slots.extend([slot] * (slot.stop - slot.start))
+                self.bundles.append(slot)
+                self.rooms[room_name].append(slot)
+                self.bundle_by_name[bundle_name] = slot
+        self.version = zlib.crc32('\x1f'.join('\x1e'.join(entry) for entry in self.items).encode('utf-8'))
+
+    def bit(self, bundle_name: str, item_name: str) -> int | None:
+        """Bit for an exact (bundle, item) pair, or None if the item isn't in that bundle."""
+        return self._bits.get((bundle_name, item_name))
+
+    def empty(self) -> GuildProgress:
+        return GuildProgress(self.version, 0, bytearray(len(self.bundles)))
+
+    def from_checked(self, checked) -> GuildProgress:
+        """Build progress from (room, bundle, item) names; unknown items are ignored."""
+        progress = self.empty()
+        for _, bundle_name, item_name in checked:
+            bit = self._bits.get((bundle_name, item_name))
+            if bit is not None:
+                progress.set(self.item_slots[bit], bit, True)
+        return progress
+
+    def from_stored(self, stored: dict) -> GuildProgress:
+        """Build progress from a store's {room: {bundle: {'items': {item: bool}}}} dict."""
+        return self.from_checked(
+            (room_name, bundle_name, item_name)
+            for room_name, bundles in stored.items()
+            for bundle_name, bundle_state in bundles.items()
+            for item_name, checked in bundle_state.get('items', {}).items()
+            if checked
+        )
+
+    def checked_items(self, progress: GuildProgress, layout: 'BundleLayout | None' = None) -> list[tuple[str, str, str]]:
+        """(room, bundle, item) for every checked bit, read with `layout` (default: self)."""
+        layout = layout or self
+        mask, out = progress.mask, []
+        while mask:
+            low = mask & -mask
+            out.append(layout.items[low.bit_length() - 1])
+            mask ^= low
+        return out
+
+    def migrate(self, progress: GuildProgress, old_layout: 'BundleLayout') -> GuildProgress:
+        """Remap progress recorded against another layout version by item name."""
+        return self.from_checked(self.checked_items(progress, old_layout))
+
+    def needed_mask(self, progress: GuildProgress) -> int:
+        """Bits still unchecked in bundles that aren't complete yet."""
+        mask = 0
+        for slot in self.bundles:
+            if not progress.is_complete(slot):
+                mask |= slot.mask
+        return mask & ~progress.mask
+
+    def unchecked_in(self, progress: GuildProgress, slot: BundleSlot) -> list[str]:
+        missing = ~progress.mask & slot.mask
+        return [self.items[bit][2] for bit in range(slot.start, slot.stop) if (missing >> bit) & 1]
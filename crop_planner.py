@@ -0,0 +1,95 @@
+"""
+Crop rankings for `!crop best`: gold per day and total profit over the days
+left in a season.
+
+Every answer is precomputed when the game data is compiled: for each season
+and each days-left value (1-28) the planner keeps the crops already sorted by
+gold/day, so a query is one table lookup plus a slice (or, with a budget, one
+pass that skips the rows the budget can't cover).
+
+The tables are built column-wise: each crop field is one list indexed like
+`names`, and harvest counts and profits are computed for all crops of a
+season at once per days-left value.
+
+Model, with D days left counting today (planting day):
+- single harvest: replant on harvest day, so (D - 1) // growth harvests,
+  each paying sell - seed;
+- multi harvest: one seed, first harvest after `growth` days, then one every
+  `regrow` days: 1 + (D - 1 - growth) // regrow harvests, each paying
+  sell x yield, minus the one seed.
+This matches the "Max Harvests" column in crops.json for a full 28 days.
+Crops die at the end of the season, so nothing carries over. Only outdoor
+crops whose seeds sell for gold are ranked (not Ancient Fruit, Pineapple,
+Carrot, Cactus Fruit, ...), and only while they still turn a profit.
+"""
+from records import SEASONS, SEASON_BITS, Crop
+
+SEASON_DAYS = 28
+
+
+class CropPlan:
+    """One row of a ranking: how a crop does when planted with `days_left` to go."""
+    __slots__ = ('name', 'harvests', 'profit', 'gold_per_day', 'seed_price')
+
+    def __init__(self, name: str, harvests: int, profit: int, gold_per_day: float, seed_price: int):
+        self.name = name
+        self.harvests = harvests
+        self.profit = profit
+        self.gold_per_day = gold_per_day
+        self.seed_price = seed_price
+
+
+def _harvests(days_left: int, growth: int, regrow: int) -> int:
+    days = days_left - 1
+    if regrow:
+        return 1 + (days - growth) // regrow if days >= growth else 0
+    return days // growth
+
+
+class CropPlanner:
+    """tables[season][days_left] -> profitable CropPlans, best gold/day first."""
+
+    def __init__(self, crops: dict[str, Crop]):
+        ranked = [
+            c for c in crops.values()
+            if c.seed_price and c.sell_price is not None and c.growth_days
+            and 'greenhouse' not in c.season_text.lower()
+        ]
+        # One list per field, all indexed alike.
+        self.names = [c.name for c in ranked]
+        self.seasons = [c.seasons for c in ranked]
+        self.growth = [c.growth_days for c in ranked]
+        self.regrow = [c.regrow_days or 0 for c in ranked]
+        self.seed = [c.seed_price for c in ranked]
+        self.harvest_value = [c.sell_price * c.harvest_yield for c in ranked]
+
+        self.tables: dict[str, list[tuple[CropPlan, ...]]] = {}
+        for season in SEASONS:
+            bit = SEASON_BITS[season]
+            idx = [i for i, mask in enumerate(self.seasons) if mask & bit]
+            self.tables[season] = [()] + [self._rank(idx, days) for days in range(1, SEASON_DAYS + 1)]
+
+    def _rank(self, idx: list[int], days_left: int) -> tuple[CropPlan, ...]:
+        growth, regrow, seed, value = self.growth, self.regrow, self.seed, self.harvest_value
+        harvests = [_harvests(days_left, growth[i], regrow[i]) for i in idx]
+        profit = [n * value[i] - seed[i] if regrow[i] else n * (value[i] - seed[i])
+                  for i, n in zip(idx, harvests)]
+        rows = [
+            CropPlan(self.names[i], n, p, p / days_left, seed[i])
+            for i, n, p in zip(idx, harvests, profit) if n and p > 0
+        ]
+        rows.sort(key=lambda r: (-r.gold_per_day, -r.profit, r.name))
+        return tuple(rows)
+
+    def best(self, season: str, days_left: int, budget: int | None = None, limit: int = 10) -> list[CropPlan]:
+        """Top `limit` crops for the season; with a budget, only crops it buys at least one seed of."""
+        table = self.tables[season][days_left]
+        if budget is None:
+            return list(table[:limit])
+        out = []
+        for row in table:
+            if row.seed_price <= budget:
+                out.append(row)
+                if len(out) == limit:
+                    break
+        return out
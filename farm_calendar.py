@@ -0,0 +1,247 @@
+"""
+Per-guild farm calendars and the daily digest for `!calendar`.
+
+A guild sets its farm's date (`!calendar set Summer 12`) and, optionally, a
+channel and UTC time for a daily digest: the day's events, villager
+birthdays with their loved gifts, crops worth planting with the days left,
+and fish the guild still needs for bundles.
+
+Dates are never rewritten as they pass. A FarmCalendar keeps the date that
+was set and when; with a digest, each digest after that is the next farm
+day, so the date at any moment follows from the clock alone and nothing is
+written per day. The first digest after setting the date shows that date.
+
+Every guild's next digest is one entry in a single heap (DigestScheduler),
+served by one task that sleeps until the earliest entry: thousands of guilds
+are thousands of heap entries, not thousands of timers. The static part of
+each digest is precomputed per day of the year (digest_days()).
+"""
+import asyncio
+import heapq
+import re
+import time
+from typing import Awaitable, Callable
+
+from crop_planner import CropPlan, CropPlanner
+from fish_index import FishIndex
+from records import SEASONS
+
+DAYS_PER_SEASON = 28
+DAYS_PER_YEAR = DAYS_PER_SEASON * len(SEASONS)
+DAY_SECONDS = 24 * 60 * 60
+# Crops listed in a digest's "plant now" section.
+DIGEST_CROPS = 5
+
+_TIME_OF_DAY = re.compile(r'(\d{1,2})(?::(\d{2}))?\s*(am|pm)?$', re.I)
+
+
+########################
+# Dates
+########################
+
+def day_number(season: str, day: int, year: int = 1) -> int:
+    """Days since Spring 1, Year 1: ("Summer", 1, 1) -> 28."""
+    return (year - 1) * DAYS_PER_YEAR + SEASONS.index(season) * DAYS_PER_SEASON + day - 1
+
+def date_parts(number: int) -> tuple[str, int, int]:
+    """day_number() reversed: 28 -> ("Summer", 1, 1)."""
+    year, in_year = divmod(number, DAYS_PER_YEAR)
+    season, day = divmod(in_year, DAYS_PER_SEASON)
+    return SEASONS[season], day + 1, year + 1
+
+def format_date(number: int) -> str:
+    season, day, year = date_parts(number)
+    return f"{season} {day}, Year {year}"
+
+def parse_time_of_day(text: str) -> int | None:
+    """"9:30", "21:00", "9pm" -> minutes after midnight; None if not a time."""
+    m = _TIME_OF_DAY.match(text.strip())
+    if not m:
+        return None
+    hour, minute, half = int(m.group(1)), int(m.group(2) or 0), (m.group(3) or '').lower()
+    if half:
+        if not 1 <= hour <= 12:
+            return None
+        hour = hour % 12 + (12 if half == 'pm' else 0)
+    if hour > 23 or minute > 59:
+        return None
+    return hour * 60 + minute
+
+def format_time_of_day(minutes: int) -> str:
+    return f"{minutes // 60:02d}:{minutes % 60:02d} UTC"
+
+
+class FarmCalendar:
+    """A guild's farm date as of `set_at` (unix time), plus its digest channel and time (minutes after midnight UTC)."""
+    __slots__ = ('day', 'set_at', 'channel_id', 'digest_minute')
+
+    def __init__(self, day: int, set_at: float, channel_id: int | None = None, digest_minute: int | None = None):
+        self.day = day
+        self.set_at = set_at
+        self.channel_id = channel_id
+        self.digest_minute = digest_minute
+
+    @classmethod
+    def from_dict(cls, d: dict) -> 'FarmCalendar':
+        return cls(d['day'], d['set_at'], d.get('channel_id'), d.get('digest_minute'))
+
+    def to_dict(self) -> dict:
+        return {'day': self.day, 'set_at': self.set_at, 'channel_id': self.channel_id, 'digest_minute': self.digest_minute}
+
+    @property
+    def has_digest(self) -> bool:
+        return self.channel_id is not None and self.digest_minute is not None
+
+    def next_digest(self, after: float) -> float | None:
+        """The first digest time strictly after `after`, or None without a digest."""
+        if not self.has_digest:
+            return None
+        due = after - after % DAY_SECONDS + self.digest_minute * 60
+        return due if due > after else due + DAY_SECONDS
+
+    def digests_since_set(self, now: float) -> int:
+        if not self.has_digest:
+            return 0
+        first = self.next_digest(self.set_at)
+        return 0 if now < first else 1 + int((now - first) // DAY_SECONDS)
+
+    def today(self, now: float | None = None) -> int:
+        """The farm's day_number() at `now`: the set date, moved on one day per digest after the first."""
+        return self.day + max(0, self.digests_since_set(time.time() if now is None else now) - 1)
+
+    def moved(self, day: int, now: float | None = None) -> 'FarmCalendar':
+        """The same settings with the date set to `day` as of `now`."""
+        return FarmCalendar(day, time.time() if now is None else now, self.channel_id, self.digest_minute)
+
+    def with_digest(self, channel_id: int | None, digest_minute: int | None, now: float | None = None) -> 'FarmCalendar':
+        """New digest settings (None, None: off) from `now`. If a digest already showed today, the next one shows tomorrow."""
+        now = time.time() if now is None else now
+        day = self.today(now)
+        if channel_id is not None and self.digests_since_set(now):
+            day += 1
+        return FarmCalendar(day, now, channel_id, digest_minute)
+
+
+########################
+# Per-day digest tables
+########################
+
+class DigestDay:
+    """Everything in a day's digest that doesn't depend on the guild."""
+    __slots__ = ('season', 'day', 'events', 'birthdays', 'crops', 'bundle_fish')
+
+    def __init__(self, season: str, day: int, events: tuple[str, ...], birthdays: tuple[tuple[str, tuple[str, ...]], ...],
+                 crops: tuple[CropPlan, ...], bundle_fish: int):
+        self.season = season
+        self.day = day
+        self.events = events                # events.json entries for the day
+        self.birthdays = birthdays          # (villager, loved gifts)
+        self.crops = crops                  # best gold/day planted today (see crop_planner.py)
+        self.bundle_fish = bundle_fish      # FishIndex bits: fish in season that fill some bundle item
+
+
+def digest_days(events: dict, townspeople: dict, crop_plans: CropPlanner, fish_index: FishIndex) -> tuple[DigestDay, ...]:
+    """One DigestDay per day of the year, indexed by day_number() % DAYS_PER_YEAR."""
+    birthdays: dict[str, list[tuple[str, tuple[str, ...]]]] = {}
+    for name, villager in townspeople.items():
+        birthday = villager.get('birthday', '')
+        if birthday:
+            birthdays.setdefault(birthday, []).append((name, tuple(villager.get('loves', []))))
+    bundle_fish = 0
+    for i in fish_index.indexes(fish_index.all):
+        if fish_index.bundle_masks[i]:
+            bundle_fish |= 1 << i
+
+    days = []
+    for season in SEASONS:
+        season_events = events.get(season, {})
+        for day in range(1, DAYS_PER_SEASON + 1):
+            days.append(DigestDay(
+                season, day,
+                tuple(season_events.get(str(day), ())),
+                tuple(birthdays.get(f"{season} {day}", ())),
+                tuple(crop_plans.best(season, DAYS_PER_SEASON - day + 1, limit=DIGEST_CROPS)),
+                fish_index.by_season[season] & bundle_fish,
+            ))
+    return tuple(days)
+
+
+########################
+# Scheduler
+########################
+
+class DigestScheduler:
+    """
+    (due time, guild id) for every guild with a digest, in one heap served by
+    run(). Rescheduling or cancelling leaves the old entry in the heap; it is
+    recognised as stale (it no longer matches `_due`) and dropped when it
+    reaches the top.
+
+    fire(guild_id, due) is called for each due entry, up to `concurrency` at a
+    time; it should schedule the guild's next digest itself.
+    """
+
+    def __init__(self, fire: Callable[[int, float], Awaitable[None]], concurrency: int = 16):
+        self.fire = fire
+        self.concurrency = concurrency
+        self._heap: list[tuple[float, int]] = []
+        self._due: dict[int, float] = {}
+        self._wake = asyncio.Event()
+        self.fired = 0
+        self.failed = 0
+
+    def schedule(self, guild_id: int, due: float | None) -> None:
+        """Set (or with None, cancel) a guild's next digest time."""
+        if due is None:
+            self._due.pop(guild_id, None)
+            return
+        self._due[guild_id] = due
+        heapq.heappush(self._heap, (due, guild_id))
+        if self._heap[0] == (due, guild_id):
+            self._wake.set()
+
+    def __len__(self) -> int:
+        return len(self._due)
+
+    def __contains__(self, guild_id: int) -> bool:
+        return guild_id in self._due
+
+    def next_due(self) -> float | None:
+        self._drop_stale()
+        return self._heap[0][0] if self._heap else None
+
+    def _drop_stale(self) -> None:
+        heap, due = self._heap, self._due
+        while heap and due.get(heap[0][1]) != heap[0][0]:
+            heapq.heappop(heap)
+
+    def _pop_due(self, now: float) -> list[tuple[float, int]]:
+        out = []
+        while True:
+            self._drop_stale()
+            if not self._heap or self._heap[0][0] > now:
+                return out
+            due, guild_id = heapq.heappop(self._heap)
+            del self._due[guild_id]
+            out.append((due, guild_id))
+
+    async def run(self) -> None:
+        while True:
+            ready = self._pop_due(time.time())
+            for start in range(0, len(ready), self.concurrency):
+                batch = ready[start:start + self.concurrency]
+                results = await asyncio.gather(*(self.fire(guild_id, due) for due, guild_id in batch), return_exceptions=True)
+                for (_, guild_id), result in zip(batch, results):
+                    self.fired += 1
+                    if isinstance(result, Exception):
+                        self.failed += 1
+                        print(f"Digest for guild {guild_id} failed:", repr(result))
+            if ready:
+                continue
+            self._wake.clear()
+            next_due = self.next_due()
+            timeout = None if next_due is None else max(0.0, next_due - time.time())
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
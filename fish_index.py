@@ -0,0 +1,128 @@
+"""
+"What can I catch right now?" for `!fish now`.
+
+fish.json keeps time, weather, season and location as display text; the
+Fish records (records.py) parse them once. FishIndex turns those into bitsets
+over the fish themselves (bit i is fish i): one per season, per hour of the
+fishing day, per weather and per location. A query is then the AND of at
+most four ints, and the answer is the set bits of the result.
+
+Hours follow the game clock: the fishing day runs 6am (6) to 2am (26), so
+12am-2am are hours 24 and 25 of the same day. A window that ends before it
+starts wraps past 2am back to 6am.
+"""
+import re
+
+from records import SEASON_BITS, DAY_START, DAY_END, WEATHER_SUN, WEATHER_RAIN, WEATHER_WIND, Fish
+
+WEATHER_WORDS = {
+    'sun': WEATHER_SUN, 'sunny': WEATHER_SUN,
+    'rain': WEATHER_RAIN, 'rainy': WEATHER_RAIN, 'storm': WEATHER_RAIN, 'stormy': WEATHER_RAIN,
+    'wind': WEATHER_WIND, 'windy': WEATHER_WIND,
+}
+
+_CLOCK = re.compile(r'(\d{1,2})(?::(\d{2}))?\s*(am|pm)?$', re.I)
+
+
+def hour_mask(windows: tuple[tuple[int, int], ...]) -> int:
+    """Bit (hour - 6) for every hour inside the windows; ((18, 26),) is 6pm through 1am."""
+    mask = 0
+    for start, end in windows:
+        hours = range(start, end) if start < end else [*range(start, DAY_END), *range(DAY_START, end)]
+        for hour in hours:
+            if DAY_START <= hour < DAY_END:
+                mask |= 1 << (hour - DAY_START)
+    return mask
+
+def parse_clock(text: str) -> int | None:
+    """"2pm", "2:30pm", "14", "14:30", "noon", "midnight" -> game hour (6-25); None if not a fishing hour."""
+    text = text.strip().lower()
+    if text in ('noon', 'midday'):
+        return 12
+    if text == 'midnight':
+        return 24
+    m = _CLOCK.match(text)
+    if not m:
+        return None
+    hour, half = int(m.group(1)), (m.group(3) or '').lower()
+    if half:
+        if not 1 <= hour <= 12:
+            return None
+        hour = hour % 12 + (12 if half == 'pm' else 0)
+    elif hour > 23:
+        return None
+    if hour < DAY_START:
+        hour += 24
+    return hour if hour < DAY_END else None
+
+def _location_key(text: str) -> str:
+    return re.sub(r'[^a-z0-9]', '', text.lower())
+
+
+class FishIndex:
+    """Bitsets over the fish in fish.json, keyed by season, hour, weather and location."""
+
+    def __init__(self, fish: dict[str, Fish], needed_masks: dict[str, int]):
+        self.names = list(fish)
+        self.all = (1 << len(self.names)) - 1
+        self.by_season: dict[str, int] = {season: 0 for season in SEASON_BITS}
+        self.by_hour = [0] * (DAY_END - DAY_START)
+        self.by_weather: dict[int, int] = {WEATHER_SUN: 0, WEATHER_RAIN: 0, WEATHER_WIND: 0}
+        self.by_location: dict[str, int] = {}
+        # Per fish: the bundle bits it can fill (see GameData.needed_masks).
+        self.bundle_masks = [needed_masks.get(name, 0) for name in self.names]
+
+        for i, record in enumerate(fish.values()):
+            bit = 1 << i
+            for season, season_bit in SEASON_BITS.items():
+                if record.seasons & season_bit:
+                    self.by_season[season] |= bit
+            hours = hour_mask(record.hours)
+            for h in range(len(self.by_hour)):
+                if hours >> h & 1:
+                    self.by_hour[h] |= bit
+            for weather in self.by_weather:
+                if record.weather & weather:
+                    self.by_weather[weather] |= bit
+            for location in record.locations:
+                self.by_location[location] = self.by_location.get(location, 0) | bit
+        self.locations = sorted(self.by_location)
+        self._location_keys = [(_location_key(loc), self.by_location[loc]) for loc in self.locations]
+
+    def location_mask(self, query: str) -> int:
+        """Fish at every location whose name contains the query ("river" -> River, Cindersap Forest River, ...); 0 if none."""
+        key = _location_key(query)
+        if not key:
+            # "." or "!!" would otherwise be contained in every location.
+            return 0
+        mask = 0
+        for location_key, fish_bits in self._location_keys:
+            if key in location_key:
+                mask |= fish_bits
+        return mask
+
+    def available(self, season: str, hour: int, weather: int | None = None, location_bits: int | None = None) -> int:
+        """Bitset of the fish catchable then; weather/location_bits of None mean any."""
+        bits = self.by_season[season] & self.by_hour[hour - DAY_START]
+        if weather is not None:
+            bits &= self.by_weather[weather]
+        if location_bits is not None:
+            bits &= location_bits
+        return bits
+
+    def needed(self, bits: int, needed_bundle_mask: int) -> int:
+        """Keep the fish in `bits` that can still fill one of the guild's unchecked bundle items."""
+        out = 0
+        for i in self.indexes(bits):
+            if self.bundle_masks[i] & needed_bundle_mask:
+                out |= 1 << i
+        return out
+
+    def indexes(self, bits: int):
+        while bits:
+            low = bits & -bits
+            yield low.bit_length() - 1
+            bits ^= low
+
+    def fish_names(self, bits: int) -> list[str]:
+        return [self.names[i] for i in self.indexes(bits)]
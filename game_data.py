@@ -0,0 +1,389 @@
+"""
+Static game data: the JSON files, checked and indexed once.
+
+compile_data() reads every data file, validates its shape and builds every
+lookup the bot derives from it (bundle maps, the BundleLayout, the name
+indexes, the season/bundle match tables). The result is pickled into a
+snapshot whose header carries a hash of the source files (and of the code
+whose classes are pickled), so a later start loads one file instead of
+re-parsing and re-indexing:
+
+    python game_data.py compile [snapshot path]
+
+load_game_data() uses the snapshot when its hash matches the JSON on disk
+and the running code, and otherwise recompiles and rewrites it.
+"""
+import hashlib
+import json
+import os
+import pickle
+import re
+import sys
+import tempfile
+import time
+
+from bundle_planner import BundlePlanner
+from bundle_progress import BundleLayout
+from crop_planner import CropPlanner
+from farm_calendar import digest_days
+from fish_index import FishIndex
+from gift_index import GiftIndex
+from name_resolver import NameResolver
+from records import Crop, Fish, Purchase, Season, Tree
+from search_index import SearchDoc, SearchIndex, flatten_fields
+
+# Attribute name -> file, in the order they are loaded.
+DATA_FILES = {
+    'townspeople': 'townspeople.json',
+    'building': 'building.json',
+    'events': 'events.json',
+    'fish': 'fish.json',
+    'seasons': 'seasons.json',
+    'crops': 'crops.json',
+    'community': 'communitycenter.json',
+    'upgrades': 'upgrades.json',
+    'gift_categories': 'gift_categories.json',
+}
+
+SNAPSHOT_MAGIC = b'SDVDATA'
+# Bump when GameData's fields or any index or record class changes shape.
+SNAPSHOT_FORMAT = 8
+# Modules whose classes end up in the pickle. Their source is hashed along with
+# the data files, so a code change rebuilds the snapshot even without a bump.
+SNAPSHOT_MODULES = ('game_data', 'records', 'name_resolver', 'fish_index', 'crop_planner', 'gift_index',
+                    'search_index', 'bundle_planner', 'bundle_progress', 'farm_calendar')
+
+
+class DataError(ValueError):
+    """A data file is missing or doesn't have the shape the bot expects."""
+
+
+########################
+# Shared name helpers
+########################
+
+def normalize_name(s: str) -> str:
+    # Remove simple parentheticals like "Common Mushroom (Secret Woods)" -> "Common Mushroom"
+    return s.split('(')[0].strip()
+
+def bundle_base_name(item: str) -> str:
+    """Strip quantity/quality/variant marks from a bundle item: "5 Parsnip★" -> "parsnip", "99 Wood (2)" -> "wood"."""
+    return normalize_name(re.sub(r'^\d[\d,]*\s+', '', item).replace('★', '')).lower()
+
+
+########################
+# Validation
+########################
+
+def _expect(cond: bool, filename: str, where: str, what: str) -> None:
+    if not cond:
+        raise DataError(f"{filename}: {where}: {what}")
+
+def validate(raw: dict[str, dict]) -> None:
+    """Raise DataError on the first entry that would break a command."""
+    for attr, filename in DATA_FILES.items():
+        table = raw[attr]
+        _expect(isinstance(table, dict), filename, 'top level', 'expected an object')
+        for key, entry in table.items():
+            _expect(isinstance(entry, dict), filename, key, 'expected an object')
+
+    for name, person in raw['townspeople'].items():
+        for field in ('loves', 'likes'):
+            _expect(isinstance(person.get(field, []), list), DATA_FILES['townspeople'], name, f"'{field}' must be a list")
+    for name, category in raw['gift_categories'].items():
+        for field in ('items', 'except'):
+            _expect(isinstance(category.get(field, []), list), DATA_FILES['gift_categories'], name, f"'{field}' must be a list")
+    for attr in ('building', 'upgrades'):
+        for name, entry in raw[attr].items():
+            _expect(isinstance(entry.get('cost', []), list), DATA_FILES[attr], name, "'cost' must be a list")
+    for season, days in raw['events'].items():
+        for day, entries in days.items():
+            _expect(day.isdigit() and 1 <= int(day) <= 28, DATA_FILES['events'], f"{season} {day}", 'day must be 1-28')
+            _expect(isinstance(entries, list), DATA_FILES['events'], f"{season} {day}", 'expected a list of events')
+    for season_name, season in raw['seasons'].items():
+        # Seasons only keep names; the records come from crops.json / fish.json.
+        for kind in ('Single Harvest', 'Multi Harvest'):
+            for crop in season.get('Crops', {}).get(kind, {}):
+                _expect(crop in raw['crops'], DATA_FILES['seasons'], f"{season_name} / {crop}", f"not in {DATA_FILES['crops']}")
+        for fish in season.get('Fish', {}):
+            _expect(fish in raw['fish'], DATA_FILES['seasons'], f"{season_name} / {fish}", f"not in {DATA_FILES['fish']}")
+    for room_name, room in raw['community'].items():
+        bundles = room.get('Bundles', {})
+        _expect(isinstance(bundles, dict), DATA_FILES['community'], room_name, "'Bundles' must be an object")
+        for bundle_name, bundle in bundles.items():
+            where = f"{room_name} / {bundle_name}"
+            items = bundle.get('items')
+            _expect(isinstance(items, dict) and bool(items), DATA_FILES['community'], where, "'items' must be a non-empty object")
+            amount = bundle.get('amount')
+            _expect(isinstance(amount, int) and 0 < amount <= len(items), DATA_FILES['community'], where,
+                    f"'amount' must be between 1 and {len(items)}")
+
+
+########################
+# Compiled data
+########################
+
+class GameData:
+    """Every data table plus every index derived from them."""
+
+    def __init__(self, raw: dict[str, dict], source_hash: str):
+        self.source_hash = source_hash
+        self.townspeople: dict = raw['townspeople']
+        self.events: dict = raw['events']
+        self.community: dict = raw['community']
+        # Typed records (see records.py) instead of the raw string dicts.
+        self.building: dict[str, Purchase] = {name: Purchase(name, entry) for name, entry in raw['building'].items()}
+        self.upgrades: dict[str, Purchase] = {name: Purchase(name, entry) for name, entry in raw['upgrades'].items()}
+        self.fish: dict[str, Fish] = {name: Fish(name, entry) for name, entry in raw['fish'].items()}
+        self.crops: dict[str, Crop] = {name: Crop(name, entry) for name, entry in raw['crops'].items()}
+        self.seasons: dict[str, Season] = {name: Season(name, entry) for name, entry in raw['seasons'].items()}
+        self.trees: dict[str, Tree] = {
+            name: Tree(name, season_name, entry)
+            for season_name, season in raw['seasons'].items()
+            for name, entry in season.get('Trees', {}).items()
+        }
+
+        # "artisan bundle" -> ("Pantry", "Artisan Bundle"); "poppy" -> [("Pantry", "Artisan Bundle"), ...]
+        self.bundle_name_to_room: dict[str, tuple[str, str]] = {}
+        self.item_to_bundles: dict[str, list[tuple[str, str]]] = {}
+        for room_name, room in self.community.items():
+            for bundle_name, bundle in room.get('Bundles', {}).items():
+                self.bundle_name_to_room[bundle_name.lower()] = (room_name, bundle_name)
+                for item in bundle.get('items', {}).keys():
+                    self.item_to_bundles.setdefault(item.lower(), []).append((room_name, bundle_name))
+
+        # Canonical item numbering; each guild's progress is a bitmask over it (see bundle_progress.py).
+        self.layout = BundleLayout(self.community)
+        # `!gift who`: every loved/liked item, categories expanded, -> villagers.
+        self.gifts = GiftIndex(self.townspeople, raw['gift_categories'])
+        self.names = self._build_names()
+        self.season_categories, self.season_item_bundle_matches = self._build_season_bundle_index()
+        self.needed_masks = self._build_needed_masks()
+        # `!crop best` tables, one ranking per season and days left.
+        self.crop_plans = CropPlanner(self.crops)
+        # `!fish now` bitsets by season, hour, weather and location.
+        self.fish_index = FishIndex(self.fish, self.needed_masks)
+        # `!calendar` digests: the guild-independent part of every day of the year.
+        self.digest_days = digest_days(self.events, self.townspeople, self.crop_plans, self.fish_index)
+        # `!bundle plan`: when each bundle item can next be had, from any day of the year.
+        self.bundle_plans = BundlePlanner(self.layout, self.crops, self.fish, self.trees, self.seasons, bundle_base_name)
+        # `!search`: every table's fields, as an inverted index.
+        self.search = SearchIndex(self._search_docs(raw))
+
+    def _build_names(self) -> NameResolver:
+        """Typo-tolerant name lookup for every command that takes a name (see name_resolver.py)."""
+        names = NameResolver()
+        names.add('villager', self.townspeople.keys())
+        names.add('building', self.building.keys())
+        names.add('fish', self.fish.keys())
+        names.add('crop', self.crops.keys())
+        names.add('upgrade', self.upgrades.keys())
+        names.add('room', self.community.keys())
+        names.add('bundle', (slot.name for slot in self.layout.bundles))
+        names.add('item', (item for _, _, item in self.layout.items))
+        names.add('gift', self.gifts.items())
+        for slot in self.layout.bundles:
+            names.add(f'item:{slot.name}', (self.layout.items[bit][2] for bit in range(slot.start, slot.stop)))
+        return names
+
+    @staticmethod
+    def _search_docs(raw: dict[str, dict]) -> list[SearchDoc]:
+        docs = [SearchDoc(kind, name, flatten_fields(entry))
+                for kind, attr in (('villager', 'townspeople'), ('building', 'building'), ('upgrade', 'upgrades'),
+                                   ('fish', 'fish'), ('crop', 'crops'))
+                for name, entry in raw[attr].items()]
+        foraging: dict[str, dict[str, list[str]]] = {}      # name -> {'Season': [...], 'Where': [...]}
+        for season_name, season in raw['seasons'].items():
+            for name, entry in season.get('Trees', {}).items():
+                docs.append(SearchDoc('tree', name, [('Season', season_name), *flatten_fields(entry)]))
+            for entry in season.get('Foraging', []):
+                fields = foraging.setdefault(normalize_name(entry), {'Season': [], 'Where': []})
+                fields['Season'].append(season_name)
+                if '(' in entry:
+                    fields['Where'].append(entry[entry.index('(') + 1:].rstrip(')'))
+        docs += [SearchDoc('forage', name, flatten_fields(fields)) for name, fields in foraging.items()]
+        for room_name, room in raw['community'].items():
+            bundles = room.get('Bundles', {})
+            docs.append(SearchDoc('room', room_name, [('Bundles', ', '.join(bundles)), *flatten_fields({k: v for k, v in room.items() if k != 'Bundles'})]))
+            docs += [SearchDoc('bundle', name, [('Room', room_name), *flatten_fields(bundle)]) for name, bundle in bundles.items()]
+        dates: dict[str, list[str]] = {}
+        for season_name, days in raw['events'].items():
+            for day, entries in days.items():
+                for entry in entries:
+                    dates.setdefault(entry, []).append(f"{season_name} {day}")
+        docs += [SearchDoc('event', name, [('Date', ', '.join(days))]) for name, days in dates.items()]
+        return docs
+
+    def _build_season_bundle_index(self):
+        """
+        Precompute, per season, every category's names plus which canonical bundle
+        items each name satisfies (matched on the normalized base name, so "Corn"
+        satisfies both "Corn" and "5 Corn★" but "Carrot" does not match "Cave Carrot").
+        """
+        bundle_items_by_base: dict[str, set[str]] = {}
+        for _, _, item_name in self.layout.items:
+            bundle_items_by_base.setdefault(bundle_base_name(item_name), set()).add(item_name)
+
+        categories_by_season: dict[str, dict[str, list[str]]] = {}
+        matches_by_name: dict[str, frozenset[str]] = {}
+        for season_name, season in self.seasons.items():
+            categories = {
+                'crops': list(season.crops),
+                'fish': list(season.fish),
+                'foraging': [normalize_name(x) for x in season.foraging],
+                'trees': list(season.trees),
+            }
+            categories_by_season[season_name] = categories
+            for names in categories.values():
+                for name in names:
+                    key = normalize_name(name).lower()
+                    matches_by_name[key] = frozenset(bundle_items_by_base.get(key, ()))
+        return categories_by_season, matches_by_name
+
+    def _build_needed_masks(self) -> dict[str, int]:
+        """Autocomplete name -> bundle bits it can fill, so "still needed" is one AND per name."""
+        base_masks: dict[str, int] = {}
+        for bit, (_, _, item_name) in enumerate(self.layout.items):
+            base = bundle_base_name(item_name)
+            base_masks[base] = base_masks.get(base, 0) | (1 << bit)
+        masks: dict[str, int] = {}
+        for name in [item for _, _, item in self.layout.items] + list(self.fish) + list(self.crops):
+            masks[name] = masks.get(name, 0) | base_masks.get(bundle_base_name(name), 0)
+        for room_name, slots in self.layout.rooms.items():
+            for slot in slots:
+                masks[slot.name] = masks.get(slot.name, 0) | slot.mask
+                masks[room_name] = masks.get(room_name, 0) | slot.mask
+        return masks
+
+
+########################
+# Loading & snapshots
+########################
+
+def _code_hash() -> bytes:
+    # Read once at import: a reload must label its snapshot with the code that is running, not what's on disk now.
+    digest = hashlib.sha256()
+    for name in SNAPSHOT_MODULES:
+        with open(__file__ if name == 'game_data' else sys.modules[name].__file__, 'rb') as f:
+            digest.update(name.encode() + b'\0' + f.read() + b'\0')
+    return digest.digest()
+
+_CODE_HASH = _code_hash()
+
+def _read_sources(data_dir: str) -> tuple[dict[str, bytes], str]:
+    blobs = {}
+    digest = hashlib.sha256(f"{SNAPSHOT_FORMAT}".encode())
+    for attr, filename in DATA_FILES.items():
+        try:
+            with open(os.path.join(data_dir, filename), 'rb') as f:
+                blobs[attr] = f.read()
+        except FileNotFoundError:
+            raise DataError(f"{filename}: file not found") from None
+        digest.update(filename.encode() + b'\0' + blobs[attr] + b'\0')
+    digest.update(_CODE_HASH)
+    return blobs, digest.hexdigest()
+
+def source_mtimes(data_dir: str) -> tuple[int, ...]:
+    """Modification times of the data files (0 if missing), to notice edits without reading them."""
+    out = []
+    for filename in DATA_FILES.values():
+        try:
+            out.append(os.stat(os.path.join(data_dir, filename)).st_mtime_ns)
+        except FileNotFoundError:
+            out.append(0)
+    return tuple(out)
+
+def compile_data(data_dir: str) -> GameData:
+    blobs, source_hash = _read_sources(data_dir)
+    return _compile(blobs, source_hash)
+
+def _compile(blobs: dict[str, bytes], source_hash: str) -> GameData:
+    raw = {}
+    for attr, blob in blobs.items():
+        try:
+            raw[attr] = json.loads(blob)
+        except ValueError as e:
+            raise DataError(f"{DATA_FILES[attr]}: {e}") from None
+    validate(raw)
+    return GameData(raw, source_hash)
+
+def write_snapshot(data: GameData, path: str) -> None:
+    # A temp file of our own: every shard cluster compiles and writes the snapshot at startup and on reload.
+    fd, tmp = tempfile.mkstemp(prefix=f"{os.path.basename(path)}.", suffix='.tmp', dir=os.path.dirname(os.path.abspath(path)))
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(SNAPSHOT_MAGIC + SNAPSHOT_FORMAT.to_bytes(2, 'big') + data.source_hash.encode('ascii'))
+            pickle.dump(data, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp, path)
+    except BaseException:
+        os.unlink(tmp)
+        raise
+
+def read_snapshot(path: str, source_hash: str) -> GameData | None:
+    """The snapshot at `path` if it was compiled from exactly these sources, else None."""
+    header = SNAPSHOT_MAGIC + SNAPSHOT_FORMAT.to_bytes(2, 'big') + source_hash.encode('ascii')
+    try:
+        with open(path, 'rb') as f:
+            if f.read(len(header)) != header:
+                return None
+            return pickle.load(f)
+    except FileNotFoundError:
+        return None
+    except Exception as e:
+        # A snapshot from another code version can fail to unpickle; just rebuild it.
+        print(f"Ignoring unreadable data snapshot {path}: {e!r}")
+        return None
+
+def load_game_data(data_dir: str, snapshot_path: str | None, timings: dict[str, float] | None = None) -> GameData:
+    """
+    Load the compiled snapshot if it matches the JSON files, else compile
+    (and rewrite the snapshot). Phase durations in seconds go into `timings`.
+    """
+    timings = timings if timings is not None else {}
+    started = time.perf_counter()
+    blobs, source_hash = _read_sources(data_dir)
+    timings['data_hash'] = time.perf_counter() - started
+
+    if snapshot_path:
+        started = time.perf_counter()
+        data = read_snapshot(snapshot_path, source_hash)
+        if data is not None:
+            timings['data_snapshot_load'] = time.perf_counter() - started
+            return data
+
+    started = time.perf_counter()
+    data = _compile(blobs, source_hash)
+    timings['data_compile'] = time.perf_counter() - started
+    if snapshot_path:
+        try:
+            write_snapshot(data, snapshot_path)
+        except OSError as e:
+            print(f"Could not write data snapshot {snapshot_path}: {e!r}")
+    return data
+
+def default_snapshot_path(data_dir: str) -> str:
+    return os.path.join(data_dir, 'gamedata.snapshot')
+
+
+def _cli(argv: list[str]) -> int:
+    if not argv or argv[0] != 'compile':
+        print("usage: python game_data.py compile [snapshot path]")
+        return 2
+    data_dir = os.path.dirname(os.path.abspath(__file__))
+    path = argv[1] if len(argv) > 1 else default_snapshot_path(data_dir)
+    started = time.perf_counter()
+    # Run as a script this module is __main__; pickle the classes under their importable name.
+    import game_data
+    try:
+        data = game_data.compile_data(data_dir)
+    except DataError as e:
+        print(f"Invalid data: {e}")
+        return 1
+    game_data.write_snapshot(data, path)
+    print(f"Wrote {path} ({len(data.layout.items)} bundle items, {os.path.getsize(path)} bytes) "
+          f"in {(time.perf_counter() - started) * 1000:.1f} ms")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(_cli(sys.argv[1:]))
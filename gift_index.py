@@ -0,0 +1,148 @@
+"""
+Who loves or likes an item, for `!gift who`.
+
+townspeople.json lists each villager's loved and liked gifts, partly as
+categories: "All Universal Likes (except Garlic)", "All Eggs (except Void
+Egg)", "All Fruit (except Pomegranate & Salmonberry)". gift_categories.json
+says what each category holds ("@Name" pulls in another category). GiftIndex
+expands every entry into concrete items, removes the exceptions and inverts
+the result into item -> villagers, so an answer is one dict lookup.
+
+An exception can itself be a category, possibly narrowed ("Gems other than
+Diamond & Prismatic Shard"). Parts of an exception that name neither an item
+nor a category (prose like "the fish dishes he likes") are skipped and kept
+in `unresolved`. A villager who both loves and likes an item (a loved dish
+that is also a universal like) counts it as loved.
+"""
+import re
+import unicodedata
+
+LOVE, LIKE = 'loves', 'likes'
+
+_ENTRY = re.compile(r'All (.+?)(?:\s*\((?:except\s+)?(.*)\))?$', re.S)
+_NARROWED = re.compile(r'\s+other than\s+')
+# Willy's "All Cooking except for the fish dishes he is neutral towards: Dish O' The Sea, ...": the list after the colon is more exclusions.
+_ASIDE = re.compile(r'\s+except for [^:,;]*:')
+_AND = re.compile(r'\s+(?:&|and)\s+')
+
+
+def gift_key(name: str) -> str:
+    """"Farmer's Lunch" / "Farmers Lunch" -> "farmerslunch"; "Piña Colada" -> "pinacolada"."""
+    plain = unicodedata.normalize('NFKD', name).encode('ascii', 'ignore').decode('ascii')
+    return re.sub(r'[^a-z0-9]', '', plain.lower())
+
+def _clean(part: str) -> str:
+    part = re.sub(r'^(?:and|&)\s+', '', part.strip()).strip(' .')
+    return part[4:] if part.startswith('All ') else part
+
+
+class GiftIndex:
+    """item key -> ((villager, tier), ...), loves first, for every item any villager loves or likes."""
+
+    def __init__(self, townspeople: dict, categories: dict):
+        self.names: dict[str, str] = {}                 # item key -> display name
+        self.unresolved: list[tuple[str, str]] = []     # (villager, text) skipped in an exception
+        self._category_raw = {gift_key(name): entry for name, entry in categories.items()}
+        self._categories: dict[str, frozenset[str]] = {}
+        for name in categories:
+            self._category(name)
+        for name, person in townspeople.items():
+            for item in person.get(LOVE, []) + person.get(LIKE, []):
+                if not item.startswith('All '):
+                    self.names.setdefault(gift_key(item), item)
+
+        by_item: dict[str, list[tuple[str, str]]] = {}
+        for villager, person in townspeople.items():
+            loves = self._expand(villager, person.get(LOVE, []))
+            likes = self._expand(villager, person.get(LIKE, [])) - loves
+            for tier, items in ((LOVE, loves), (LIKE, likes)):
+                for key in items:
+                    by_item.setdefault(key, []).append((villager, tier))
+        self.villagers = tuple(townspeople)
+        self.by_item: dict[str, tuple[tuple[str, str], ...]] = {
+            key: tuple(sorted(entries, key=lambda e: (e[1] != LOVE, e[0]))) for key, entries in by_item.items()
+        }
+
+    # ----- categories -----
+
+    def _category(self, name: str) -> frozenset[str] | None:
+        """Items in a category by any spelling ("Eggs", "Egg", "Universal Likes"); None if it isn't one."""
+        key = gift_key(name)
+        for candidate in (key, key + 's', key.removesuffix('s')):
+            if candidate in self._categories:
+                return self._categories[candidate]
+            entry = self._category_raw.get(candidate)
+            if entry is not None:
+                self._categories[candidate] = frozenset()  # guards against "@" cycles
+                items: set[str] = set()
+                for item in entry.get('items', []):
+                    if item.startswith('@'):
+                        items |= self._category(item[1:]) or set()
+                    else:
+                        items.add(gift_key(item))
+                        self.names.setdefault(gift_key(item), item)
+                for item in entry.get('except', []):
+                    items -= self._category(item) or {gift_key(item)}
+                self._categories[candidate] = frozenset(items)
+                return self._categories[candidate]
+        return None
+
+    # ----- villager entries -----
+
+    def _expand(self, villager: str, entries: list[str]) -> set[str]:
+        out: set[str] = set()
+        for entry in entries:
+            m = _ENTRY.match(entry)
+            category = self._category(m.group(1)) if m else None
+            if category is None:
+                out.add(gift_key(entry))
+                continue
+            out |= category - self._exceptions(villager, m.group(2) or '')
+        return out
+
+    def _exceptions(self, villager: str, text: str) -> set[str]:
+        """Item keys named by an "(except ...)" list."""
+        excluded: set[str] = set()
+        narrowed: list[tuple[frozenset[str], set[str]]] = []   # (category, items kept from it)
+        for chunk in re.split(r'[,;]', _ASIDE.sub(',', text)):
+            parts = _AND.split(_clean(chunk))
+            m = _NARROWED.search(chunk)
+            if m:
+                # "Vegetables and Artisan Goods other than Honey": the last category before it is narrowed.
+                left = [_clean(p) for p in _AND.split(_clean(chunk[:m.start()]))]
+                category = self._category(left[-1])
+                if category is not None:
+                    for part in left[:-1]:
+                        self._exclude(villager, part, excluded, narrowed)
+                    narrowed.append((category, set()))
+                    parts = _AND.split(_clean(chunk[m.end():]))
+            for part in parts:
+                self._exclude(villager, _clean(part), excluded, narrowed)
+        for category, kept in narrowed:
+            excluded |= category - kept
+        return excluded
+
+    def _exclude(self, villager: str, part: str, excluded: set[str], narrowed: list) -> None:
+        if not part:
+            return
+        category = self._category(part)
+        if category is not None:
+            excluded |= category
+            return
+        key = gift_key(part)
+        if narrowed and key in narrowed[-1][0]:
+            # Follows "X other than A": one more item X keeps.
+            narrowed[-1][1].add(key)
+        elif key in self.names:
+            excluded.add(key)
+        else:
+            self.unresolved.append((villager, part))
+
+    # ----- lookups -----
+
+    def who(self, name: str) -> tuple[tuple[str, str], ...]:
+        return self.by_item.get(gift_key(name), ())
+
+    def items(self) -> list[str]:
+        """Display names of every item someone loves or likes."""
+        return [self.names.get(key, key) for key in self.by_item]
@@ -0,0 +1,409 @@
+"""
+End-to-end load test: synthetic prefix-command traffic from many guilds,
+fed through bot.process_commands() as real discord.Message objects, with the
+Discord HTTP layer stubbed out to record every outbound call.
+
+bench.py times one handler call at a time. This runs commands concurrently
+at a fixed arrival rate (open loop: a slow bot doesn't slow the arrivals
+down), so queueing, event loop lag, write-behind flushes and memory growth
+show up the way they would in a traffic spike. Guilds start with nothing in
+memory, as after a restart; their first command loads them from the store.
+
+    python loadgen.py                                   # 200 cmd/s for 30s over 1,000 guilds
+    python loadgen.py --rate 1000 --duration 60 --guilds 20000
+    python loadgen.py --mix "bundle=40,bundle check=40,season bundle=20" --json load.json
+
+Every --interval seconds it prints the window's throughput, latency
+percentiles (arrival to handler done), loop lag, in-flight commands, bytes
+written and RSS; a summary follows at the end. Bundle progress goes to a
+temporary store, never the real one.
+"""
+import argparse
+import asyncio
+import collections
+import itertools
+import json
+import os
+import platform
+import random
+import sys
+import tempfile
+import time
+
+import discord
+
+DEFAULT_MIX = ('bundle=15,bundle room=10,season bundle=20,bundle check=20,bundle uncheck=5,'
+               'gift=10,fish=5,fish now=5,crop=5,bundle plan=5')
+_TIMESTAMP = '2024-01-01T00:00:00+00:00'
+
+
+def _load_bot(backend: str, flush_delay: float):
+    """Import main against a temporary state store (the env must be set before the import)."""
+    tmp = tempfile.TemporaryDirectory(prefix='sdv-load-')
+    os.environ['BUNDLES_STATE_PATH'] = os.path.join(tmp.name, 'bundles_state.json')
+    os.environ['BUNDLES_STATE_BACKEND'] = backend
+    os.environ['BUNDLES_FLUSH_DELAY'] = str(flush_delay)
+    for name in ('BUNDLES_DB_PATH', 'INTERACTION_ONLY', 'SHARD_IDS', 'METRICS_PORT', 'PORT'):
+        os.environ.pop(name, None)
+    import main
+    return main, tmp
+
+
+########################
+# Fake Discord
+########################
+
+def _user(user_id: int, name: str, bot: bool = False) -> dict:
+    return {'id': str(user_id), 'username': name, 'discriminator': '0', 'avatar': None, 'global_name': None, 'bot': bot}
+
+def _message(message_id: int, channel_id: int, guild_id: int | None, author: dict, content: str = '', embeds=()) -> dict:
+    data = {
+        'id': str(message_id), 'channel_id': str(channel_id), 'type': 0, 'content': content, 'author': author,
+        'attachments': [], 'embeds': list(embeds), 'mentions': [], 'mention_roles': [], 'mention_everyone': False,
+        'pinned': False, 'tts': False, 'timestamp': _TIMESTAMP, 'edited_timestamp': None, 'flags': 0, 'components': [],
+    }
+    if guild_id is not None:
+        data['guild_id'] = str(guild_id)
+        data['member'] = {'roles': [], 'joined_at': _TIMESTAMP, 'deaf': False, 'mute': False, 'flags': 0}
+    return data
+
+
+class RecordingHTTP:
+    """
+    Replaces HTTPClient.request: counts every call by route, serializes the
+    payload as the real client would, and answers message sends with a
+    message from the bot so discord.py can build its return value.
+    """
+
+    def __init__(self, bot_user: dict):
+        self.bot_user = bot_user
+        self.calls: collections.Counter[str] = collections.Counter()
+        self.bytes_out = 0
+        self._ids = itertools.count(1 << 50)
+
+    async def request(self, route, *, files=None, form=None, **kwargs):
+        self.calls[f"{route.method} {route.path}"] += 1
+        payload = kwargs.get('json')
+        if payload is not None:
+            self.bytes_out += len(discord.utils._to_json(payload))
+        if route.method == 'POST' and route.path == '/channels/{channel_id}/messages':
+            payload = payload or {}
+            return _message(next(self._ids), route.channel_id, None, self.bot_user,
+                            payload.get('content') or '', payload.get('embeds') or ())
+        return None
+
+
+class FakeDiscord:
+    """Synthetic guilds, each with one text channel, registered in the bot's connection state."""
+
+    def __init__(self, bot, guild_count: int, users_per_guild: int = 20):
+        self.bot = bot
+        state = bot._connection
+        self.http = RecordingHTTP(_user(1, 'StardewSavant', bot=True))
+        bot.http.request = self.http.request
+        state.user = discord.ClientUser(state=state, data=self.http.bot_user)
+        self.channels = []
+        for i in range(guild_count):
+            guild_id = 10**15 + 2 * i
+            guild = discord.Guild(state=state, data={
+                'id': str(guild_id), 'name': f'Farm {i}', 'owner_id': '2', 'member_count': users_per_guild + 1,
+                'roles': [{'id': str(guild_id), 'name': '@everyone', 'permissions': '104324673', 'position': 0,
+                           'color': 0, 'hoist': False, 'managed': False, 'mentionable': False}],
+                'channels': [{'id': str(guild_id + 1), 'type': 0, 'name': 'farm', 'position': 0,
+                              'permission_overwrites': []}],
+            })
+            state._add_guild(guild)
+            self.channels.append(guild.get_channel(guild_id + 1))
+        self.users = [_user(100 + u, f'farmer{u}') for u in range(users_per_guild)]
+        self._ids = itertools.count(1 << 40)
+
+    def message(self, rng: random.Random, content: str) -> discord.Message:
+        channel = rng.choice(self.channels)
+        data = _message(next(self._ids), channel.id, channel.guild.id, rng.choice(self.users), content)
+        return discord.Message(state=self.bot._connection, channel=channel, data=data)
+
+
+########################
+# Command mix
+########################
+
+def command_templates(m) -> dict[str, object]:
+    """Mix name -> fn(rng) returning a command line."""
+    layout = m.BUNDLE_LAYOUT
+    pairs = [(bundle, item) for _, bundle, item in layout.items]
+    rooms = list(layout.rooms)
+    seasons = ['spring', 'summer', 'fall', 'winter']
+    villagers, fish, crops = list(m.townspeople_data), list(m.fish_data), list(m.crops_data)
+    return {
+        'bundle': lambda r: '!bundle',
+        'bundle room': lambda r: f'!bundle {r.choice(rooms)}',
+        'season bundle': lambda r: f'!season {r.choice(seasons)} bundle',
+        'bundle check': lambda r: '!bundle check "{}" {}'.format(*r.choice(pairs)),
+        'bundle uncheck': lambda r: '!bundle uncheck "{}" {}'.format(*r.choice(pairs)),
+        'bundle plan': lambda r: f'!bundle plan from {r.choice(seasons)} {r.randint(1, 28)}',
+        'gift': lambda r: f'!gift {r.choice(villagers)}',
+        'fish': lambda r: f'!fish {r.choice(fish)}',
+        'fish now': lambda r: f"!fish now {r.choice(seasons)} {r.choice(['6am', '2pm', '8pm', '1am'])} bundle",
+        'crop': lambda r: f'!crop {r.choice(crops)}',
+        'crop best': lambda r: f'!crop best {r.choice(seasons[:3])} {r.randint(1, 28)}',
+        'search': lambda r: f"!search {r.choice(['ocean rain', 'hardwood', 'secret woods', 'iridium bar', 'void egg', 'summer bundle'])}",
+    }
+
+def parse_mix(text: str, templates: dict) -> list[tuple[str, float]]:
+    mix = []
+    for part in text.split(','):
+        name, _, weight = part.rpartition('=')
+        name = name.strip()
+        if name not in templates:
+            raise SystemExit(f"Unknown command in --mix: {name!r}. Known: {', '.join(templates)}")
+        mix.append((name, float(weight)))
+    return mix
+
+
+########################
+# Measurements
+########################
+
+def _bytes_written() -> int | None:
+    """Bytes this process has passed to write() (/proc/self/io wchar), or None where unavailable."""
+    try:
+        with open('/proc/self/io', 'rb') as f:
+            for line in f:
+                if line.startswith(b'wchar:'):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return None
+
+def _dir_bytes(path: str) -> int:
+    return sum(os.path.getsize(os.path.join(path, name)) for name in os.listdir(path))
+
+def _percentile(sorted_values: list[float], q: float) -> float:
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, int(len(sorted_values) * q))]
+
+
+class Window:
+    """What happened between two reports."""
+
+    def __init__(self):
+        self.latencies: list[float] = []
+        self.lags: list[float] = []
+        self.sent = 0
+
+    def row(self, elapsed: float, seconds: float, in_flight: int, written: int, rss: int | None) -> dict:
+        lat, lags = sorted(self.latencies), sorted(self.lags)
+        return {
+            't_s': round(elapsed, 1),
+            'sent': self.sent,
+            'done': len(lat),
+            'cmd_per_s': round(len(lat) / seconds, 1),
+            'p50_ms': round(_percentile(lat, 0.50) * 1e3, 2),
+            'p99_ms': round(_percentile(lat, 0.99) * 1e3, 2),
+            'max_ms': round((lat[-1] if lat else 0) * 1e3, 2),
+            'lag_p99_ms': round(_percentile(lags, 0.99) * 1e3, 2),
+            'in_flight': in_flight,
+            'written_bytes': written,
+            'rss_bytes': rss,
+        }
+
+
+class LoadRun:
+    def __init__(self, m, fake: FakeDiscord, templates: dict, mix: list[tuple[str, float]], state_dir: str, seed: int):
+        self.m = m
+        self.fake = fake
+        self.templates = templates
+        self.names = [name for name, _ in mix]
+        self.weights = [weight for _, weight in mix]
+        self.state_dir = state_dir
+        self.rng = random.Random(seed)
+        self.window = Window()
+        self.latencies: list[float] = []
+        self.by_command: dict[str, list[float]] = collections.defaultdict(list)
+        self.lags: list[float] = []
+        self.rows: list[dict] = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.failed = 0
+        self.tasks: set[asyncio.Task] = set()
+
+    async def _one(self, name: str, arrived: float) -> None:
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            message = self.fake.message(self.rng, self.templates[name](self.rng))
+            await self.m.bot.process_commands(message)
+        except Exception as e:
+            self.failed += 1
+            print(f"{name} raised {e!r}", file=sys.stderr)
+        finally:
+            self.in_flight -= 1
+            latency = time.perf_counter() - arrived
+            self.window.latencies.append(latency)
+            self.latencies.append(latency)
+            self.by_command[name].append(latency)
+
+    def _spawn(self, arrived: float) -> None:
+        name = self.rng.choices(self.names, self.weights)[0]
+        self.window.sent += 1
+        task = asyncio.get_running_loop().create_task(self._one(name, arrived))
+        self.tasks.add(task)
+        task.add_done_callback(self.tasks.discard)
+
+    async def _arrivals(self, rate: float, duration: float) -> None:
+        """Spawn commands on a fixed schedule; if the loop falls behind, catch up rather than slow down."""
+        interval = 1.0 / rate
+        started = time.perf_counter()
+        n = 0
+        while n * interval < duration:
+            now = time.perf_counter()
+            while n * interval < duration and started + n * interval <= now:
+                self._spawn(started + n * interval)
+                n += 1
+            await asyncio.sleep(max(0.0, started + n * interval - time.perf_counter()))
+
+    async def _sample_lag(self, interval: float = 0.05) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            started = loop.time()
+            await asyncio.sleep(interval)
+            lag = max(0.0, loop.time() - started - interval)
+            self.window.lags.append(lag)
+            self.lags.append(lag)
+
+    def _written(self, base: tuple[int | None, int]) -> int:
+        wchar = _bytes_written()
+        if wchar is not None and base[0] is not None:
+            return wchar - base[0]
+        return _dir_bytes(self.state_dir) - base[1]
+
+    async def _report(self, every: float, started: float, base: tuple[int | None, int]) -> None:
+        last = started
+        while True:
+            await asyncio.sleep(every)
+            now = time.perf_counter()
+            window, self.window = self.window, Window()
+            row = window.row(now - started, now - last, self.in_flight, self._written(base), self.m.metrics.process_rss_bytes())
+            self.rows.append(row)
+            last = now
+            print(f"{row['t_s']:>6.1f}s {row['sent']:>7} {row['done']:>7} {row['cmd_per_s']:>9.1f} {row['p50_ms']:>8.2f} "
+                  f"{row['p99_ms']:>8.2f} {row['max_ms']:>9.2f} {row['lag_p99_ms']:>8.2f} {row['in_flight']:>8} "
+                  f"{row['written_bytes'] / 1024:>10.1f} {(row['rss_bytes'] or 0) / 2**20:>8.1f}")
+
+    async def run(self, rate: float, duration: float, every: float, drain_timeout: float) -> dict:
+        m = self.m
+        m.STATE_CACHE.start()
+        base = (_bytes_written(), _dir_bytes(self.state_dir))
+        rss_start = m.metrics.process_rss_bytes()
+        print(f"{'t':>7} {'sent':>7} {'done':>7} {'cmd/s':>9} {'p50 ms':>8} {'p99 ms':>8} {'max ms':>9} "
+              f"{'lag p99':>8} {'inflight':>8} {'written KB':>10} {'rss MB':>8}")
+        started = time.perf_counter()
+        background = [asyncio.create_task(self._sample_lag()), asyncio.create_task(self._report(every, started, base))]
+        await self._arrivals(rate, duration)
+        if self.tasks:
+            await asyncio.wait(list(self.tasks), timeout=drain_timeout)
+        elapsed = time.perf_counter() - started
+        for task in background:
+            task.cancel()
+        await m.STATE_CACHE.flush()
+
+        lat, lags = sorted(self.latencies), sorted(self.lags)
+        cache = m.STATE_CACHE.stats()
+        sends = sum(count for route, count in self.fake.http.calls.items() if route.endswith('/messages'))
+        return {
+            'rate': rate,
+            'duration_s': duration,
+            'elapsed_s': round(elapsed, 2),
+            'commands': len(lat),
+            'unfinished': len(self.tasks),
+            'failed': self.failed,
+            'command_errors': sum(m.COMMAND_ERRORS.values.values()),
+            'throughput_per_s': round(len(lat) / elapsed, 1),
+            'latency_ms': {q: round(_percentile(lat, v) * 1e3, 2) for q, v in (('p50', 0.5), ('p90', 0.9), ('p99', 0.99), ('max', 1.0))},
+            'latency_p99_ms_by_command': {name: round(_percentile(sorted(v), 0.99) * 1e3, 2) for name, v in sorted(self.by_command.items())},
+            'loop_lag_ms': {q: round(_percentile(lags, v) * 1e3, 2) for q, v in (('p50', 0.5), ('p99', 0.99), ('max', 1.0))},
+            'max_in_flight': self.max_in_flight,
+            'http_calls': dict(self.fake.http.calls),
+            'sends_per_command': round(sends / max(1, len(lat)), 2),
+            'http_bytes_out': self.fake.http.bytes_out,
+            'written_bytes': self._written(base),
+            'state_dir_bytes': _dir_bytes(self.state_dir),
+            'store_flushes': cache.get('flushes'),
+            'store_rows_written': cache.get('rows_written'),
+            'rss_bytes': {'start': rss_start, 'peak': max((r['rss_bytes'] or 0 for r in self.rows), default=rss_start),
+                          'end': m.metrics.process_rss_bytes()},
+            'timeline': self.rows,
+        }
+
+
+########################
+# Reporting
+########################
+
+def print_summary(s: dict) -> None:
+    lat, lag = s['latency_ms'], s['loop_lag_ms']
+    print()
+    print(f"commands: {s['commands']} in {s['elapsed_s']}s = {s['throughput_per_s']}/s sustained "
+          f"(offered {s['rate']}/s; {s['unfinished']} unfinished, {s['failed']} raised, {s['command_errors']} command errors)")
+    print(f"latency ms: p50 {lat['p50']}  p90 {lat['p90']}  p99 {lat['p99']}  max {lat['max']}  (max in flight {s['max_in_flight']})")
+    print(f"loop lag ms: p50 {lag['p50']}  p99 {lag['p99']}  max {lag['max']}")
+    print("p99 by command ms: " + ", ".join(f"{name} {ms}" for name, ms in s['latency_p99_ms_by_command'].items()))
+    print(f"discord calls: {sum(s['http_calls'].values())} ({s['sends_per_command']} sends/command, {s['http_bytes_out'] / 1024:.0f} KB of payloads)")
+    print(f"written: {s['written_bytes'] / 1024:.1f} KB ({s['store_flushes']} flushes, {s['store_rows_written']} rows); "
+          f"state dir now {s['state_dir_bytes'] / 1024:.1f} KB")
+    rss = s['rss_bytes']
+    if rss['start']:
+        print(f"rss MB: start {rss['start'] / 2**20:.1f}  peak {rss['peak'] / 2**20:.1f}  end {rss['end'] / 2**20:.1f}")
+
+
+def main_cli(argv: list[str]) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--rate', type=float, default=200, help="commands per second offered")
+    parser.add_argument('--duration', type=float, default=30, help="seconds of traffic")
+    parser.add_argument('--guilds', type=int, default=1000)
+    parser.add_argument('--mix', default=DEFAULT_MIX, help="name=weight,... (see command_templates)")
+    parser.add_argument('--interval', type=float, default=1.0, help="seconds between report lines")
+    parser.add_argument('--backend', default='sqlite', choices=('sqlite', 'journal'))
+    parser.add_argument('--flush-delay', type=float, default=2.0, help="BUNDLES_FLUSH_DELAY for the run")
+    parser.add_argument('--drain-timeout', type=float, default=30, help="seconds to wait for in-flight commands at the end")
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--json', help="write the summary and timeline to this file")
+    args = parser.parse_args(argv)
+
+    m, tmp = _load_bot(args.backend, args.flush_delay)
+    templates = command_templates(m)
+    mix = parse_mix(args.mix, templates)
+
+    async def go() -> dict:
+        await m.bot._async_setup_hook()     # binds the client to this loop, as login() would
+        fake = FakeDiscord(m.bot, args.guilds)
+        run = LoadRun(m, fake, templates, mix, tmp.name, args.seed)
+        try:
+            return await run.run(args.rate, args.duration, args.interval, args.drain_timeout)
+        finally:
+            await m.STATE_CACHE.stop()
+
+    summary = asyncio.run(go())
+    print_summary(summary)
+    if args.json:
+        report = {
+            'meta': {
+                'python': platform.python_version(),
+                'platform': platform.platform(),
+                'cpus': os.cpu_count(),
+                'timestamp': int(time.time()),
+                'guilds': args.guilds,
+                'mix': args.mix,
+                'backend': args.backend,
+            },
+            'summary': summary,
+        }
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+    tmp.cleanup()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main_cli(sys.argv[1:]))
@@ -1,118 +1,283 @@
+import time
+# Startup phase timings (seconds); reported on ready and by `!junimo stats`.
+_PROCESS_STARTED = time.perf_counter()
+STARTUP_TIMINGS: dict[str, float] = {}
+
 from discord.ext import commands
 import discord
-import json
 import os
 from dotenv import load_dotenv
-from typing import Optional
+from typing import Optional, Literal
+from discord import app_commands
 from discord.ext.commands import CommandNotFound, MissingRequiredArgument, BadArgument, UserInputError
 import random
+import signal
+import asyncio
+import io
+import threading
+from state_store import open_state_store, default_store_path, BundleStateCache
+from bundle_progress import GuildProgress
+from game_data import load_game_data, default_snapshot_path, source_mtimes, normalize_name, bundle_base_name, DataError
+from gift_index import gift_key
+from search_index import tokenize
+from fish_index import parse_clock, WEATHER_WORDS as FISH_WEATHER_WORDS
+from records import format_hour, format_weather, SEASONS
+from bundle_planner import BundlePlan, CROP, FISH, TREE
+from farm_calendar import (FarmCalendar, DigestScheduler, DAYS_PER_SEASON, DAYS_PER_YEAR, day_number, date_parts,
+                           format_date, format_time_of_day, parse_time_of_day)
+from render_cache import RenderCache, Rendered
+import metrics
+from sharding import ShardBoard, ShardLoad, parse_shard_ids, REPORT_INTERVAL as SHARD_REPORT_INTERVAL
+from save_import import read_save, SaveImportError
+from profiler import SamplingProfiler, BlockWatch
 
 # Load environment variables from .env
 load_dotenv()
 
-intents = discord.Intents.default()
-intents.message_content = True
-
-bot = commands.Bot(command_prefix="!", intents=intents)
+# INTERACTION_ONLY=1 serves slash commands only: no message events at all,
+# and no member or message caches. Otherwise prefix commands read every message.
+INTERACTION_ONLY = (os.getenv('INTERACTION_ONLY') or '').lower() in ('1', 'true', 'yes')
+# SYNC_COMMANDS=1 publishes the slash commands at startup. An interaction-only
+# deploy can't receive `!junimo sync`, and `/junimo sync` only exists once synced.
+SYNC_COMMANDS = (os.getenv('SYNC_COMMANDS') or '').lower() in ('1', 'true', 'yes')
+
+if INTERACTION_ONLY:
+    # Guilds only, so interaction.guild and the shard guild counts still work.
+    intents = discord.Intents.none()
+    intents.guilds = True
+    _CACHE_OPTIONS = {'member_cache_flags': discord.MemberCacheFlags.none(), 'max_messages': None, 'chunk_guilds_at_startup': False}
+else:
+    intents = discord.Intents.default()
+    intents.message_content = True
+    _CACHE_OPTIONS = {}
+
+# Sharding (see sharding.py). Unset: every shard Discord recommends, in this
+# process. The launcher sets all three to run one shard range per process.
+SHARD_COUNT = int(os.getenv('SHARD_COUNT')) if os.getenv('SHARD_COUNT') else None
+SHARD_IDS = parse_shard_ids(os.getenv('SHARD_IDS')) if os.getenv('SHARD_IDS') else None
+CLUSTER_ID = int(os.getenv('CLUSTER_ID') or 0)
+
+
+class SavantTree(app_commands.CommandTree):
+    async def interaction_check(self, interaction: discord.Interaction) -> bool:
+        # Start the clock for the slash command latency metric.
+        interaction.extras['started'] = time.perf_counter()
+        _mark_command(_slash_name(interaction))
+        if INTERACTION_ONLY and interaction.type is discord.InteractionType.application_command:
+            # Acknowledge first; the reply then comes as a followup with no 3 second deadline.
+            # Owner and admin commands (those with checks) answer privately: the followup
+            # takes over the deferred message, so a public one would show a failed check
+            # ("only available to the bot owner") to the whole channel.
+            await interaction.response.defer(thinking=True, ephemeral=bool(getattr(interaction.command, 'checks', None)))
+            interaction.extras['api_calls'] = 1
+        return True
+
+
+class SavantContext(commands.Context):
+    """commands.Context that counts the messages a command sends, i.e. its Discord API calls."""
+    api_calls = 0
+
+    async def send(self, *args, **kwargs):
+        self.api_calls += 1
+        return await super().send(*args, **kwargs)
+
+
+class StardewSavant(commands.AutoShardedBot):
+    metrics_runner = None
+
+    async def get_context(self, origin, *, cls=SavantContext):
+        return await super().get_context(origin, cls=cls)
+
+    async def setup_hook(self):
+        # Bundle checks are written behind, off the event loop.
+        STATE_CACHE.start()
+        # Fly sends SIGTERM on redeploy; close cleanly so pending progress is flushed.
+        try:
+            asyncio.get_running_loop().add_signal_handler(signal.SIGTERM, lambda: asyncio.ensure_future(self.close()))
+        except (NotImplementedError, RuntimeError):
+            pass
+        if METRICS_PORT:
+            self.metrics_runner = await metrics.start_server(METRICS, int(METRICS_PORT))
+            self.loop.create_task(metrics.monitor_loop_lag(LOOP_LAG))
+        if SHARD_IDS is not None:
+            self.loop.create_task(_report_shard_load())
+        self.loop.create_task(_run_digests())
+        if DATA_RELOAD_INTERVAL > 0:
+            self.loop.create_task(_watch_game_data())
+        if LOOP_BLOCK_THRESHOLD_MS > 0:
+            _watch_blocks(LOOP_BLOCK_THRESHOLD_MS)
+        # Commands are global, so one cluster publishing them is enough.
+        if SYNC_COMMANDS and CLUSTER_ID == 0:
+            try:
+                print(f"Synced {len(await self.tree.sync())} slash commands.")
+            except discord.HTTPException as e:
+                print("Slash command sync failed:", repr(e))
+
+    async def invoke(self, ctx):
+        # Plain chat messages also come through here; only time actual command attempts.
+        if ctx.command is None and not ctx.invoked_with:
+            return await super().invoke(ctx)
+        started = time.perf_counter()
+        _mark_command(ctx.command.qualified_name if ctx.command else 'unknown')
+        try:
+            await super().invoke(ctx)
+        finally:
+            _observe_command(ctx.command.qualified_name if ctx.command else 'unknown', started, getattr(ctx, 'api_calls', None))
+            SHARD_LOAD.command(_shard_of(ctx.guild), time.perf_counter() - started)
+
+    async def close(self):
+        _watch_blocks(0)
+        await STATE_CACHE.stop()
+        if self.metrics_runner is not None:
+            await self.metrics_runner.cleanup()
+        await super().close()
+
+
+bot = StardewSavant(command_prefix="!", intents=intents, tree_cls=SavantTree, shard_count=SHARD_COUNT, shard_ids=SHARD_IDS,
+                    **_CACHE_OPTIONS)
 
 DATA_DIR = os.path.dirname(os.path.abspath(__file__))
 BUNDLES_STATE_PATH = os.getenv('BUNDLES_STATE_PATH') or os.path.join(DATA_DIR, 'bundles_state.json')
+BUNDLES_STATE_BACKEND = os.getenv('BUNDLES_STATE_BACKEND') or 'sqlite'
+BUNDLES_DB_PATH = os.getenv('BUNDLES_DB_PATH') or default_store_path(BUNDLES_STATE_PATH, BUNDLES_STATE_BACKEND)
+# Seconds to wait after a check before writing, so bursts land in one write.
+BUNDLES_FLUSH_DELAY = float(os.getenv('BUNDLES_FLUSH_DELAY') or 2.0)
+# How many recent changes per guild `!bundle history` / `!bundle undo` can reach.
+BUNDLE_HISTORY_MAX = 25
+# Largest save file `!bundle import` accepts (late-game saves are a few MB).
+SAVE_IMPORT_MAX_BYTES = 25 * 1024 * 1024
 
 ########################
-# Utility: JSON loading
+# Game data
 ########################
 
-def load_json(filename):
-    path = os.path.join(DATA_DIR, filename)
-    with open(path, 'r', encoding='utf-8') as f:
-        return json.load(f)
+STARTUP_TIMINGS['imports'] = time.perf_counter() - _PROCESS_STARTED
 
-townspeople_data = load_json('townspeople.json')
-building_data = load_json('building.json')
-events_data = load_json('events.json')
-fish_data = load_json('fish.json')
-seasons_data = load_json('seasons.json')
-crops_data = load_json('crops.json')
-community_data = load_json('communitycenter.json')
-upgrades_data = load_json('upgrades.json')
+# Validated JSON plus every index built from it, loaded from a compiled
+# snapshot when it is up to date (see game_data.py).
+DATA_SNAPSHOT_PATH = os.getenv('DATA_SNAPSHOT_PATH') or default_snapshot_path(DATA_DIR)
+GAME_DATA = load_game_data(DATA_DIR, DATA_SNAPSHOT_PATH, STARTUP_TIMINGS)
+# Every global taken from GAME_DATA below is replaced together by _install_game_data() (`!junimo reload`).
 
-# ---------- Bundle indices & persistence (add this after community_data is loaded) ----------
+townspeople_data = GAME_DATA.townspeople
+building_data = GAME_DATA.building
+events_data = GAME_DATA.events
+fish_data = GAME_DATA.fish
+seasons_data = GAME_DATA.seasons
+crops_data = GAME_DATA.crops
+community_data = GAME_DATA.community
+upgrades_data = GAME_DATA.upgrades
+trees_data = GAME_DATA.trees
 
-# Build quick-lookup maps
-BUNDLE_NAME_TO_ROOM: dict[str, tuple[str, str]] = {}
-ITEM_TO_BUNDLES: dict[str, list[tuple[str, str]]] = {}
+# ---------- Bundle indices & persistence ----------
 
-for room_name, room in community_data.items():
-    for bundle_name, bundle in room.get('Bundles', {}).items():
-        # map "artisan bundle" -> ("Pantry", "Artisan Bundle")
-        BUNDLE_NAME_TO_ROOM[bundle_name.lower()] = (room_name, bundle_name)
-        # map "poppy" -> [("Pantry", "Artisan Bundle"), ...]
-        for item in bundle.get('items', {}).keys():
-            ITEM_TO_BUNDLES.setdefault(item.lower(), []).append((room_name, bundle_name))
+# "artisan bundle" -> ("Pantry", "Artisan Bundle"); "poppy" -> [("Pantry", "Artisan Bundle"), ...]
+BUNDLE_NAME_TO_ROOM = GAME_DATA.bundle_name_to_room
+ITEM_TO_BUNDLES = GAME_DATA.item_to_bundles
 
+# Canonical item numbering; each guild's progress is a bitmask over it (see bundle_progress.py).
+BUNDLE_LAYOUT = GAME_DATA.layout
 
-def _load_bundles_state() -> dict:
-    """Load bundles_state.json or return empty dict if missing/corrupt."""
-    if not os.path.exists(BUNDLES_STATE_PATH):
-        return {}
-    try:
-        with open(BUNDLES_STATE_PATH, 'r', encoding='utf-8') as f:
-            return json.load(f)
-    except Exception:
-        # If the file is malformed, don't crash the bot; start fresh.
-        return {}
+# Typo-tolerant name lookup for every command that takes a name (see name_resolver.py).
+NAMES = GAME_DATA.names
+
+# Prebuilt embeds for the static-data commands; each command registers its builder below.
+RENDERS = RenderCache()
+
+# Bundle progress lives in a StateStore (SQLite by default, see state_store.py).
+# The old bundles_state.json is imported once, then only used as an export format.
+if SHARD_IDS is not None and BUNDLES_STATE_BACKEND != 'sqlite':
+    # Clusters share one store file; only SQLite coordinates writers across processes.
+    raise ValueError("Running a shard range (SHARD_IDS) needs BUNDLES_STATE_BACKEND=sqlite.")
+_phase_started = time.perf_counter()
+STATE_STORE = open_state_store(BUNDLES_STATE_BACKEND, BUNDLES_DB_PATH)
+STATE_STORE.import_legacy_json(BUNDLES_STATE_PATH)
+STARTUP_TIMINGS['state_store'] = time.perf_counter() - _phase_started
 
 
-def _save_bundles_state(state: dict) -> None:
-    """Persist bundle progress to disk."""
-    with open(BUNDLES_STATE_PATH, 'w', encoding='utf-8') as f:
-        json.dump(state, f, ensure_ascii=False, indent=2)
+# In-memory state is the source of truth; the store is written behind it.
+STATE_CACHE = BundleStateCache(STATE_STORE, BUNDLE_LAYOUT, flush_delay=BUNDLES_FLUSH_DELAY, history_size=BUNDLE_HISTORY_MAX)
 
 
-def _init_bundles_state_for_guild(guild_id: int) -> dict:
+########################
+# Metrics
+########################
+
+# Prometheus text at http://0.0.0.0:<port>/metrics (see metrics.py). Falls back
+# to PORT, which Fly sets; no server is started when neither is set.
+METRICS_PORT = os.getenv('METRICS_PORT') or os.getenv('PORT')
+
+METRICS = metrics.Registry()
+COMMAND_INVOCATIONS = METRICS.add(metrics.Counter('sdv_command_invocations_total', "Commands run, by command ('/name' for slash commands).", ('command',)))
+COMMAND_ERRORS = METRICS.add(metrics.Counter('sdv_command_errors_total', "Command errors, by command and exception type.", ('command', 'error')))
+COMMAND_LATENCY = METRICS.add(metrics.Histogram('sdv_command_latency_seconds', "Time to handle a command, including sends.", ('command',)))
+LOOP_LAG = METRICS.add(metrics.Histogram('sdv_event_loop_lag_seconds', "How late a 0.5s sleep on the event loop wakes up."))
+COMMAND_API_CALLS = METRICS.add(metrics.Histogram('sdv_command_api_calls', "Discord API calls (messages, deferrals) per command.",
+                                                  ('command',), buckets=(0, 1, 2, 3, 5, 10, 20)))
+STORE_TIMINGS = METRICS.add(metrics.Histogram('sdv_state_store_seconds', "Bundle state store guild loads and batched writes.", ('op',)))
+METRICS.add(metrics.Gauge('sdv_gateway_latency_seconds', "Discord gateway heartbeat latency.", lambda: bot.latency))
+METRICS.add(metrics.Gauge('sdv_guilds', "Guilds the bot is in.", lambda: len(bot.guilds)))
+METRICS.add(metrics.Gauge('sdv_bundle_cache', "Bundle state cache stats (as in !junimo stats).",
+                          lambda: {(name,): value for name, value in STATE_CACHE.stats().items()}, ('stat',)))
+STATE_CACHE.on_timing = lambda op, seconds: STORE_TIMINGS.observe(seconds, op)
+# For comparing INTERACTION_ONLY with prefix mode: what the gateway sends, and what it costs us.
+GATEWAY_EVENTS = METRICS.add(metrics.Counter('sdv_gateway_events_total', "Gateway dispatch events received, by type.", ('event',)))
+METRICS.add(metrics.Gauge('sdv_process_cpu_seconds', "CPU time used by this process.", time.process_time))
+METRICS.add(metrics.Gauge('sdv_process_resident_memory_bytes', "Resident memory of this process.", metrics.process_rss_bytes))
+
+def _observe_command(name: str, started: float, api_calls: int | None = None) -> None:
+    COMMAND_INVOCATIONS.inc(name)
+    COMMAND_LATENCY.observe(time.perf_counter() - started, name)
+    if api_calls is not None:
+        COMMAND_API_CALLS.observe(api_calls, name)
+
+def _slash_name(interaction: discord.Interaction) -> str:
+    return f"/{interaction.command.qualified_name}" if interaction.command else "/unknown"
+
+# Per-shard load: message and command counts here, guilds and latency read when reported.
+SHARD_LOAD = ShardLoad()
+
+def _shard_of(guild) -> int:
+    return guild.shard_id if guild is not None else 0
+
+def _shard_guilds() -> dict[int, int]:
+    counts = dict.fromkeys(bot.shards, 0)
+    for guild in bot.guilds:
+        counts[guild.shard_id] = counts.get(guild.shard_id, 0) + 1
+    return counts
+
+METRICS.add(metrics.Gauge('sdv_shard_guilds', "Guilds per shard in this process.",
+                          lambda: {(shard_id,): count for shard_id, count in _shard_guilds().items()}, ('shard',)))
+METRICS.add(metrics.Gauge('sdv_shard_latency_seconds', "Gateway heartbeat latency per shard in this process.",
+                          lambda: {(shard_id,): shard.latency for shard_id, shard in bot.shards.items()}, ('shard',)))
+
+async def _report_shard_load() -> None:
+    """Publish this cluster's per-shard load to the shared store for the launcher."""
+    board = ShardBoard(BUNDLES_DB_PATH)
+    loop = asyncio.get_running_loop()
+    while True:
+        latencies = {shard_id: shard.latency for shard_id, shard in bot.shards.items()}
+        rows = SHARD_LOAD.rows(CLUSTER_ID, _shard_guilds(), latencies)
+        try:
+            await loop.run_in_executor(None, board.publish, rows)
+        except Exception as e:
+            print("Shard load report failed:", repr(e))
+        await asyncio.sleep(SHARD_REPORT_INTERVAL)
+
+
+async def _init_bundles_state_for_guild(guild_id: int) -> GuildProgress:
     """
-    Ensure the calling guild has a fully-shaped entry in bundles_state.json.
-    - Creates rooms/bundles/items with defaults if missing
-    - Preserves any existing checkmarks
-    Returns the full state dict.
+    Return the calling guild's bundle progress from memory, loading it from
+    the store (off the event loop) the first time. Items missing from the
+    store are unchecked. Treat the result as read-only; change it through
+    _set_bundle_item.
     """
-    state = _load_bundles_state()
-    gid = str(guild_id)
-
-    def ensure_defaults():
-        mutated = False
-        if gid not in state:
-            state[gid] = {}
-            mutated = True
-
-        g = state[gid]
-        for room_name, room in community_data.items():
-            if room_name not in g:
-                g[room_name] = {}
-                mutated = True
-            room_state = g[room_name]
-
-            for bundle_name, bundle in room.get('Bundles', {}).items():
-                if bundle_name not in room_state:
-                    room_state[bundle_name] = {'items': {}}
-                    mutated = True
-                bundle_state = room_state[bundle_name]
-
-                if 'items' not in bundle_state or not isinstance(bundle_state['items'], dict):
-                    bundle_state['items'] = {}
-                    mutated = True
-
-                # Add any missing items defaulted to False, keep existing checks
-                for item_name in bundle.get('items', {}).keys():
-                    if item_name not in bundle_state['items']:
-                        bundle_state['items'][item_name] = False
-                        mutated = True
-        return mutated
-
-    if ensure_defaults():
-        _save_bundles_state(state)
-
-    return state
+    return await STATE_CACHE.get(guild_id)
+
+
+def _set_bundle_item(guild_id: int, room_name: str, bundle_name: str, item_name: str, checked: bool, user_id: int | None = None) -> None:
+    """Record a single checkmark (and its history entry); it is persisted by the background flusher."""
+    STATE_CACHE.set_item(guild_id, room_name, bundle_name, item_name, checked, user_id)
 # ---------- end bundle indices & persistence ----------
 
 
@@ -120,12 +285,43 @@ def _init_bundles_state_for_guild(guild_id: int) -> dict:
 # Bot lifecycle
 ########################
 
+def _record_startup(phase: str) -> None:
+    """Record seconds from process start to `phase`, the first time it happens."""
+    if phase not in STARTUP_TIMINGS:
+        STARTUP_TIMINGS[phase] = time.perf_counter() - _PROCESS_STARTED
+
+def _format_startup_timings() -> str:
+    return ", ".join(f"{phase} {seconds * 1000:.1f}ms" for phase, seconds in STARTUP_TIMINGS.items())
+
 @bot.event
 async def on_ready():
-    print("StardewSavant is ready!")
+    first = 'ready' not in STARTUP_TIMINGS
+    _record_startup('ready')
+    print("StardewSavant is ready!" + (f" Startup: {_format_startup_timings()}" if first else ""))
+
+@bot.listen('on_socket_event_type')
+async def _count_gateway_event(event_type):
+    GATEWAY_EVENTS.inc(event_type)
+
+@bot.listen('on_message')
+async def _count_shard_message(message):
+    SHARD_LOAD.message(_shard_of(message.guild))
+
+@bot.event
+async def on_command_completion(ctx):
+    _record_startup('first_command')
+
+@bot.event
+async def on_app_command_completion(interaction, command):
+    _record_startup('first_command')
+    started = interaction.extras.get('started', time.perf_counter())
+    _observe_command(_slash_name(interaction), started, interaction.extras.get('api_calls', 0))
+    SHARD_LOAD.command(_shard_of(interaction.guild), time.perf_counter() - started)
 
 @bot.event
 async def on_command_error(ctx, error):
+    COMMAND_ERRORS.inc(ctx.command.qualified_name if ctx.command else 'unknown', type(getattr(error, 'original', error)).__name__)
+
     # Unknown command -> nudge toward help
     if isinstance(error, CommandNotFound):
         return await ctx.send("Unknown command. Try `!junimo help` for a list of commands.")
@@ -137,6 +333,10 @@ async def on_command_error(ctx, error):
             return await ctx.send('I didn\'t understand your command, did you mean this?\nUsage: `!bundle check "Bundle Name" Item Name`\nExample: `!bundle check "Artisan Bundle" Cherry`')
         if cmd == 'bundle uncheck':
             return await ctx.send('I didn\'t understand your command, did you mean this?\nUsage: `!bundle uncheck "Bundle Name" Item Name`\nExample: `!bundle uncheck "Artisan Bundle" Cherry`')
+        if cmd == 'search':
+            return await ctx.send('I didn\'t understand your command, did you mean this?\nUsage: `!search <words>`\nExample: `!search ocean rain`')
+        if cmd == 'gift who':
+            return await ctx.send('I didn\'t understand your command, did you mean this?\nUsage: `!gift who <item>`\nExample: `!gift who Diamond`')
         if cmd == 'gift':
             return await ctx.send('I didn\'t understand your command, did you mean this?\nUsage: `!gift <villager>`\nExample: `!gift Leah`')
         if cmd == 'char':
@@ -145,16 +345,32 @@ async def on_command_error(ctx, error):
             return await ctx.send('I didn\'t understand your command, did you mean this?\nUsage: `!build <building>`\nExample: `!build Big Barn`')
         if cmd == 'upgrade':
             return await ctx.send('I didn\'t understand your command, did you mean this?\nUsage: `!upgrade <tool>`\nExample: `!upgrade Iridium Pickaxe`')
+        if cmd == 'fish now':
+            return await ctx.send('I didn\'t understand your command, did you mean this?\nUsage: `!fish now <season> <time> [sun|rain|wind] [location] [bundle]`\nExample: `!fish now summer 8pm rain river`')
         if cmd == 'fish':
             return await ctx.send('I didn\'t understand your command, did you mean this?\nUsage: `!fish <fish name>`\nExample: `!fish Midnight Carp`')
+        if cmd == 'crop best':
+            return await ctx.send('I didn\'t understand your command, did you mean this?\nUsage: `!crop best <spring|summer|fall|winter> [days-left] [budget]`\nExample: `!crop best summer 20 1000`')
         if cmd == 'crop':
             return await ctx.send('I didn\'t understand your command, did you mean this?\nUsage: `!crop <crop name>`\nExample: `!crop Blueberry`')
+        if cmd == 'calendar set':
+            return await ctx.send('I didn\'t understand your command, did you mean this?\nUsage: `!calendar set <spring|summer|fall|winter> <day> [year]`\nExample: `!calendar set summer 12 2`')
+        if cmd == 'calendar digest':
+            return await ctx.send('I didn\'t understand your command, did you mean this?\nUsage: `!calendar digest <#channel> <HH:MM UTC>`\nExample: `!calendar digest #farm 09:00`')
         if cmd == 'events':
             return await ctx.send('I didn\'t understand your command, did you mean this?\nUsage: `!events <spring|summer|fall|winter> [day]`\nExample: `!events winter 3`')
         if cmd == 'season':
             return await ctx.send('I didn\'t understand your command, did you mean this?\nUsage: `!season <spring|summer|fall|winter> [crops|fish|foraging|trees] [bundle]`\nExample: `!season spring crops bundle`')
         return await ctx.send("That command was missing something. Try `!junimo help`.")
 
+    # Owner-only and server-only commands
+    if isinstance(error, commands.NotOwner):
+        return await ctx.send("That command is only available to the bot owner.")
+    if isinstance(error, commands.NoPrivateMessage):
+        return await ctx.send("That command only works in a server.")
+    if isinstance(error, commands.MissingPermissions):
+        return await ctx.send("You need the Manage Server permission for that.")
+
     # Other user input issues
     if isinstance(error, (BadArgument, UserInputError)):
         return await ctx.send(str(error))
@@ -168,117 +384,246 @@ async def on_command_error(ctx, error):
 # Helpers for Embeds
 ########################
 
+# Discord's limits (characters count titles, field names and values).
+EMBED_FIELD_CHARS = 1024
+EMBED_MAX_FIELDS = 25
+EMBED_MAX_CHARS = 6000          # per embed, and for all embeds in one message
+MESSAGE_MAX_EMBEDS = 10
+
+def _chunk_text(text: str, limit: int = EMBED_FIELD_CHARS, separators: tuple[str, ...] = ('\n\n', '\n', ', ', ' ')) -> list[str]:
+    """Split text into pieces of at most `limit` characters, breaking between paragraphs, lines, list items or words first."""
+    if len(text) <= limit:
+        return [text]
+    if not separators:
+        return [text[i:i + limit] for i in range(0, len(text), limit)]
+    sep, finer = separators[0], separators[1:]
+    chunks, current = [], ''
+    for part in text.split(sep):
+        joined = f"{current}{sep}{part}" if current else part
+        if len(joined) <= limit:
+            current = joined
+            continue
+        if current:
+            chunks.append(current)
+        *full, current = _chunk_text(part, limit, finer)
+        chunks.extend(full)
+    if current:
+        chunks.append(current)
+    return chunks
+
+def _split_fields(fields: list[tuple[str, str, bool]]) -> list[tuple[str, str, bool]]:
+    """Fields with over-long values continued in "Name (cont.)" fields."""
+    out = []
+    for name, value, inline in fields:
+        for i, chunk in enumerate(_chunk_text(value)):
+            out.append((name if i == 0 else f"{name} (cont.)"[:256], chunk, inline))
+    return out
+
 def make_embed(title: str, color: int = 0x1e31bd, thumb: str | None = None, fields: list[tuple[str, str, bool]] | None = None):
+    """One embed; for content that may not fit in one, use make_embeds()."""
     embed = discord.Embed(title=title, color=color)
     if thumb:
         embed.set_thumbnail(url=thumb)
     if fields:
-        for name, value, inline in fields:
+        for name, value, inline in _split_fields(fields):
             embed.add_field(name=name, value=value, inline=inline)
     return embed
 
+def make_embeds(title: str, color: int = 0x1e31bd, thumb: str | None = None, fields: list[tuple[str, str, bool]] | None = None) -> list[discord.Embed]:
+    """Like make_embed(), continuing into "Title (cont.)" embeds past 25 fields or 6000 characters."""
+    embeds = [make_embed(title, color, thumb)]
+    for name, value, inline in _split_fields(fields or []):
+        embed = embeds[-1]
+        if len(embed.fields) >= EMBED_MAX_FIELDS or len(embed) + len(name) + len(value) > EMBED_MAX_CHARS:
+            embed = make_embed(f"{title} (cont.)", color)
+            embeds.append(embed)
+        embed.add_field(name=name, value=value, inline=inline)
+    return embeds
+
+def _pack_embeds(embeds: list[discord.Embed]) -> list[list[discord.Embed]]:
+    """Group embeds into as few messages as Discord allows (10 embeds, 6000 characters each)."""
+    batches: list[list[discord.Embed]] = []
+    size = 0
+    for embed in embeds:
+        if not batches or len(batches[-1]) >= MESSAGE_MAX_EMBEDS or size + len(embed) > EMBED_MAX_CHARS:
+            batches.append([])
+            size = 0
+        batches[-1].append(embed)
+        size += len(embed)
+    return batches
+
+async def _send_embeds(ctx, embeds: list[discord.Embed]) -> None:
+    for batch in _pack_embeds(embeds):
+        await ctx.send(embeds=batch)
+
+def _did_you_mean(kind: str, query: str) -> str:
+    """' Did you mean **A**, **B**?' for a missed lookup, or '' if nothing is close."""
+    options = NAMES.suggest(kind, query)
+    if not options:
+        return ""
+    return " Did you mean " + ", ".join(f"**{o}**" for o in options) + "?"
+
 ########################
 # GIFT COMMAND
 ########################
 
-@bot.command(name='gift')
-async def gift(ctx, townsperson: str):
-    t = townsperson.capitalize()
-    if t in townspeople_data:
-        data = townspeople_data[t]
-        loves_formatted = '\n'.join(f'- {item}' for item in data.get("loves", []))
-        likes_formatted = '\n'.join(f'- {item}' for item in data.get("likes", []))
-        embed = make_embed(
-            title=f"Gift Preferences for {t}",
-            color=0x1e31bd,
-            thumb=data.get("image"),
-            fields=[
-                ("Loves", loves_formatted or '—', True),
-                ("Likes", likes_formatted or '—', True),
-            ]
-        )
-        button = discord.ui.Button(label="View All Gifts on Wiki", url="https://stardewvalleywiki.com/List_of_All_Gifts")
-        view = discord.ui.View()
-        view.add_item(button)
-        await ctx.send(embed=embed, view=view)
+def _render_gift(t: str) -> Rendered:
+    data = townspeople_data[t]
+    loves_formatted = '\n'.join(f'- {item}' for item in data.get("loves", []))
+    likes_formatted = '\n'.join(f'- {item}' for item in data.get("likes", []))
+    embed = make_embed(
+        title=f"Gift Preferences for {t}",
+        color=0x1e31bd,
+        thumb=data.get("image"),
+        fields=[
+            ("Loves", loves_formatted or '—', True),
+            ("Likes", likes_formatted or '—', True),
+        ]
+    )
+    return Rendered(embed, (("View All Gifts on Wiki", "https://stardewvalleywiki.com/List_of_All_Gifts"),))
+
+RENDERS.register('gift', lambda: townspeople_data.keys(), _render_gift)
+
+@bot.group(name='gift', invoke_without_command=True)
+async def gift(ctx, *, townsperson: str):
+    t = NAMES.resolve('villager', townsperson)
+    if t:
+        await ctx.send(**RENDERS.get('gift', t).kwargs())
     else:
-        await ctx.send(f"No data available for {t}.")
+        await ctx.send(f"No data available for {townsperson}.{_did_you_mean('villager', townsperson)}")
+
+GIFTS = GAME_DATA.gifts
+
+def _villager_list(names: list[str], others: list[str] = ()) -> str:
+    """Names as written, or "Everyone except ..." when that is shorter; `others` are already listed elsewhere."""
+    if not names:
+        return '—'
+    everyone = "Everyone else" if others else "Everyone"
+    missing = sorted(v for v in GIFTS.villagers if v not in names and v not in others)
+    if not missing:
+        return everyone
+    if len(missing) < len(names):
+        return f"{everyone} except " + ", ".join(missing)
+    return ", ".join(names)
+
+def _gift_tiers(item: str) -> tuple[list[str], list[str]]:
+    """(villagers who love it, villagers who like it), from the gift index."""
+    entries = GIFTS.who(item)
+    return [v for v, tier in entries if tier == 'loves'], [v for v, tier in entries if tier == 'likes']
+
+def _render_gift_who(item: str) -> Rendered:
+    loves, likes = _gift_tiers(item)
+    embed = make_embed(
+        title=f"Who Likes {item}?",
+        color=0x1e31bd,
+        fields=[
+            ("Loved by", _villager_list(loves), False),
+            ("Liked by", _villager_list(likes, loves), False),
+        ]
+    )
+    return Rendered(embed, (("View All Gifts on Wiki", "https://stardewvalleywiki.com/List_of_All_Gifts"),))
+
+RENDERS.register('gift_who', lambda: GIFTS.items(), _render_gift_who)
+
+@gift.command(name='who')
+async def gift_who(ctx, *, item: str):
+    """Villagers who love or like an item. Usage: !gift who <item>"""
+    name = NAMES.resolve('gift', item) or GIFTS.names.get(gift_key(item))
+    if not name:
+        return await ctx.send(f"Nobody loves or likes '{item}'.{_did_you_mean('gift', item)}")
+    await ctx.send(**RENDERS.get('gift_who', name).kwargs())
 
 ########################
 # CHARACTER COMMAND
 ########################
 
+def _render_char(t: str) -> Rendered:
+    data = townspeople_data[t]
+    embed = make_embed(
+        title=f"Profile for {t}",
+        color=0x0f700b,
+        thumb=data.get("image"),
+        fields=[("Birthday", data.get("birthday", '—'), False)]
+    )
+    # Add "View {Char}'s Schedule on Wiki" button
+    schedule_url = data.get("schedule")
+    if schedule_url:
+        # jump straight to the Schedule section on the wiki page
+        return Rendered(embed, ((f"View {t}'s Schedule on Wiki", f"{schedule_url}#Schedule"),))
+    return Rendered(embed)
+
+RENDERS.register('char', lambda: townspeople_data.keys(), _render_char)
+
 @bot.command(name='char')
-async def char(ctx, townsperson: str):
-    t = townsperson.capitalize()
-    if t in townspeople_data:
-        data = townspeople_data[t]
-        embed = make_embed(
-            title=f"Profile for {t}",
-            color=0x0f700b,
-            thumb=data.get("image"),
-            fields=[("Birthday", data.get("birthday", '—'), False)]
-        )
-
-        # Add "View {Char}'s Schedule on Wiki" button
-        schedule_url = data.get("schedule")
-        view = None
-        if schedule_url:
-            # jump straight to the Schedule section on the wiki page
-            button = discord.ui.Button(
-                label=f"View {t}'s Schedule on Wiki",
-                url=f"{schedule_url}#Schedule"
-            )
-            view = discord.ui.View()
-            view.add_item(button)
-
-        if view:
-            await ctx.send(embed=embed, view=view)
-        else:
-            await ctx.send(embed=embed)
+async def char(ctx, *, townsperson: str):
+    t = NAMES.resolve('villager', townsperson)
+    if t:
+        await ctx.send(**RENDERS.get('char', t).kwargs())
     else:
-        await ctx.send(f"No data available for {t}.")
+        await ctx.send(f"No data available for {townsperson}.{_did_you_mean('villager', townsperson)}")
 
 ########################
 # BUILD COMMAND
 ########################
 
+def _render_build(b: str) -> Rendered:
+    data = building_data[b]
+    cost_formatted = '\n'.join(f'- {item}' for item in data.cost_lines)
+    embed = make_embed(
+        title=f"Cost for {b}",
+        color=0xff0000,
+        thumb=data.image,
+        fields=[("Materials", cost_formatted or '—', False)]
+    )
+    return Rendered(embed, (("View All Buildings on Wiki", "https://stardewvalleywiki.com/Carpenter%27s_Shop#Farm_Buildings"),))
+
+RENDERS.register('build', lambda: building_data.keys(), _render_build)
+
 @bot.command(name='build')
 async def build(ctx, *building: str):
-    b = " ".join(building).title()
-    if b in building_data:
-        data = building_data[b]
-        cost_formatted = '\n'.join(f'- {item}' for item in data.get("cost", []))
-        embed = make_embed(
-            title=f"Cost for {b}",
-            color=0xff0000,
-            thumb=data.get("image"),
-            fields=[("Materials", cost_formatted or '—', False)]
-        )
-        button = discord.ui.Button(label="View All Buildings on Wiki", url="https://stardewvalleywiki.com/Carpenter%27s_Shop#Farm_Buildings")
-        view = discord.ui.View()
-        view.add_item(button)
-        await ctx.send(embed=embed, view=view)
+    query = " ".join(building)
+    b = NAMES.resolve('building', query)
+    if b:
+        await ctx.send(**RENDERS.get('build', b).kwargs())
     else:
-        await ctx.send(f"No data available for {b}.")
+        await ctx.send(f"No data available for {query}.{_did_you_mean('building', query)}")
 
 ########################
 # EVENTS COMMAND
 ########################
 
+def _event_keys():
+    """"Spring" for the season view, "Spring 3" for each day."""
+    for season in events_data:
+        yield season
+        for dnum in range(1, 29):
+            yield f"{season} {dnum}"
+
+def _render_events(key: str) -> Rendered:
+    season, _, day = key.partition(' ')
+    data = events_data[season]
+    if not day:
+        events_formatted = ""
+        for d in sorted(data, key=lambda x: int(x)):
+            for event in data[d]:
+                events_formatted += f"- {d}: {event}\n"
+        return Rendered(make_embed(title=f"Happening in {season}", color=0x5c15ad,
+                                   fields=[("Event(s)", events_formatted or 'No events', False)]))
+    if day in data:
+        events_formatted = '\n'.join(f'- {item}' for item in data[day])
+    else:
+        events_formatted = "No events"
+    return Rendered(make_embed(title=f"Happening on {season} {day}", color=0x5c15ad,
+                               fields=[("Event(s)", events_formatted, False)]))
+
+RENDERS.register('events', _event_keys, _render_events)
+
 @bot.command(name='events')
 async def events(ctx, season, day: str | None = None):
     season = season.capitalize()
     if day is None:
         if season in events_data:
-            embed = make_embed(title=f"Happening in {season}", color=0x5c15ad)
-            data = events_data[season]
-            events_formatted = ""
-            for d in sorted(data, key=lambda x: int(x)):
-                for event in data[d]:
-                    events_formatted += f"- {d}: {event}\n"
-            embed.add_field(name="Event(s)", value=events_formatted or 'No events', inline=False)
-            await ctx.send(embed=embed)
+            await ctx.send(**RENDERS.get('events', season).kwargs())
         else:
             await ctx.send("Please provide an existing season")
     else:
@@ -290,14 +635,7 @@ async def events(ctx, season, day: str | None = None):
             if dnum > 28 or dnum < 1:
                 await ctx.send("Not a valid date.")
             else:
-                embed = make_embed(title=f"Happening on {season} {day}", color=0x5c15ad)
-                data = events_data[season]
-                if day in data:
-                    events_formatted = '\n'.join(f'- {item}' for item in data[day])
-                    embed.add_field(name="Event(s)", value=events_formatted, inline=False)
-                else:
-                    embed.add_field(name="Event(s)", value="No events", inline=False)
-                await ctx.send(embed=embed)
+                await ctx.send(**RENDERS.get('events', f"{season} {dnum}").kwargs())
         else:
             await ctx.send("No data available for this date.")
 
@@ -305,85 +643,108 @@ async def events(ctx, season, day: str | None = None):
 # FISH COMMAND
 ########################
 
-@bot.command(name='fish')
-async def fish(ctx, *fish_name: str):
-    name = " ".join(fish_name).strip()
-    key = next((k for k in fish_data.keys() if k.lower() == name.lower()), None)
-    if not key:
-        return await ctx.send(f"I couldn't find fish named '{name}'.")
+def _render_fish(key: str) -> Rendered:
     data = fish_data[key]
     fields = [
-        ("Location", data.get("Location", '—'), True),
-        ("Season", data.get("Season", '—'), True),
-        ("Time", data.get("Time", '—'), True),
-        ("Weather", data.get("Weather", '—'), True),
-        ("Base Sell Price", data.get("Base Sell Price", '—'), True),
+        ("Location", data.location_text, True),
+        ("Season", data.season_text, True),
+        ("Time", data.hours_text, True),
+        ("Weather", data.weather_text, True),
+        ("Base Sell Price", data.sell_price_text, True),
     ]
-    bundle_text = "This item is part of a Community Center bundle." if data.get("Bundle") else "This item is not part of a Community Center bundle."
+    bundle_text = "This item is part of a Community Center bundle." if data.bundle else "This item is not part of a Community Center bundle."
     fields.append(("Bundle Info", bundle_text, False))
-    embed = make_embed(title=key, color=0x2aa198, thumb=data.get("image"), fields=fields)
-    await ctx.send(embed=embed)
+    return Rendered(make_embed(title=key, color=0x2aa198, thumb=data.image, fields=fields))
+
+RENDERS.register('fish', lambda: fish_data.keys(), _render_fish)
+
+@bot.group(name='fish', invoke_without_command=True)
+async def fish(ctx, *fish_name: str):
+    name = " ".join(fish_name).strip()
+    key = NAMES.resolve('fish', name)
+    if not key:
+        return await ctx.send(f"I couldn't find fish named '{name}'.{_did_you_mean('fish', name)}")
+    await ctx.send(**RENDERS.get('fish', key).kwargs())
+
+FISH_INDEX = GAME_DATA.fish_index
+
+@fish.command(name='now')
+async def fish_now(ctx, season: str, time: str, *args: str):
+    """Fish catchable at a time of day. Usage: !fish now <season> <time> [weather] [location] [bundle]"""
+    s = season.capitalize()
+    if s not in FISH_INDEX.by_season:
+        return await ctx.send("Season must be Spring, Summer, Fall, or Winter.")
+    hour = parse_clock(time)
+    if hour is None:
+        return await ctx.send("Time must be a fishing hour between 6am and 2am, like `2pm`, `6:30am` or `23`.")
+    words = list(args)
+    want_bundle = bool(words) and words[-1].lower() == 'bundle'
+    if want_bundle:
+        words.pop()
+        if ctx.guild is None:
+            return await ctx.send("Bundle progress is kept per server; ask in a server to filter by bundles.")
+        # Before any index lookups, so the whole answer comes from one data generation.
+        progress = await _init_bundles_state_for_guild(ctx.guild.id)
+    weather = FISH_WEATHER_WORDS.get(words[0].lower()) if words else None
+    if weather is not None:
+        words.pop(0)
+    location = " ".join(words).strip()
+    location_bits = None
+    if location:
+        location_bits = FISH_INDEX.location_mask(location)
+        if not location_bits:
+            return await ctx.send(f"I don't know a fishing spot called '{location}'. Try one of: {', '.join(FISH_INDEX.locations)}.")
+
+    bits = FISH_INDEX.available(s, hour, weather, location_bits)
+    if want_bundle:
+        bits = FISH_INDEX.needed(bits, BUNDLE_LAYOUT.needed_mask(progress))
+
+    when = f"{s}, {format_hour(hour)}"
+    if weather is not None:
+        when += f", {format_weather(weather)}"
+    if location:
+        when += f", {location}"
+    title = f"Fish Now ({when})" + (" – Needed for Incomplete Bundles" if want_bundle else "")
+    names = FISH_INDEX.fish_names(bits)
+    if not names:
+        return await ctx.send(f"Nothing to catch then ({when})" + (" that an incomplete bundle still needs." if want_bundle else "."))
+    lines = [f"**{name}** – {fish_data[name].location_text} · {fish_data[name].hours_text}" for name in names]
+    await _send_embeds(ctx, make_embeds(title=title, color=0x2aa198, fields=[(f"{len(names)} fish", '\n'.join(lines), False)]))
 
 ########################
 # SEASON COMMAND (expanded)
 ########################
 
-def _normalize_name(s: str) -> str:
-    # Remove simple parentheticals like "Common Mushroom (Secret Woods)" -> "Common Mushroom"
-    return s.split('(')[0].strip()
-
-def _remaining_items_for_guild(guild_id: int) -> set[str]:
+async def _remaining_items_for_guild(guild_id: int) -> set[str]:
     """All item names still unchecked across incomplete bundles."""
-    state = _init_bundles_state_for_guild(guild_id)
-    gid = str(guild_id)
+    progress = await _init_bundles_state_for_guild(guild_id)
     remaining: set[str] = set()
-
-    for room_name, room in community_data.items():
-        for b_name, canonical in room.get('Bundles', {}).items():
-            amount_needed = canonical.get('amount', 0)
-            current = state[gid].get(room_name, {}).get(b_name, {}).get('items', {})
-            count_true = sum(1 for v in current.values() if v)
-            if count_true < amount_needed:
-                for item in canonical['items'].keys():
-                    if not current.get(item, False):
-                        remaining.add(item)
+    for slot in BUNDLE_LAYOUT.bundles:
+        if not progress.is_complete(slot):
+            remaining.update(BUNDLE_LAYOUT.unchecked_in(progress, slot))
     return remaining
 
+# "spring" -> {'crops': [...], ...}; "parsnip" -> {"Parsnip", "5 Parsnip★"}
+SEASON_CATEGORIES = GAME_DATA.season_categories
+SEASON_ITEM_BUNDLE_MATCHES = GAME_DATA.season_item_bundle_matches
+
 def _season_category_lists(season_name: str):
     """Return dict with 'crops', 'fish', 'foraging', 'trees' lists for a season."""
-    s = season_name.capitalize()
-    data = seasons_data.get(s, {})
-    crops = data.get('Crops', {})
-    crops_names = list(crops.get('Single Harvest', {}).keys()) + list(crops.get('Multi Harvest', {}).keys())
-    fish_names = list(data.get('Fish', {}).keys())
-    foraging_names = [_normalize_name(x) for x in data.get('Foraging', [])]
-    trees_names = list(data.get('Trees', {}).keys())
-    return {
-        'crops': crops_names,
-        'fish': fish_names,
-        'foraging': foraging_names,
-        'trees': trees_names
-    }
+    return SEASON_CATEGORIES.get(season_name.capitalize(), {'crops': [], 'fish': [], 'foraging': [], 'trees': []})
 
 def _filter_to_remaining(names: list[str], remaining: set[str]) -> list[str]:
-    rem_lower = {r.lower(): r for r in remaining}
+    """Keep the season names whose matching bundle items intersect the guild's remaining items."""
     out = []
+    seen = set()
     for n in names:
-        key = n.lower()
-        if key in rem_lower:
+        key = normalize_name(n).lower()
+        if key in seen:
+            continue
+        matches = SEASON_ITEM_BUNDLE_MATCHES.get(key)
+        if matches and not matches.isdisjoint(remaining):
+            seen.add(key)
             out.append(n)
-        else:
-            # some bundle items use variants like "5 Parsnip★" etc; do a loose contains check
-            if any(key == r.lower() or key in r.lower() or r.lower() in key for r in remaining):
-                out.append(n)
-    # De-dup while preserving order
-    seen = set()
-    uniq = []
-    for x in out:
-        if x.lower() not in seen:
-            seen.add(x.lower())
-            uniq.append(x)
-    return uniq
+    return out
 
 @bot.command(name='season')
 async def season(ctx, season: str, *args: str):
@@ -400,34 +761,34 @@ async def season(ctx, season: str, *args: str):
     if sub in ('crops', 'fish', 'foraging', 'trees'):
         items = categories[sub]
         if want_bundle_filter:
-            remaining = _remaining_items_for_guild(ctx.guild.id)
+            remaining = await _remaining_items_for_guild(ctx.guild.id)
             items = _filter_to_remaining(items, remaining)
         text = ', '.join(items) if items else '—'
         title = f"{s} {sub.capitalize()}" + (" (Needed for Incomplete Bundles)" if want_bundle_filter else "")
-        embed = make_embed(title=title, color=0x859900, fields=[(sub.capitalize(), text[:1024], False)])
-        return await ctx.send(embed=embed)
+        return await _send_embeds(ctx, make_embeds(title=title, color=0x859900, fields=[(sub.capitalize(), text, False)]))
 
     # If user asked for overall "bundle" view for the season
     if sub == 'bundle' or want_bundle_filter:
-        remaining = _remaining_items_for_guild(ctx.guild.id)
+        remaining = await _remaining_items_for_guild(ctx.guild.id)
         out = {}
         for k in categories:
             out[k] = _filter_to_remaining(categories[k], remaining)
         fields = []
-        fields.append(("Crops", (', '.join(out['crops']) or '—')[:1024], False))
-        fields.append(("Fish", (', '.join(out['fish']) or '—')[:1024], False))
-        fields.append(("Foraging", (', '.join(out['foraging']) or '—')[:1024], False))
-        fields.append(("Trees", (', '.join(out['trees']) or '—')[:1024], False))
-        embed = make_embed(title=f"{s} – Incomplete Bundle Targets", color=0x5f9ea0, fields=fields)
-        return await ctx.send(embed=embed)
+        fields.append(("Crops", ', '.join(out['crops']) or '—', False))
+        fields.append(("Fish", ', '.join(out['fish']) or '—', False))
+        fields.append(("Foraging", ', '.join(out['foraging']) or '—', False))
+        fields.append(("Trees", ', '.join(out['trees']) or '—', False))
+        return await _send_embeds(ctx, make_embeds(title=f"{s} – Incomplete Bundle Targets", color=0x5f9ea0, fields=fields))
 
     # Default original summary view
+    await ctx.send(**RENDERS.get('season', s).kwargs())
+
+def _render_season(s: str) -> Rendered:
     data = seasons_data[s]
 
     # Crops summary
-    crops = data.get('Crops', {})
-    single = list(crops.get('Single Harvest', {}).keys())
-    multi = list(crops.get('Multi Harvest', {}).keys())
+    single = [name for name in data.crops if not crops_data[name].regrows]
+    multi = [name for name in data.crops if crops_data[name].regrows]
     crops_lines = []
     if single:
         crops_lines.append(f"Single: {', '.join(single)}")
@@ -436,67 +797,162 @@ async def season(ctx, season: str, *args: str):
     crops_text = '\n'.join(crops_lines) or '—'
 
     # Foraging
-    foraging = [_normalize_name(x) for x in data.get('Foraging', [])]
+    foraging = [normalize_name(x) for x in data.foraging]
     foraging_text = ', '.join(foraging) or '—'
 
     # Fish (ALL fish for the season)
-    fish_all = list(data.get('Fish', {}).keys())
+    fish_all = list(data.fish)
     fish_text = ', '.join(fish_all) or '—'
 
     # Trees
-    trees = list(data.get('Trees', {}).keys())
+    trees = list(data.trees)
     trees_text = ', '.join(trees) or '—'
 
     embed = make_embed(
         title=f"Season: {s}",
         color=0x859900,
         fields=[
-            ("Crops", crops_text[:1024], False),
-            ("Foraging", foraging_text[:1024], False),
-            ("Fish", fish_text[:1024], False),
-            ("Trees", trees_text[:1024], False),
+            ("Crops", crops_text, False),
+            ("Foraging", foraging_text, False),
+            ("Fish", fish_text, False),
+            ("Trees", trees_text, False),
         ]
     )
-    await ctx.send(embed=embed)
+    return Rendered(embed)
+
+RENDERS.register('season', lambda: seasons_data.keys(), _render_season)
 
 ########################
 # CROP COMMAND
 ########################
 
-@bot.command(name='crop')
-async def crop(ctx, *crop_name: str):
-    name = " ".join(crop_name).strip()
-    key = next((k for k in crops_data.keys() if k.lower() == name.lower()), None)
-    if not key:
-        return await ctx.send(f"I couldn't find crop named '{name}'.")
+def _render_crop(key: str) -> Rendered:
     data = crops_data[key]
     fields = [
-        ("Season", data.get("Season", '—'), True),
-        ("Type", data.get("Type", '—'), True),
-        ("Growth Time", data.get("Growth Time", '—'), True),
-        ("Max Harvests", data.get("Max Harvests", '—'), True),
-        ("Seed Price", data.get("Seed Price", '—'), True),
-        ("Base Sell Price", data.get("Base Sell Price", '—'), True),
+        ("Season", data.season_text, True),
+        ("Type", data.type_text, True),
+        ("Growth Time", data.growth_text, True),
+        ("Max Harvests", data.max_harvests_text, True),
+        ("Seed Price", data.seed_price_text, True),
+        ("Base Sell Price", data.sell_price_text, True),
     ]
-    bundle_text = "This item is part of a Community Center bundle." if data.get("Bundle") else "This item is not part of a Community Center bundle."
+    bundle_text = "This item is part of a Community Center bundle." if data.bundle else "This item is not part of a Community Center bundle."
     fields.append(("Bundle Info", bundle_text, False))
-    embed = make_embed(title=key, color=0xb58900, thumb=data.get("image"), fields=fields)
+    return Rendered(make_embed(title=key, color=0xb58900, thumb=data.image, fields=fields))
+
+RENDERS.register('crop', lambda: crops_data.keys(), _render_crop)
+
+@bot.group(name='crop', invoke_without_command=True)
+async def crop(ctx, *crop_name: str):
+    name = " ".join(crop_name).strip()
+    key = NAMES.resolve('crop', name)
+    if not key:
+        return await ctx.send(f"I couldn't find crop named '{name}'.{_did_you_mean('crop', name)}")
+    await ctx.send(**RENDERS.get('crop', key).kwargs())
+
+CROP_PLANS = GAME_DATA.crop_plans
+CROP_BEST_LIMIT = 10
+
+def _parse_budget(text: str) -> int | None:
+    """"1,000", "1000g" -> 1000; None if it isn't an amount of gold."""
+    digits = text.lower().removesuffix('g').replace(',', '')
+    return int(digits) if digits.isdigit() else None
+
+@crop.command(name='best')
+async def crop_best(ctx, season: str, days_left: str | None = None, budget: str | None = None):
+    """Rank the season's crops by gold/day over the days left. Usage: !crop best <season> [days-left] [budget]"""
+    s = season.capitalize()
+    if s not in CROP_PLANS.tables:
+        return await ctx.send("Season must be Spring, Summer, Fall, or Winter.")
+    days = int(days_left) if days_left is not None and days_left.isdigit() else None
+    if days_left is not None and (days is None or not 1 <= days <= 28):
+        return await ctx.send("Days left must be a number from 1 to 28.")
+    gold = _parse_budget(budget) if budget is not None else None
+    if budget is not None and gold is None:
+        return await ctx.send("Budget must be an amount of gold, like `500` or `1,000g`.")
+    days = days or 28
+
+    rows = CROP_PLANS.best(s, days, gold, limit=CROP_BEST_LIMIT)
+    title = f"Best {s} Crops – {days} day{'s' if days != 1 else ''} left"
+    if gold is not None:
+        title += f", {gold:,}g budget"
+    if not rows:
+        return await ctx.send(f"No crop turns a profit in {s} with {days} day{'s' if days != 1 else ''} left" +
+                              (f" on a {gold:,}g budget." if gold is not None else "."))
+    lines = []
+    for rank, row in enumerate(rows, 1):
+        line = (f"{rank}. **{row.name}** – {row.gold_per_day:,.1f}g/day · {row.harvests} harvest{'s' if row.harvests != 1 else ''}"
+                f" · {row.profit:,}g per plant")
+        if gold is not None:
+            seeds = gold // row.seed_price
+            line += f" · {seeds:,} seeds → {seeds * row.profit:,}g"
+        lines.append(line)
+    embed = discord.Embed(title=title, description='\n'.join(lines), color=0xb58900)
+    embed.set_footer(text="Profit after seed costs, replanting single-harvest crops. Only crops whose seeds are sold for gold.")
     await ctx.send(embed=embed)
 
 ########################
 # UPGRADE COMMAND (tools/house)
 ########################
 
+def _render_upgrade(key: str) -> Rendered:
+    data = upgrades_data[key]
+    cost_formatted = '\n'.join(f'- {item}' for item in data.cost_lines)
+    return Rendered(make_embed(title=f"Upgrade: {key}", color=0xcb4b16, thumb=data.image, fields=[("Cost", cost_formatted or '—', False)]))
+
+RENDERS.register('upgrade', lambda: upgrades_data.keys(), _render_upgrade)
+
 @bot.command(name='upgrade')
 async def upgrade(ctx, *upgrade_name: str):
-    name = " ".join(upgrade_name).strip().title()
-    key = next((k for k in upgrades_data.keys() if k.lower() == name.lower()), None)
+    name = " ".join(upgrade_name).strip()
+    key = NAMES.resolve('upgrade', name)
     if not key:
-        return await ctx.send(f"I couldn't find an upgrade named '{name}'.")
-    data = upgrades_data[key]
-    cost_formatted = '\n'.join(f'- {item}' for item in data.get("cost", []))
-    embed = make_embed(title=f"Upgrade: {key}", color=0xcb4b16, thumb=data.get("image"), fields=[("Cost", cost_formatted or '—', False)])
-    await ctx.send(embed=embed)
+        return await ctx.send(f"I couldn't find an upgrade named '{name}'.{_did_you_mean('upgrade', name)}")
+    await ctx.send(**RENDERS.get('upgrade', key).kwargs())
+
+########################
+# SEARCH COMMAND
+########################
+
+SEARCH = GAME_DATA.search
+# Result group headings; groups appear in the order of their best hit.
+SEARCH_KINDS = {
+    'fish': "🐟 Fish",
+    'crop': "🌱 Crops",
+    'tree': "🌳 Fruit Trees",
+    'forage': "🍄 Foraging",
+    'villager': "🧑‍🌾 Villagers",
+    'building': "🏗️ Buildings",
+    'upgrade': "🔨 Upgrades",
+    'room': "🏛️ Community Center Rooms",
+    'bundle': "📦 Bundles",
+    'event': "📅 Events",
+}
+SEARCH_SNIPPET_CHARS = 120
+
+def _search_snippet(hit, words: set[str]) -> str:
+    """The hit's matching fields, trimmed to the list entries that match; its first field if only the name did."""
+    parts = []
+    for label, text in hit.matched_fields() or hit.doc.fields[1:2]:
+        entries = text.split(', ')
+        matching = [e for e in entries if words & set(tokenize(e))]
+        value = ', '.join(matching or entries)
+        if len(value) > SEARCH_SNIPPET_CHARS:
+            value = value[:SEARCH_SNIPPET_CHARS - 1] + '…'
+        parts.append(f"{label[:1].upper()}{label[1:]}: {value}")
+    return ' · '.join(parts)
+
+@bot.command(name='search')
+async def search(ctx, *, terms: str):
+    hits = SEARCH.search(terms)
+    if not hits:
+        return await ctx.send(f"Nothing in the game data matches '{terms}'.")
+    words = set(tokenize(terms))
+    groups: dict[str, list[str]] = {}
+    for hit in hits:
+        groups.setdefault(hit.doc.kind, []).append(f"**{hit.doc.name}** — {_search_snippet(hit, words)}")
+    fields = [(SEARCH_KINDS.get(kind, kind.title()), '\n'.join(lines), False) for kind, lines in groups.items()]
+    await _send_embeds(ctx, make_embeds(f"Search: {terms}", color=0x2aa198, fields=fields))
 
 #################################
 # JUNIMO COMMAND GROUP (fun/help)
@@ -534,6 +990,9 @@ async def junimo(ctx):
 
 @junimo.command(name='help')
 async def junimo_help(ctx):
+    await ctx.send(**RENDERS.get('help').kwargs())
+
+def _render_help(_key: str) -> Rendered:
     embed = discord.Embed(
         title="🌱 StardewSavant – Command List",
         description="A friendly Junimo guide to all my commands!",
@@ -544,6 +1003,7 @@ async def junimo_help(ctx):
         name="🎁 Gift & Character",
         value=(
             "`!gift <villager>` – Loved & liked gifts.\n"
+            "`!gift who <item>` – Who loves or likes an item.\n"
             "`!char <villager>` – Birthday, picture, and wiki link."
         ),
         inline=False
@@ -572,12 +1032,16 @@ async def junimo_help(ctx):
         value=(
             "`!bundle` – Show all bundle items.\n"
             "`!bundle incomplete` – Show only incomplete bundles.\n"
+            "`!bundle plan [from <season> <day>]` – When to get what's left.\n"
             "`!bundle find <item>` – Find which bundle(s) use an item.\n"
             "`!bundle <room>` – Bundles in that room.\n"
             "`!bundle <bundle>` – Items for that bundle.\n"
             "`!bundle check \"<bundle>\" <item>` – Mark item complete.\n"
             "`!bundle uncheck \"<bundle>\" <item>` – Unmark item.\n"
-            "`!bundle reset all` – Reset all bundle progress."
+            "`!bundle reset all` – Reset all bundle progress.\n"
+            "`!bundle history [n]` – Recent bundle changes.\n"
+            "`!bundle undo` – Revert the last bundle change.\n"
+            "`!bundle import` – Load progress from an attached save file."
         ),
         inline=False
     )
@@ -593,11 +1057,34 @@ async def junimo_help(ctx):
         inline=False
     )
 
+    embed.add_field(
+        name="📅 Calendar",
+        value=(
+            "`!calendar` – Today on your farm: events, birthdays, crops, bundle fish.\n"
+            "`!calendar set <season> <day> [year]` – Set your farm's date.\n"
+            "`!calendar next [days]` – Move the date forward.\n"
+            "`!calendar digest <#channel> <HH:MM>` – Post it daily (UTC).\n"
+            "`!calendar stop` – Stop the daily digest."
+        ),
+        inline=False
+    )
+
     embed.add_field(
         name="🐟 Crops & Fish",
         value=(
             "`!fish <name>` – Info on catching a fish.\n"
-            "`!crop <name>` – Info on growing a crop."
+            "`!fish now <season> <time> [weather] [location] [bundle]` – What's biting then.\n"
+            "`!crop <name>` – Info on growing a crop.\n"
+            "`!crop best <season> [days-left] [budget]` – Most profitable crops."
+        ),
+        inline=False
+    )
+
+    embed.add_field(
+        name="🔎 Search",
+        value=(
+            "`!search <words>` – Search every villager, fish, crop, building, bundle and event.\n"
+            "Example: `!search ocean rain`, `!search hardwood`."
         ),
         inline=False
     )
@@ -612,240 +1099,978 @@ async def junimo_help(ctx):
     )
 
     embed.set_footer(text="For detailed info, visit the Stardew Valley Wiki.")
-    await ctx.send(embed=embed)
+    return Rendered(embed)
+
+RENDERS.register('help', lambda: [''], _render_help)
+
+@junimo.command(name='stats', hidden=True)
+@commands.is_owner()
+async def junimo_stats(ctx):
+    """Owner-only: bundle state write-behind numbers for tuning BUNDLES_FLUSH_DELAY."""
+    stats = STATE_CACHE.stats()
+    lines = [f"{name}: {value:.3f}" if isinstance(value, float) else f"{name}: {value}" for name, value in stats.items()]
+    lines.append(f"startup: {_format_startup_timings()}")
+    rss = metrics.process_rss_bytes()
+    lines.append(f"mode: {'interaction-only' if INTERACTION_ONLY else 'prefix + slash'}, "
+                 f"gateway events: {sum(GATEWAY_EVENTS.values.values())}, cpu: {time.process_time():.1f}s, "
+                 f"rss: {f'{rss / 2**20:.1f} MiB' if rss else 'n/a'}")
+    lines.append(f"digests: {len(DIGESTS)} scheduled, {DIGESTS.fired} fired, {DIGESTS.failed} failed")
+    lines.append(f"shards: {', '.join(f'{i}={n}' for i, n in sorted(_shard_guilds().items()))} of {bot.shard_count} (cluster {CLUSTER_ID})")
+    await ctx.send("```\n" + "\n".join(lines) + "\n```")
+
+@junimo.command(name='sync', hidden=True)
+@commands.is_owner()
+async def junimo_sync(ctx):
+    """Owner-only: publish the slash commands to Discord (needed after they change)."""
+    synced = await bot.tree.sync()
+    await ctx.send(f"Synced {len(synced)} slash commands.")
+
+@junimo.command(name='reload', hidden=True)
+@commands.is_owner()
+async def junimo_reload(ctx):
+    """Owner-only: reload the game data JSON files without restarting."""
+    await ctx.send(await _reload_game_data())
+
+@junimo.group(name='profile', hidden=True, invoke_without_command=True)
+@commands.is_owner()
+async def junimo_profile(ctx, seconds: float = 10.0):
+    """Owner-only: sample the event loop for a while; top functions plus a collapsed-stack file for flamegraphs."""
+    if _PROFILE_LOCK.locked():
+        return await ctx.send("A profile is already running.")
+    seconds = min(max(seconds, 1.0), PROFILE_MAX_SECONDS)
+    async with _PROFILE_LOCK:
+        await ctx.send(f"Profiling the event loop for {seconds:g}s...")
+        profiler = SamplingProfiler(threading.get_ident(), seconds, max_overhead=PROFILE_MAX_OVERHEAD)
+        profiler.start()
+        result = await profiler.result()
+    await ctx.send(_format_profile(result), file=discord.File(io.BytesIO(result.collapsed().encode()), filename='profile.folded'))
+
+@junimo_profile.command(name='blocks')
+@commands.is_owner()
+async def junimo_profile_blocks(ctx, threshold: Optional[str] = None):
+    """Owner-only: `blocks <ms>` logs commands that block the loop longer than that; `blocks off` stops; no argument shows recent ones."""
+    if threshold is not None:
+        if threshold.lower() == 'off':
+            _watch_blocks(0)
+            return await ctx.send("Stopped watching for event loop blocks.")
+        try:
+            ms = float(threshold.lower().removesuffix('ms'))
+        except ValueError:
+            return await ctx.send("Usage: `!junimo profile blocks <ms|off>`")
+        if ms <= 0:
+            return await ctx.send("The threshold must be more than 0ms.")
+        _watch_blocks(ms)
+        return await ctx.send(f"Logging any command that blocks the event loop for more than {ms:g}ms.")
+    if BLOCK_WATCH is None:
+        return await ctx.send("Not watching for event loop blocks. Start with `!junimo profile blocks <ms>`.")
+    lines = [f"Blocks over {BLOCK_WATCH.threshold * 1000:g}ms: {BLOCK_WATCH.blocks}"]
+    for when, command, seconds in reversed(BLOCK_WATCH.recent):
+        lines.append(f"{time.strftime('%H:%M:%S', time.gmtime(when))} {command} {seconds * 1000:.0f}ms")
+    await ctx.send("```\n" + "\n".join(lines) + "\n```")
+
+
+########################
+# GAME DATA RELOAD
+########################
+
+# Seconds between checks of the data files' modification times; unset or 0 means only `!junimo reload`.
+DATA_RELOAD_INTERVAL = float(os.getenv('DATA_RELOAD_INTERVAL') or 0)
+DATA_RELOADS = METRICS.add(metrics.Counter('sdv_data_reloads_total', "Game data reloads, by result.", ('result',)))
+_DATA_RELOAD_LOCK = asyncio.Lock()
+
+def _install_game_data(data) -> None:
+    """
+    Make `data` the current generation. Nothing here awaits, so every command
+    step runs entirely on the old generation or entirely on the new one; a
+    GameData is never changed after it is built, so anything a running command
+    still holds from the old one stays valid.
+    """
+    global GAME_DATA, townspeople_data, building_data, events_data, fish_data, seasons_data, crops_data, community_data
+    global upgrades_data, trees_data, BUNDLE_NAME_TO_ROOM, ITEM_TO_BUNDLES, BUNDLE_LAYOUT, NAMES, GIFTS, SEARCH, FISH_INDEX
+    global SEASON_CATEGORIES, SEASON_ITEM_BUNDLE_MATCHES, CROP_PLANS, BUNDLE_PLANNER, DIGEST_DAYS, AUTOCOMPLETE_NEEDED_MASKS
+    GAME_DATA = data
+    townspeople_data = data.townspeople
+    building_data = data.building
+    events_data = data.events
+    fish_data = data.fish
+    seasons_data = data.seasons
+    crops_data = data.crops
+    community_data = data.community
+    upgrades_data = data.upgrades
+    trees_data = data.trees
+    BUNDLE_NAME_TO_ROOM = data.bundle_name_to_room
+    ITEM_TO_BUNDLES = data.item_to_bundles
+    BUNDLE_LAYOUT = data.layout
+    NAMES = data.names
+    GIFTS = data.gifts
+    SEARCH = data.search
+    FISH_INDEX = data.fish_index
+    SEASON_CATEGORIES = data.season_categories
+    SEASON_ITEM_BUNDLE_MATCHES = data.season_item_bundle_matches
+    CROP_PLANS = data.crop_plans
+    BUNDLE_PLANNER = data.bundle_plans
+    DIGEST_DAYS = data.digest_days
+    AUTOCOMPLETE_NEEDED_MASKS = data.needed_masks
+    # Loaded guilds keep their bitmask over the old layout and are remapped by
+    # item name when next read; the store holds names, so nothing is rewritten.
+    STATE_CACHE.set_layout(data.layout)
+    BUNDLE_PLANS.clear()
+    RENDERS.invalidate()
+
+async def _reload_game_data() -> str:
+    """Read, validate and index the data files off the event loop, then swap them in if they changed."""
+    async with _DATA_RELOAD_LOCK:
+        old = GAME_DATA
+        try:
+            data = await asyncio.get_running_loop().run_in_executor(None, load_game_data, DATA_DIR, DATA_SNAPSHOT_PATH)
+        except DataError as e:
+            DATA_RELOADS.inc('invalid')
+            return f"Kept the current game data; the files on disk are invalid: {e}"
+        if data.source_hash == old.source_hash:
+            DATA_RELOADS.inc('unchanged')
+            return "Game data is already up to date."
+        _install_game_data(data)
+        DATA_RELOADS.inc('reloaded')
+        old_items, new_items = set(old.layout.items), set(data.layout.items)
+        return (f"Reloaded game data: {len(new_items - old_items)} bundle items added, "
+                f"{len(old_items - new_items)} removed.")
+
+async def _watch_game_data() -> None:
+    """Reload whenever a data file's modification time changes (DATA_RELOAD_INTERVAL)."""
+    loop = asyncio.get_running_loop()
+    seen = await loop.run_in_executor(None, source_mtimes, DATA_DIR)
+    while True:
+        await asyncio.sleep(DATA_RELOAD_INTERVAL)
+        mtimes = await loop.run_in_executor(None, source_mtimes, DATA_DIR)
+        if mtimes != seen:
+            seen = mtimes
+            try:
+                print(await _reload_game_data())
+            except Exception as e:
+                print("Game data reload failed:", repr(e))
+
+
+########################
+# PROFILING
+########################
+
+# Longest `!junimo profile` window, and the share of wall time the sampler may
+# hold the GIL for before it samples less often.
+PROFILE_MAX_SECONDS = 120
+PROFILE_MAX_OVERHEAD = 0.02
+_PROFILE_LOCK = asyncio.Lock()
+# Log commands that block the event loop longer than this many milliseconds;
+# unset or 0 is off until `!junimo profile blocks <ms>`.
+LOOP_BLOCK_THRESHOLD_MS = float(os.getenv('LOOP_BLOCK_THRESHOLD_MS') or 0)
+LOOP_BLOCKS = METRICS.add(metrics.Counter('sdv_event_loop_blocks_total', "Event loop blocks over the threshold, by command.", ('command',)))
+BLOCK_WATCH: BlockWatch | None = None
+
+def _log_block(command: str, seconds: float, stack: str) -> None:
+    LOOP_BLOCKS.inc(command)
+    print(f"Event loop blocked for {seconds * 1000:.0f}ms by {command}:\n{stack}", end='')
+
+def _watch_blocks(threshold_ms: float) -> None:
+    """Replace the block watch with one at `threshold_ms` (0 stops it)."""
+    global BLOCK_WATCH
+    if BLOCK_WATCH is not None:
+        BLOCK_WATCH.stop()
+        BLOCK_WATCH = None
+    if threshold_ms > 0:
+        BLOCK_WATCH = BlockWatch(threshold_ms / 1000, _log_block)
+        BLOCK_WATCH.start()
+
+def _mark_command(name: str) -> None:
+    """Tell the block watch which command the current task is running."""
+    if BLOCK_WATCH is not None:
+        task = asyncio.current_task()
+        if task is not None:
+            BLOCK_WATCH.running[task] = name
+
+def _format_profile(result) -> str:
+    total = result.samples or 1
+    header = (f"Profiled {result.seconds:.1f}s: {result.samples} samples, every {result.interval * 1000:g}ms at the end "
+              f"(overhead {result.overhead:.2%}); the loop was busy in {result.busy / total:.0%} of them.")
+    rows = [f"{'incl':>6} {'self':>6}  function"]
+    for name, inclusive, own in result.top(15):
+        rows.append(f"{inclusive / total:>6.1%} {own / total:>6.1%}  {name[-60:]}")
+    return header + "\n```\n" + "\n".join(rows) + "\n```"
 
 
 ########################################
 # BUNDLE COMMAND GROUP (with persistence)
 ########################################
 
+def _bundle_item_lines(item_name: str) -> str:
+    matches = ITEM_TO_BUNDLES[item_name.lower()]
+    lines = [f"**{item_name}** appears in:", *(f"- {room} → {bundle}" for room, bundle in matches)]
+    loves, likes = _gift_tiers(bundle_base_name(item_name))
+    if loves:
+        lines.append(f"Loved by: {_villager_list(loves)}")
+    if likes:
+        lines.append(f"Liked by: {_villager_list(likes, loves)}")
+    return '\n'.join(lines)
+
 @bot.group(name='bundle', invoke_without_command=True)
 async def bundle(ctx, *query: str):
     """Default: show overview or search by item/room/bundle depending on args."""
-    _init_bundles_state_for_guild(ctx.guild.id)
+    await _init_bundles_state_for_guild(ctx.guild.id)
     q = " ".join(query).strip()
     if not q:
         return await _send_bundles_overview(ctx)
 
-    # First try exact room match
-    room_name = next((r for r in community_data.keys() if r.lower() == q.lower()), None)
+    # First try room match
+    room_name = NAMES.resolve('room', q)
     if room_name:
         return await _send_room_status(ctx, room_name)
 
     # Then try bundle name
-    bkey = next((b for b in BUNDLE_NAME_TO_ROOM.keys() if b == q.lower()), None)
-    if bkey:
-        room, bundle = BUNDLE_NAME_TO_ROOM[bkey]
+    bundle_name = NAMES.resolve('bundle', q)
+    if bundle_name:
+        room, bundle = BUNDLE_NAME_TO_ROOM[bundle_name.lower()]
         return await _send_bundle_status(ctx, room, bundle)
 
     # Lastly treat as item search
-    matches = ITEM_TO_BUNDLES.get(q.lower())
-    if matches:
-        lines = [f"**{q}** appears in:", *(f"- {room} → {bundle}" for room, bundle in matches)]
-        return await ctx.send('\n'.join(lines))
-
-    # Add the room-level reward (capital "Reward" in communitycenter.json)
-    room_reward = room.get('Reward')
-    if room_reward:
-        embed.set_footer(text=f"Room Reward: {room_reward}")
+    item_name = NAMES.resolve('item', q)
+    if item_name:
+        return await ctx.send(_bundle_item_lines(item_name))
 
-    await ctx.send("No matching room, bundle, or item found. Try `!bundle`, `!bundle <room>`, `!bundle <bundle name>`, or `!bundle find <item>`.")
+    suggestions = NAMES.suggest_any(('room', 'bundle', 'item'), q)
+    hint = (" Did you mean " + ", ".join(f"**{name}**" for _, name in suggestions) + "?") if suggestions else ""
+    await ctx.send(f"No matching room, bundle, or item found.{hint} Try `!bundle`, `!bundle <room>`, `!bundle <bundle name>`, or `!bundle find <item>`.")
 
 @bundle.command(name='find')
 async def bundle_find(ctx, *item: str):
-    _init_bundles_state_for_guild(ctx.guild.id)
+    await _init_bundles_state_for_guild(ctx.guild.id)
     q = " ".join(item).strip()
-    matches = ITEM_TO_BUNDLES.get(q.lower())
-    if not matches:
-        return await ctx.send(f"No bundles use '{q}'.")
-    lines = [f"**{q}** appears in:"] + [f"- {room} → {bundle}" for room, bundle in matches]
-    await ctx.send('\n'.join(lines))
+    item_name = NAMES.resolve('item', q)
+    if not item_name:
+        return await ctx.send(f"No bundles use '{q}'.{_did_you_mean('item', q)}")
+    await ctx.send(_bundle_item_lines(item_name))
 
 @bundle.command(name='status')
 async def bundle_status(ctx, *name: str):
-    _init_bundles_state_for_guild(ctx.guild.id)
+    await _init_bundles_state_for_guild(ctx.guild.id)
     q = " ".join(name).strip()
     if not q:
         return await _send_bundles_overview(ctx)
     # room or bundle
-    room_name = next((r for r in community_data.keys() if r.lower() == q.lower()), None)
+    room_name = NAMES.resolve('room', q)
     if room_name:
         return await _send_room_status(ctx, room_name)
-    bkey = next((b for b in BUNDLE_NAME_TO_ROOM.keys() if b == q.lower()), None)
-    if bkey:
-        room, bundle = BUNDLE_NAME_TO_ROOM[bkey]
+    bundle_name = NAMES.resolve('bundle', q)
+    if bundle_name:
+        room, bundle = BUNDLE_NAME_TO_ROOM[bundle_name.lower()]
         return await _send_bundle_status(ctx, room, bundle)
-    await ctx.send("Not found. Use a room or bundle name.")
+    suggestions = NAMES.suggest_any(('room', 'bundle'), q)
+    hint = (" Did you mean " + ", ".join(f"**{name}**" for _, name in suggestions) + "?") if suggestions else ""
+    await ctx.send(f"Not found. Use a room or bundle name.{hint}")
+
+async def _set_item_from_command(ctx, bundle_name: str, item_name: str, checked: bool):
+    """Shared body of `!bundle check` / `!bundle uncheck`."""
+    await _init_bundles_state_for_guild(ctx.guild.id)
+    resolved = NAMES.resolve('bundle', bundle_name)
+    if not resolved:
+        return await ctx.send(f"Bundle not found.{_did_you_mean('bundle', bundle_name)} Tip: wrap bundle names with spaces in quotes.")
+    room, bundle = BUNDLE_NAME_TO_ROOM[resolved.lower()]
+
+    item = NAMES.resolve(f'item:{bundle}', item_name)
+    if not item:
+        return await ctx.send(f"'{item_name}' is not part of {bundle}.{_did_you_mean(f'item:{bundle}', item_name)}")
+
+    _set_bundle_item(ctx.guild.id, room, bundle, item, checked, ctx.author.id)
+    await _send_bundle_status(ctx, room, bundle)
 
 @bundle.command(name='check')
 async def bundle_check(ctx, bundle_name: str, *, item_name: str):
     """Mark an item complete. Usage: !bundle check "<Bundle Name>" <Item Name>"""
-    state = _init_bundles_state_for_guild(ctx.guild.id)
-    gid = str(ctx.guild.id)
-    bkey = bundle_name.lower()
-    if bkey not in BUNDLE_NAME_TO_ROOM:
-        return await ctx.send("Bundle not found. Tip: wrap bundle names with spaces in quotes.")
-    room, bundle = BUNDLE_NAME_TO_ROOM[bkey]
-    try:
-        current = state[gid][room][bundle]['items']
-    except KeyError:
-        return await ctx.send("State not initialized correctly. Try again.")
-
-    ikey = next((k for k in current.keys() if k.lower() == item_name.lower()), None)
-    if not ikey:
-        return await ctx.send(f"'{item_name}' is not part of {bundle}.")
-
-    current[ikey] = True
-    _save_bundles_state(state)
-    await _send_bundle_status(ctx, room, bundle)
+    await _set_item_from_command(ctx, bundle_name, item_name, True)
 
 @bundle.command(name='uncheck')
 async def bundle_uncheck(ctx, bundle_name: str, *, item_name: str):
     """Mark an item incomplete. Usage: !bundle uncheck "<Bundle Name>" <Item Name>"""
-    state = _init_bundles_state_for_guild(ctx.guild.id)
-    gid = str(ctx.guild.id)
-    bkey = bundle_name.lower()
-    if bkey not in BUNDLE_NAME_TO_ROOM:
-        return await ctx.send("Bundle not found. Tip: wrap bundle names with spaces in quotes.")
-    room, bundle = BUNDLE_NAME_TO_ROOM[bkey]
-    try:
-        current = state[gid][room][bundle]['items']
-    except KeyError:
-        return await ctx.send("State not initialized correctly. Try again.")
-
-    ikey = next((k for k in current.keys() if k.lower() == item_name.lower()), None)
-    if not ikey:
-        return await ctx.send(f"'{item_name}' is not part of {bundle}.")
-
-    current[ikey] = False
-    _save_bundles_state(state)
-    await _send_bundle_status(ctx, room, bundle)
+    await _set_item_from_command(ctx, bundle_name, item_name, False)
 
 @bundle.command(name='reset')
 async def bundle_reset(ctx, scope: str = 'all'):
     """Reset bundle progress. Usage: !bundle reset [all]"""
     if scope.lower() != 'all':
         return await ctx.send("For now, only `!bundle reset all` is supported.")
-    state = _load_bundles_state()
-    if str(ctx.guild.id) in state:
-        del state[str(ctx.guild.id)]
-    _save_bundles_state(state)
-    _init_bundles_state_for_guild(ctx.guild.id)
-    await ctx.send("All bundle progress reset for this server.")
+    await _init_bundles_state_for_guild(ctx.guild.id)
+    STATE_CACHE.reset_guild(ctx.guild.id, ctx.author.id)
+    await ctx.send("All bundle progress reset for this server. Changed your mind? Use `!bundle undo`.")
+
+@bundle.command(name='history')
+async def bundle_history(ctx, n: int = 10):
+    """Show the most recent bundle changes. Usage: !bundle history [n]"""
+    await _init_bundles_state_for_guild(ctx.guild.id)
+    n = max(1, min(n, BUNDLE_HISTORY_MAX))
+    ops = STATE_CACHE.history(ctx.guild.id, n)
+    if not ops:
+        return await ctx.send("No bundle changes recorded for this server yet.")
+    embed = discord.Embed(title="Bundle History", description='\n'.join(_describe_bundle_op(op) for op in ops), color=0x34a853)
+    await ctx.send(embed=embed)
+
+@bundle.command(name='undo')
+async def bundle_undo(ctx):
+    """Revert the most recent bundle change for this server."""
+    await _init_bundles_state_for_guild(ctx.guild.id)
+    result = STATE_CACHE.undo(ctx.guild.id, ctx.author.id)
+    if result is None:
+        return await ctx.send("Nothing to undo.")
+    _, reverted = result
+    await ctx.send(f"Undid {_describe_bundle_op(reverted)}", allowed_mentions=discord.AllowedMentions.none())
+    if reverted.action in ('check', 'uncheck'):
+        room, bundle_name = reverted.changes[0][0], reverted.changes[0][1]
+        if bundle_name in community_data.get(room, {}).get('Bundles', {}):
+            await _send_bundle_status(ctx, room, bundle_name)
+
+async def _import_save(ctx, attachment: discord.Attachment | None):
+    """Shared body of `!bundle import` / `/bundle import`."""
+    if attachment is None:
+        return await ctx.send("Attach your save file to the command. It's the file named like `Farm_123456789` inside your save folder.")
+    if attachment.size > SAVE_IMPORT_MAX_BYTES:
+        return await ctx.send(f"That file is too big to be a save file (limit {SAVE_IMPORT_MAX_BYTES // (1024 * 1024)} MB).")
+    await _init_bundles_state_for_guild(ctx.guild.id)
+    data = await attachment.read()
+    try:
+        result = await asyncio.get_running_loop().run_in_executor(None, read_save, data, BUNDLE_LAYOUT, NAMES)
+    except SaveImportError as e:
+        return await ctx.send(str(e))
+    op = STATE_CACHE.replace_guild(ctx.guild.id, result.checked, ctx.author.id)
+    print(f"Save import for guild {ctx.guild.id}: {len(data)} bytes in {result.seconds * 1000:.0f}ms, rss +{result.rss_growth_bytes} bytes")
+
+    lines = [
+        f"Imported **{len(result.checked)}** checked items from `{attachment.filename}` ({len(op.changes)} changed).",
+        f"Read {len(data) / 1e6:.1f} MB in {result.seconds * 1000:.0f} ms"
+        + (f", memory +{result.rss_growth_bytes / 1e6:.1f} MB." if result.rss_growth_bytes is not None else "."),
+    ]
+    if result.unmatched:
+        shown = ", ".join(result.unmatched[:5]) + (f" and {len(result.unmatched) - 5} more" if len(result.unmatched) > 5 else "")
+        lines.append(f"Couldn't match: {shown}.")
+    lines.append("Use `!bundle` to see your progress, or `!bundle undo` to put it back.")
+    await ctx.send('\n'.join(lines))
+
+@bundle.command(name='import')
+async def bundle_import(ctx):
+    """Replace this server's progress with the Community Center state from an attached save file."""
+    attachments = ctx.message.attachments if ctx.message else []
+    await _import_save(ctx, attachments[0] if attachments else None)
 
 @bundle.command(name='incomplete')
 async def bundle_incomplete(ctx):
     """List only incomplete bundles grouped by room, with items under each."""
-    state = _init_bundles_state_for_guild(ctx.guild.id)
-    gid = str(ctx.guild.id)
+    progress = await _init_bundles_state_for_guild(ctx.guild.id)
 
     fields = []
-    for room_name, room in community_data.items():
+    for room_name, slots in BUNDLE_LAYOUT.rooms.items():
         bundle_texts = []
-        for b_name, canonical in room.get('Bundles', {}).items():
-            amount = canonical.get('amount', 0)
-            current = state[gid].get(room_name, {}).get(b_name, {}).get('items', {})
-            count_true = sum(1 for v in current.values() if v)
-            if count_true < amount:
+        for slot in slots:
+            if not progress.is_complete(slot):
                 # Bundle header with progress
-                header = f"⬜ {b_name} ({count_true}/{amount})"
+                header = f"⬜ {slot.name} ({progress.completed(slot)}/{slot.amount})"
                 # Items with strikethrough if completed
-                items_text = _format_bundle_items(canonical['items'], current)
+                items_text = _format_bundle_items(progress, slot)
                 bundle_texts.append(f"**{header}**\n{items_text}")
         if bundle_texts:
-            fields.append((room_name, "\n\n".join(bundle_texts)[:1024], False))
+            fields.append((room_name, "\n\n".join(bundle_texts), False))
 
     if not fields:
         return await ctx.send("All bundles are complete. 🎉")
 
-    embed = make_embed(title="Incomplete Bundles", color=0xd2691e, fields=fields)
-    await ctx.send(embed=embed)
+    await _send_embeds(ctx, make_embeds(title="Incomplete Bundles", color=0xd2691e, fields=fields))
+
+BUNDLE_PLANNER = GAME_DATA.bundle_plans
+# (layout version, checked-item mask, start day of the year) -> BundlePlan. A plan depends
+# on nothing else, so equal progress shares one and entries never go stale; the oldest is dropped.
+BUNDLE_PLANS: dict[tuple[int, int, int], BundlePlan] = {}
+BUNDLE_PLANS_MAX = 1024
+
+async def _bundle_plan(progress: GuildProgress, start: int) -> BundlePlan:
+    key = (progress.version, progress.mask, start)
+    plan = BUNDLE_PLANS.get(key)
+    if plan is None:
+        plan = await asyncio.get_running_loop().run_in_executor(None, BUNDLE_PLANNER.plan, progress.mask, start)
+        if len(BUNDLE_PLANS) >= BUNDLE_PLANS_MAX:
+            del BUNDLE_PLANS[next(iter(BUNDLE_PLANS))]
+        BUNDLE_PLANS[key] = plan
+    return plan
+
+def _plan_date(number: int) -> str:
+    season, day, year = date_parts(number)
+    return f"{season} {day}" + (" (next year)" if year > 1 else "")
+
+def _plan_step_line(step) -> str:
+    if step.kind == CROP:
+        what = f"Plant {step.source} for **{step.item}**, ready {_plan_date(step.ready)}"
+    elif step.kind == TREE:
+        what = f"Plant a {step.source} sapling for **{step.item}**, fruiting {_plan_date(step.ready)}"
+    elif step.kind == FISH:
+        what = f"Catch **{step.item}**" + (" (rainy day)" if step.rain_only else "")
+    else:
+        what = f"Forage **{step.item}**"
+    return f"- {what} – {step.bundle}"
+
+@bundle.command(name='plan')
+async def bundle_plan(ctx, *args: str):
+    """When to get each item still needed. Usage: !bundle plan [from <season> <day>]"""
+    progress = await _init_bundles_state_for_guild(ctx.guild.id)
+    words = [a.lower() for a in args]
+    if words[:1] == ['from']:
+        words.pop(0)
+    if words:
+        s = words[0].capitalize()
+        if s not in SEASONS or len(words) > 2 or (len(words) == 2 and not (words[1].isdigit() and 1 <= int(words[1]) <= DAYS_PER_SEASON)):
+            return await ctx.send("Usage: `!bundle plan [from <season> <day>]`, e.g. `!bundle plan from summer 5`.")
+        start = day_number(s, int(words[1]) if len(words) == 2 else 1)
+    else:
+        # Default to the server's farm date, if it has one.
+        cal = FARM_CALENDARS.get(ctx.guild.id)
+        start = cal.today() % DAYS_PER_YEAR if cal is not None else 0
+
+    plan = await _bundle_plan(progress, start)
+    if not plan.rooms:
+        return await ctx.send("All bundles are complete. 🎉")
+    rooms = []
+    for room_name, done in plan.rooms:
+        rooms.append(f"**{room_name}** – " + ("can't be finished" if done is None else f"done by {_plan_date(done)}"))
+    fields = [("Rooms", '\n'.join(rooms), False)]
+    days: dict[int, list[str]] = {}
+    for step in plan.steps:
+        days.setdefault(step.day, []).append(_plan_step_line(step))
+    for day, lines in days.items():
+        fields.append((_plan_date(day), '\n'.join(lines), False))
+    if plan.any_time:
+        fields.append(("Any Time", ', '.join(f"{step.item} ({step.bundle})" for step in plan.any_time), False))
+    if plan.next_year:
+        fields.append(("Not Until Next Year", ', '.join(step.item for step in plan.next_year), False))
+    if plan.blocked:
+        fields.append(("No Way to Get", ', '.join(f"{step.item} ({step.bundle})" for step in plan.blocked), False))
+    await _send_embeds(ctx, make_embeds(title=f"Bundle Plan from {_plan_date(start)}", color=0xd2691e, fields=fields))
 
 ############################
 # Bundle display helpers
 ############################
 
-def _format_bundle_items(canonical_items: dict[str, bool], current_checks: dict[str, bool]) -> str:
+def _describe_bundle_op(op) -> str:
+    """One history line, e.g. "`#12` <t:...:R> @user checked Poppy (Chef's Bundle)"."""
+    who = f"<@{op.user_id}>" if op.user_id else "Someone"
+    if op.action == 'reset':
+        what = "reset all bundle progress"
+    elif op.action == 'undo':
+        what = f"undid `#{op.target}`"
+    elif op.action == 'import':
+        what = f"imported a save file ({len(op.changes)} changes)"
+    else:
+        _, bundle_name, item_name, _ = op.changes[0]
+        what = f"{op.action}ed {item_name} ({bundle_name})"
+    return f"`#{op.seq}` <t:{int(op.ts)}:R> {who} {what}"
+
+def _format_bundle_items(progress: GuildProgress, slot) -> str:
     lines = []
-    for item_name in canonical_items.keys():
-        checked = current_checks.get(item_name, False)
+    for bit in range(slot.start, slot.stop):
+        item_name = BUNDLE_LAYOUT.items[bit][2]
         # strike through when turned in
-        line = f"• ~~{item_name}~~" if checked else f"• {item_name}"
+        line = f"• ~~{item_name}~~" if progress.is_checked(bit) else f"• {item_name}"
         lines.append(line)
     return "\n".join(lines)
 
 async def _send_bundles_overview(ctx):
-    # Show every room with detailed bundle breakdown
+    # Show every room with detailed bundle breakdown, from one read of the
+    # progress, packed into as few messages as Discord allows.
+    progress = await _init_bundles_state_for_guild(ctx.guild.id)
+    embeds = []
     for room_name in community_data.keys():
-        await _send_room_status(ctx, room_name)
+        embeds += _room_embeds(progress, room_name)
+    await _send_embeds(ctx, embeds)
 
 
-def _room_completion_counts(guild_state: dict, room_name: str, bundles_dict: dict):
-    completed = 0
-    total = len(bundles_dict)
-    for b_name, bundle in bundles_dict.items():
-        amount_needed = bundle.get('amount', 0)
-        current = guild_state.get(room_name, {}).get(b_name, {}).get('items', {})
-        count_true = sum(1 for v in current.values() if v)
-        if count_true >= amount_needed:
-            completed += 1
-    return completed, total
-
-async def _send_room_status(ctx, room_name: str):
-    state = _init_bundles_state_for_guild(ctx.guild.id)
-    gid = str(ctx.guild.id)
-
-    room = community_data.get(room_name, {})
-    bundles = room.get('Bundles', {})
+def _room_completion_counts(progress: GuildProgress, room_name: str):
+    slots = BUNDLE_LAYOUT.rooms.get(room_name, [])
+    completed = sum(1 for slot in slots if progress.is_complete(slot))
+    return completed, len(slots)
 
+def _room_embeds(progress: GuildProgress, room_name: str) -> list[discord.Embed]:
     fields = []
-    for b_name, bundle in bundles.items():
-        amount = bundle.get('amount', 0)
-        current = state[gid].get(room_name, {}).get(b_name, {}).get('items', {})
-        count_true = sum(1 for v in current.values() if v)
-        is_complete = count_true >= amount
-        status = "✅ Completed" if is_complete else f"⬜ {count_true}/{amount}"
+    for slot in BUNDLE_LAYOUT.rooms.get(room_name, []):
+        count_true = progress.completed(slot)
+        is_complete = count_true >= slot.amount
+        status = "✅ Completed" if is_complete else f"⬜ {count_true}/{slot.amount}"
 
         # For incomplete bundles, list items with strikethrough on ones already turned in.
         if not is_complete:
-            items_text = _format_bundle_items(bundle["items"], current)
+            items_text = _format_bundle_items(progress, slot)
             # put status on top, items under it
             value = f"{status}\n{items_text}"
         else:
             value = status
 
-        # Respect embed field length limits
-        fields.append((b_name, value[:1024], False))
+        fields.append((slot.name, value, False))
 
-    embed = make_embed(title=f"{room_name} – Bundles", color=0x34a853, fields=fields)
-    await ctx.send(embed=embed)
+    return make_embeds(title=f"{room_name} – Bundles", color=0x34a853, fields=fields)
+
+async def _send_room_status(ctx, room_name: str):
+    progress = await _init_bundles_state_for_guild(ctx.guild.id)
+    await _send_embeds(ctx, _room_embeds(progress, room_name))
 
 async def _send_bundle_status(ctx, room_name: str, bundle_name: str):
-    state = _init_bundles_state_for_guild(ctx.guild.id)
-    gid = str(ctx.guild.id)
+    progress = await _init_bundles_state_for_guild(ctx.guild.id)
 
     canonical = community_data[room_name]['Bundles'][bundle_name]
-
-    current = state[gid][room_name][bundle_name]['items']
-    amount = canonical.get('amount', 0)
+    slot = BUNDLE_LAYOUT.bundle_by_name[bundle_name]
+    amount = slot.amount
     reward = canonical.get('reward', '')
     image = canonical.get('image')
 
     lines = []
-    count_true = 0
-    for item_name in canonical['items'].keys():
-        checked = current.get(item_name, False)
-        lines.append(f"{'✅' if checked else '⬜'} {item_name}")
+    for bit in range(slot.start, slot.stop):
+        lines.append(f"{'✅' if progress.is_checked(bit) else '⬜'} {BUNDLE_LAYOUT.items[bit][2]}")
         lines.append("\u200b")
-        if checked:
-            count_true += 1
+    count_true = progress.completed(slot)
 
     footer = f"Progress: {count_true}/{amount} | Reward: {reward}" if reward else f"Progress: {count_true}/{amount}"
-    embed = make_embed(title=f"{bundle_name} ({room_name})", color=0x34a853, thumb=image, fields=[("Items", '\n'.join(lines)[:1024], False), ("Status", footer, False)])
+    embed = make_embed(title=f"{bundle_name} ({room_name})", color=0x34a853, thumb=image, fields=[("Items", '\n'.join(lines), False), ("Status", footer, False)])
     await ctx.send(embed=embed)
 
+########################
+# CALENDAR + DAILY DIGEST
+########################
+
+# guild id -> its farm calendar (see farm_calendar.py). Loaded once; changes are written through.
+FARM_CALENDARS: dict[int, FarmCalendar] = {int(gid): FarmCalendar.from_dict(d) for gid, d in STATE_STORE.load_calendars().items()}
+DIGEST_DAYS = GAME_DATA.digest_days
+
+async def _digest_embeds(guild_id: int, number: int) -> list[discord.Embed]:
+    """A farm day's digest: the precomputed DigestDay plus the fish this guild still needs."""
+    progress = await _init_bundles_state_for_guild(guild_id)
+    day = DIGEST_DAYS[number % DAYS_PER_YEAR]
+    fields = [("Events", '\n'.join(f"- {event}" for event in day.events) or "Nothing special today.", False)]
+    if day.birthdays:
+        fields.append(("Birthdays", '\n'.join(f"**{name}** loves {', '.join(loves) or '—'}" for name, loves in day.birthdays), False))
+    days_left = DAYS_PER_SEASON - day.day + 1
+    crops = '\n'.join(f"{row.name} – {row.gold_per_day:,.1f}g/day, {row.harvests} harvest{'s' if row.harvests != 1 else ''}"
+                      for row in day.crops)
+    fields.append((f"Plant Now ({days_left} day{'s' if days_left != 1 else ''} left)",
+                   crops or "Nothing planted today is ready before the season ends.", False))
+    fish_needed = FISH_INDEX.fish_names(FISH_INDEX.needed(day.bundle_fish, BUNDLE_LAYOUT.needed_mask(progress)))
+    fields.append(("Fish for Bundles", ', '.join(fish_needed) or "No bundle needs a fish from this season.", False))
+    return make_embeds(title=f"📅 {format_date(number)}", color=0x5c15ad, fields=fields)
+
+async def _save_calendar(guild_id: int, calendar: FarmCalendar | None) -> None:
+    if calendar is None:
+        FARM_CALENDARS.pop(guild_id, None)
+    else:
+        FARM_CALENDARS[guild_id] = calendar
+    await asyncio.get_running_loop().run_in_executor(
+        None, STATE_STORE.save_calendar, str(guild_id), calendar.to_dict() if calendar else None)
+    DIGESTS.schedule(guild_id, calendar.next_digest(time.time()) if calendar else None)
+
+async def _fire_digest(guild_id: int, due: float) -> None:
+    """Post one guild's digest (called by DIGESTS) and schedule its next one."""
+    calendar = FARM_CALENDARS.get(guild_id)
+    if calendar is None or not calendar.has_digest:
+        return
+    DIGESTS.schedule(guild_id, calendar.next_digest(due))
+    guild = bot.get_guild(guild_id)
+    channel = guild.get_channel(calendar.channel_id) if guild is not None else None
+    if channel is None:
+        # The bot left the guild, or the channel was deleted.
+        DIGESTS_SKIPPED.inc()
+        return
+    await _send_embeds(channel, await _digest_embeds(guild_id, calendar.today(due)))
+
+# One heap of next-digest times for every guild, served by one task.
+DIGESTS = DigestScheduler(_fire_digest)
+DIGESTS_SKIPPED = METRICS.add(metrics.Counter('sdv_digests_skipped_total', "Digests not sent because the guild or channel is gone."))
+METRICS.add(metrics.Gauge('sdv_digests', "Daily digest scheduler: guilds scheduled, digests fired and failed.",
+                          lambda: {('scheduled',): len(DIGESTS), ('fired',): DIGESTS.fired, ('failed',): DIGESTS.failed}, ('stat',)))
+
+def _schedule_digest(guild_id: int) -> None:
+    """Schedule a guild's digest from its stored calendar, unless it is already scheduled."""
+    calendar = FARM_CALENDARS.get(guild_id)
+    if calendar is not None and guild_id not in DIGESTS:
+        DIGESTS.schedule(guild_id, calendar.next_digest(time.time()))
+
+async def _run_digests() -> None:
+    await bot.wait_until_ready()
+    for guild_id in FARM_CALENDARS:
+        # Other clusters post for guilds on their shards.
+        if bot.get_guild(guild_id) is not None:
+            _schedule_digest(guild_id)
+    await DIGESTS.run()
+
+# Guilds that were unavailable at startup, come back with a shard reconnect,
+# or re-add the bot get their stored digest back.
+@bot.listen('on_guild_available')
+async def _digest_on_guild_available(guild):
+    _schedule_digest(guild.id)
+
+@bot.listen('on_guild_join')
+async def _digest_on_guild_join(guild):
+    _schedule_digest(guild.id)
+
+@bot.listen('on_guild_remove')
+async def _digest_on_guild_remove(guild):
+    DIGESTS.schedule(guild.id, None)
+
+def _digest_note(calendar: FarmCalendar) -> str:
+    if not calendar.has_digest:
+        return ""
+    return f" The daily digest posts in <#{calendar.channel_id}> at {format_time_of_day(calendar.digest_minute)}."
+
+@bot.group(name='calendar', invoke_without_command=True)
+@commands.guild_only()
+async def calendar(ctx):
+    """Today's digest for this server's farm."""
+    cal = FARM_CALENDARS.get(ctx.guild.id)
+    if cal is None:
+        return await ctx.send("This server hasn't set its farm date yet. Use `!calendar set <season> <day> [year]`.")
+    await _send_embeds(ctx, await _digest_embeds(ctx.guild.id, cal.today()))
+
+@calendar.command(name='set')
+async def calendar_set(ctx, season: str, day: str, year: str = '1'):
+    """Set the farm's current date. Usage: !calendar set <season> <day> [year]"""
+    s = season.capitalize()
+    if s not in SEASONS:
+        return await ctx.send("Season must be Spring, Summer, Fall, or Winter.")
+    if not day.isdigit() or not 1 <= int(day) <= DAYS_PER_SEASON:
+        return await ctx.send("Day must be a number between 1 and 28.")
+    if not year.isdigit() or int(year) < 1:
+        return await ctx.send("Year must be a number, starting at 1.")
+    number = day_number(s, int(day), int(year))
+    cal = FARM_CALENDARS.get(ctx.guild.id)
+    cal = cal.moved(number) if cal is not None else FarmCalendar(number, time.time())
+    await _save_calendar(ctx.guild.id, cal)
+    await ctx.send(f"Farm date set to **{format_date(number)}**.{_digest_note(cal)}")
+
+@calendar.command(name='next')
+async def calendar_next(ctx, days: int = 1):
+    """Move the farm date forward. Usage: !calendar next [days]"""
+    cal = FARM_CALENDARS.get(ctx.guild.id)
+    if cal is None:
+        return await ctx.send("Set the farm date first: `!calendar set <season> <day> [year]`.")
+    days = max(1, min(days, DAYS_PER_YEAR))
+    cal = cal.moved(cal.today() + days)
+    await _save_calendar(ctx.guild.id, cal)
+    await ctx.send(f"It's now **{format_date(cal.day)}** on the farm.")
+
+@calendar.command(name='digest')
+@commands.has_guild_permissions(manage_guild=True)
+async def calendar_digest(ctx, channel: discord.TextChannel, at: str):
+    """Post a daily digest. Usage: !calendar digest <#channel> <HH:MM UTC>"""
+    cal = FARM_CALENDARS.get(ctx.guild.id)
+    if cal is None:
+        return await ctx.send("Set the farm date first: `!calendar set <season> <day> [year]`.")
+    minute = parse_time_of_day(at)
+    if minute is None:
+        return await ctx.send("Time must be a UTC time of day, like `09:00` or `9pm`.")
+    me = ctx.guild.me
+    if me is not None and not channel.permissions_for(me).send_messages:
+        return await ctx.send(f"I can't send messages in {channel.mention}.")
+    cal = cal.with_digest(channel.id, minute)
+    await _save_calendar(ctx.guild.id, cal)
+    await ctx.send(f"Next digest: **{format_date(cal.day)}**.{_digest_note(cal)} Each digest is the next farm day; "
+                   f"use `!calendar set` if the farm gets ahead or behind.")
+
+@calendar.command(name='stop')
+@commands.has_guild_permissions(manage_guild=True)
+async def calendar_stop(ctx):
+    """Stop the daily digest (the farm date is kept)."""
+    cal = FARM_CALENDARS.get(ctx.guild.id)
+    if cal is None or not cal.has_digest:
+        return await ctx.send("This server has no daily digest.")
+    cal = cal.with_digest(None, None)
+    await _save_calendar(ctx.guild.id, cal)
+    await ctx.send(f"Daily digest stopped. The farm date stays at **{format_date(cal.day)}**.")
+
+########################
+# SLASH COMMANDS
+########################
+# Slash versions of the prefix commands. They reuse the prefix handlers
+# through _SlashContext; autocomplete is answered from the NAMES prefix index
+# and in-memory bundle progress only, well inside Discord's 3 second window.
+
+class _SlashContext:
+    """Just enough of commands.Context for the prefix handlers to answer an interaction."""
+
+    def __init__(self, interaction: discord.Interaction):
+        self.interaction = interaction
+        self.guild = interaction.guild
+        self.author = interaction.user
+        self.command = None
+
+    async def send(self, content=None, **kwargs):
+        self.interaction.extras['api_calls'] = self.interaction.extras.get('api_calls', 0) + 1
+        # The first message answers the interaction; later ones (e.g. overview batches) are followups.
+        if self.interaction.response.is_done():
+            return await self.interaction.followup.send(content, **kwargs)
+        return await self.interaction.response.send_message(content, **kwargs)
+
+
+# Autocomplete name -> bundle bits it can fill (see GameData._build_needed_masks).
+AUTOCOMPLETE_NEEDED_MASKS = GAME_DATA.needed_masks
+
+def _guild_rank(interaction: discord.Interaction):
+    """rank(name): 0 if the guild still needs it for a bundle, else 1. None until the guild is in memory."""
+    if interaction.guild_id is None:
+        return None
+    progress = STATE_CACHE.peek(interaction.guild_id)
+    if progress is None:
+        # Warm the cache for the next keystroke instead of waiting on the store now.
+        asyncio.ensure_future(STATE_CACHE.get(interaction.guild_id))
+        return None
+    needed = BUNDLE_LAYOUT.needed_mask(progress)
+    return lambda name: 0 if AUTOCOMPLETE_NEEDED_MASKS.get(name, 0) & needed else 1
+
+def _choices(names) -> list[app_commands.Choice[str]]:
+    return [app_commands.Choice(name=n[:100], value=n[:100]) for n in names]
+
+def _autocomplete(*kinds: str, ranked: bool = False):
+    """Autocomplete callback over one or more NAMES kinds."""
+    async def complete(interaction: discord.Interaction, current: str) -> list[app_commands.Choice[str]]:
+        rank = _guild_rank(interaction) if ranked else None
+        return _choices(name for _, name in NAMES.complete_any(kinds, current, rank=rank))
+    return complete
+
+async def _bundle_item_autocomplete(interaction: discord.Interaction, current: str) -> list[app_commands.Choice[str]]:
+    """Items of the bundle already picked in the same command, unchecked first."""
+    bundle_name = NAMES.resolve('bundle', getattr(interaction.namespace, 'bundle', None) or '')
+    if not bundle_name:
+        return _choices(NAMES.complete('item', current, rank=_guild_rank(interaction)))
+    progress = STATE_CACHE.peek(interaction.guild_id) if interaction.guild_id else None
+    rank = None
+    if progress is not None:
+        rank = lambda item: int(progress.is_checked(BUNDLE_LAYOUT.bit(bundle_name, item)))
+    return _choices(NAMES.complete(f'item:{bundle_name}', current, rank=rank))
+
+SeasonChoice = Literal['Spring', 'Summer', 'Fall', 'Winter']
+
+@bot.tree.command(name='gift', description="A villager's loved and liked gifts")
+@app_commands.autocomplete(villager=_autocomplete('villager'))
+async def slash_gift(interaction: discord.Interaction, villager: str):
+    await gift.callback(_SlashContext(interaction), townsperson=villager)
+
+@bot.tree.command(name='gift-who', description="Villagers who love or like an item")
+@app_commands.autocomplete(item=_autocomplete('gift'))
+async def slash_gift_who(interaction: discord.Interaction, item: str):
+    await gift_who.callback(_SlashContext(interaction), item=item)
+
+@bot.tree.command(name='search', description="Search all the game data: fish, crops, villagers, buildings, bundles, events")
+async def slash_search(interaction: discord.Interaction, terms: str):
+    await search.callback(_SlashContext(interaction), terms=terms)
+
+@bot.tree.command(name='char', description="A villager's birthday, picture, and schedule link")
+@app_commands.autocomplete(villager=_autocomplete('villager'))
+async def slash_char(interaction: discord.Interaction, villager: str):
+    await char.callback(_SlashContext(interaction), townsperson=villager)
+
+@bot.tree.command(name='build', description="Cost and materials for a farm building")
+@app_commands.autocomplete(building=_autocomplete('building'))
+async def slash_build(interaction: discord.Interaction, building: str):
+    await build.callback(_SlashContext(interaction), building)
+
+@bot.tree.command(name='fish', description="Where and when to catch a fish")
+@app_commands.autocomplete(name=_autocomplete('fish', ranked=True))
+async def slash_fish(interaction: discord.Interaction, name: str):
+    await fish.callback(_SlashContext(interaction), name)
+
+async def _fish_location_autocomplete(interaction: discord.Interaction, current: str) -> list[app_commands.Choice[str]]:
+    key = current.lower()
+    return _choices([loc for loc in FISH_INDEX.locations if key in loc.lower()][:25])
+
+@bot.tree.command(name='fish-now', description="Fish you can catch at a time of day")
+@app_commands.describe(time="Like 2pm, 6:30am or 23", location="Only this fishing spot", bundle="Only fish still needed for incomplete bundles")
+@app_commands.autocomplete(location=_fish_location_autocomplete)
+async def slash_fish_now(interaction: discord.Interaction, season: SeasonChoice, time: str,
+                         weather: Literal['sun', 'rain', 'wind'] | None = None, location: str | None = None, bundle: bool = False):
+    args = ([weather] if weather else []) + ([location] if location else []) + (['bundle'] if bundle else [])
+    await fish_now.callback(_SlashContext(interaction), season, time, *args)
+
+@bot.tree.command(name='crop', description="How to grow a crop")
+@app_commands.autocomplete(name=_autocomplete('crop', ranked=True))
+async def slash_crop(interaction: discord.Interaction, name: str):
+    await crop.callback(_SlashContext(interaction), name)
+
+@bot.tree.command(name='best-crops', description="Most profitable crops for the days left in a season")
+@app_commands.describe(days_left="Days left in the season, counting today", budget="Gold to spend on seeds")
+async def slash_best_crops(interaction: discord.Interaction, season: SeasonChoice,
+                           days_left: app_commands.Range[int, 1, 28] = 28, budget: app_commands.Range[int, 0] | None = None):
+    await crop_best.callback(_SlashContext(interaction), season, str(days_left), str(budget) if budget is not None else None)
+
+@bot.tree.command(name='upgrade', description="Cost and materials for a tool upgrade")
+@app_commands.autocomplete(tool=_autocomplete('upgrade'))
+async def slash_upgrade(interaction: discord.Interaction, tool: str):
+    await upgrade.callback(_SlashContext(interaction), tool)
+
+@bot.tree.command(name='events', description="Events and birthdays in a season, or on one day")
+async def slash_events(interaction: discord.Interaction, season: SeasonChoice, day: app_commands.Range[int, 1, 28] | None = None):
+    await events.callback(_SlashContext(interaction), season, str(day) if day is not None else None)
+
+@bot.tree.command(name='season', description="Crops, fish, foraging, and trees for a season")
+@app_commands.guild_only()
+@app_commands.rename(season_name='season')
+@app_commands.describe(category="Only show one category", bundle="Only items still needed for incomplete bundles")
+async def slash_season(interaction: discord.Interaction, season_name: SeasonChoice,
+                       category: Literal['crops', 'fish', 'foraging', 'trees'] | None = None, bundle: bool = False):
+    args = ([category] if category else []) + (['bundle'] if bundle else [])
+    await season.callback(_SlashContext(interaction), season_name, *args)
+
+bundle_slash = app_commands.Group(name='bundle', description="Community Center bundles and your server's progress", guild_only=True)
+
+@bundle_slash.command(name='show', description="All bundles, or one room, bundle, or item")
+@app_commands.autocomplete(query=_autocomplete('room', 'bundle', 'item', ranked=True))
+async def slash_bundle_show(interaction: discord.Interaction, query: str | None = None):
+    await bundle.callback(_SlashContext(interaction), *([query] if query else []))
+
+@bundle_slash.command(name='find', description="Which bundles use an item")
+@app_commands.autocomplete(item=_autocomplete('item', ranked=True))
+async def slash_bundle_find(interaction: discord.Interaction, item: str):
+    await bundle_find.callback(_SlashContext(interaction), item)
+
+@bundle_slash.command(name='check', description="Mark a bundle item complete")
+@app_commands.autocomplete(bundle=_autocomplete('bundle', ranked=True), item=_bundle_item_autocomplete)
+async def slash_bundle_check(interaction: discord.Interaction, bundle: str, item: str):
+    await bundle_check.callback(_SlashContext(interaction), bundle, item_name=item)
+
+@bundle_slash.command(name='uncheck', description="Unmark a bundle item")
+@app_commands.autocomplete(bundle=_autocomplete('bundle'), item=_bundle_item_autocomplete)
+async def slash_bundle_uncheck(interaction: discord.Interaction, bundle: str, item: str):
+    await bundle_uncheck.callback(_SlashContext(interaction), bundle, item_name=item)
+
+@bundle_slash.command(name='incomplete', description="Only the bundles still incomplete")
+async def slash_bundle_incomplete(interaction: discord.Interaction):
+    await bundle_incomplete.callback(_SlashContext(interaction))
+
+@bundle_slash.command(name='plan', description="When to get each item your server still needs")
+@app_commands.describe(season="Plan from this season (default: your farm date, or Spring 1)", day="Day of that season")
+async def slash_bundle_plan(interaction: discord.Interaction, season: SeasonChoice | None = None,
+                            day: app_commands.Range[int, 1, DAYS_PER_SEASON] = 1):
+    await bundle_plan.callback(_SlashContext(interaction), *(['from', season, str(day)] if season else []))
+
+@bundle_slash.command(name='history', description="Recent bundle changes")
+async def slash_bundle_history(interaction: discord.Interaction, count: app_commands.Range[int, 1, BUNDLE_HISTORY_MAX] = 10):
+    await bundle_history.callback(_SlashContext(interaction), count)
+
+@bundle_slash.command(name='undo', description="Revert the last bundle change")
+async def slash_bundle_undo(interaction: discord.Interaction):
+    await bundle_undo.callback(_SlashContext(interaction))
+
+@bundle_slash.command(name='reset', description="Reset all bundle progress for this server")
+async def slash_bundle_reset(interaction: discord.Interaction):
+    await bundle_reset.callback(_SlashContext(interaction), 'all')
+
+@bundle_slash.command(name='import', description="Load your server's progress from a save file")
+@app_commands.describe(save="Your save file, named like Farm_123456789")
+async def slash_bundle_import(interaction: discord.Interaction, save: discord.Attachment):
+    # Big saves can take longer than the 3 seconds Discord waits for a first response.
+    if not interaction.response.is_done():
+        await interaction.response.defer(thinking=True)
+        interaction.extras['api_calls'] = interaction.extras.get('api_calls', 0) + 1
+    await _import_save(_SlashContext(interaction), save)
+
+@bundle_slash.command(name='status', description="Progress for every room, or one room or bundle")
+@app_commands.autocomplete(name=_autocomplete('room', 'bundle'))
+async def slash_bundle_status(interaction: discord.Interaction, name: str | None = None):
+    await bundle_status.callback(_SlashContext(interaction), *([name] if name else []))
+
+bot.tree.add_command(bundle_slash)
+
+calendar_slash = app_commands.Group(name='calendar', description="Your server's farm date and daily digest", guild_only=True)
+
+@calendar_slash.command(name='show', description="Today's events, birthdays, crops to plant and fish for bundles")
+async def slash_calendar_show(interaction: discord.Interaction):
+    await calendar.callback(_SlashContext(interaction))
+
+@calendar_slash.command(name='set', description="Set the farm's current date")
+async def slash_calendar_set(interaction: discord.Interaction, season: SeasonChoice, day: app_commands.Range[int, 1, 28],
+                             year: app_commands.Range[int, 1] = 1):
+    await calendar_set.callback(_SlashContext(interaction), season, str(day), str(year))
+
+@calendar_slash.command(name='next', description="Move the farm date forward")
+async def slash_calendar_next(interaction: discord.Interaction, days: app_commands.Range[int, 1, 112] = 1):
+    await calendar_next.callback(_SlashContext(interaction), days)
+
+@calendar_slash.command(name='digest', description="Post a daily digest in a channel (Manage Server)")
+@app_commands.describe(time="UTC time of day, like 09:00 or 9pm")
+@app_commands.checks.has_permissions(manage_guild=True)
+async def slash_calendar_digest(interaction: discord.Interaction, channel: discord.TextChannel, time: str):
+    await calendar_digest.callback(_SlashContext(interaction), channel, time)
+
+@calendar_slash.command(name='stop', description="Stop the daily digest (Manage Server)")
+@app_commands.checks.has_permissions(manage_guild=True)
+async def slash_calendar_stop(interaction: discord.Interaction):
+    await calendar_stop.callback(_SlashContext(interaction))
+
+bot.tree.add_command(calendar_slash)
+
+junimo_slash = app_commands.Group(name='junimo', description="The Junimos: quotes, help, and bot admin")
+
+async def _is_bot_owner(interaction: discord.Interaction) -> bool:
+    return await bot.is_owner(interaction.user)
+
+@junimo_slash.command(name='quote', description="A word from the Junimos")
+async def slash_junimo_quote(interaction: discord.Interaction):
+    await junimo.callback(_SlashContext(interaction))
+
+@junimo_slash.command(name='help', description="Every command, with examples")
+async def slash_junimo_help(interaction: discord.Interaction):
+    await junimo_help.callback(_SlashContext(interaction))
+
+@junimo_slash.command(name='stats', description="Bot owner only: cache, startup and process numbers")
+@app_commands.check(_is_bot_owner)
+async def slash_junimo_stats(interaction: discord.Interaction):
+    await junimo_stats.callback(_SlashContext(interaction))
+
+@junimo_slash.command(name='sync', description="Bot owner only: publish the slash commands")
+@app_commands.check(_is_bot_owner)
+async def slash_junimo_sync(interaction: discord.Interaction):
+    await junimo_sync.callback(_SlashContext(interaction))
+
+@junimo_slash.command(name='reload', description="Bot owner only: reload the game data files without restarting")
+@app_commands.check(_is_bot_owner)
+async def slash_junimo_reload(interaction: discord.Interaction):
+    # Recompiling can take longer than the 3 second reply deadline.
+    if not interaction.response.is_done():
+        await interaction.response.defer(thinking=True)
+    await junimo_reload.callback(_SlashContext(interaction))
+
+@junimo_slash.command(name='profile', description="Bot owner only: sample the event loop, top functions and a flamegraph file")
+@app_commands.describe(seconds="How long to sample (1-120, default 10)")
+@app_commands.check(_is_bot_owner)
+async def slash_junimo_profile(interaction: discord.Interaction, seconds: app_commands.Range[float, 1, 120] = 10.0):
+    await junimo_profile.callback(_SlashContext(interaction), seconds)
+
+@junimo_slash.command(name='profile-blocks', description="Bot owner only: log commands that block the event loop")
+@app_commands.describe(threshold="Milliseconds, or 'off'; leave empty to list recent blocks")
+@app_commands.check(_is_bot_owner)
+async def slash_junimo_profile_blocks(interaction: discord.Interaction, threshold: Optional[str] = None):
+    await junimo_profile_blocks.callback(_SlashContext(interaction), threshold)
+
+bot.tree.add_command(junimo_slash)
+
+@bot.tree.error
+async def on_app_command_error(interaction: discord.Interaction, error: app_commands.AppCommandError):
+    COMMAND_ERRORS.inc(_slash_name(interaction), type(getattr(error, 'original', error)).__name__)
+    _observe_command(_slash_name(interaction), interaction.extras.get('started', time.perf_counter()))
+    if isinstance(error, app_commands.MissingPermissions):
+        message = "You need the Manage Server permission for that."
+    elif isinstance(error, app_commands.CheckFailure):
+        message = "That command is only available to the bot owner."
+    else:
+        print("Unhandled slash command error:", repr(error))
+        message = "Oops, I couldn't run that. Try `/junimo help`."
+    if interaction.response.is_done():
+        await interaction.followup.send(message, ephemeral=True)
+    else:
+        await interaction.response.send_message(message, ephemeral=True)
+
 ########################
 # Run the bot
 ########################
 
-bot.run(os.getenv('BOT_TOKEN'))
+STARTUP_TIMINGS['renders'] = RENDERS.build_seconds
+_record_startup('module_loaded')
+
+if __name__ == '__main__':
+    bot.run(os.getenv('BOT_TOKEN'))
+    # Safety net in case the loop stopped before close() could flush.
+    STATE_CACHE.flush_sync()
@@ -0,0 +1,142 @@
+"""
+Prometheus-style metrics, served as text over aiohttp when a port is set.
+
+No client library: counters and histograms are dicts keyed by label values,
+and gauges are functions read at scrape time (gateway latency, guild count,
+bundle cache stats, process CPU time and RSS). Everything is updated from the event loop thread.
+
+    GET /metrics   Prometheus text exposition format
+    GET /healthz   "ok"
+"""
+import asyncio
+import bisect
+import math
+import os
+from typing import Callable
+
+from aiohttp import web
+
+# Seconds; covers a dict lookup (~5us) up to a slow Discord round trip.
+LATENCY_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+
+def _labels(names: tuple[str, ...], values: tuple) -> str:
+    if not names:
+        return ''
+    escaped = (str(v).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for v in values)
+    return '{' + ','.join(f'{n}="{v}"' for n, v in zip(names, escaped)) + '}'
+
+def _number(value: float) -> str:
+    if math.isinf(value):
+        return '+Inf' if value > 0 else '-Inf'
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class Counter:
+    def __init__(self, name: str, help: str, labelnames: tuple[str, ...] = ()):
+        self.name, self.help, self.labelnames = name, help, labelnames
+        self.values: dict[tuple, float] = {}
+
+    def inc(self, *labels, amount: float = 1) -> None:
+        self.values[labels] = self.values.get(labels, 0) + amount
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        lines += [f"{self.name}{_labels(self.labelnames, k)} {_number(v)}" for k, v in sorted(self.values.items())]
+        return lines
+
+
+class Histogram:
+    def __init__(self, name: str, help: str, labelnames: tuple[str, ...] = (), buckets: tuple[float, ...] = LATENCY_BUCKETS):
+        self.name, self.help, self.labelnames = name, help, labelnames
+        self.buckets = buckets
+        # labels -> [per-bucket counts (not cumulative) + overflow, sum]
+        self.values: dict[tuple, list] = {}
+
+    def observe(self, value: float, *labels) -> None:
+        entry = self.values.get(labels)
+        if entry is None:
+            entry = self.values[labels] = [[0] * (len(self.buckets) + 1), 0.0]
+        entry[0][bisect.bisect_left(self.buckets, value)] += 1
+        entry[1] += value
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        for labels, (counts, total) in sorted(self.values.items()):
+            names = self.labelnames + ('le',)
+            cumulative = 0
+            for bound, count in zip(self.buckets + (math.inf,), counts):
+                cumulative += count
+                lines.append(f"{self.name}_bucket{_labels(names, labels + (_number(bound),))} {cumulative}")
+            lines.append(f"{self.name}_sum{_labels(self.labelnames, labels)} {_number(total)}")
+            lines.append(f"{self.name}_count{_labels(self.labelnames, labels)} {cumulative}")
+        return lines
+
+
+class Gauge:
+    """Value(s) read when scraped: fn() returns a number, or {label values: number}."""
+
+    def __init__(self, name: str, help: str, fn: Callable[[], float | dict], labelnames: tuple[str, ...] = ()):
+        self.name, self.help, self.fn, self.labelnames = name, help, fn, labelnames
+
+    def render(self) -> list[str]:
+        value = self.fn()
+        items = value.items() if isinstance(value, dict) else [((), value)]
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} gauge"]
+        for labels, v in items:
+            if v is not None and not (isinstance(v, float) and math.isnan(v)):
+                lines.append(f"{self.name}{_labels(self.labelnames, labels)} {_number(v)}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self.metrics: list = []
+
+    def add(self, metric):
+        self.metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        lines = []
+        for metric in self.metrics:
+            try:
+                lines += metric.render()
+            except Exception as e:
+                # One broken gauge shouldn't take the whole scrape down.
+                print(f"Metric {metric.name} failed: {e!r}")
+        return '\n'.join(lines) + '\n'
+
+
+def process_rss_bytes() -> int | None:
+    """Current resident set size, or None where /proc isn't available."""
+    try:
+        with open('/proc/self/statm', 'rb') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+async def monitor_loop_lag(histogram: Histogram, interval: float = 0.5) -> None:
+    """Sleep `interval` repeatedly; how late each wakeup is measures how busy the loop is."""
+    loop = asyncio.get_running_loop()
+    while True:
+        started = loop.time()
+        await asyncio.sleep(interval)
+        histogram.observe(max(0.0, loop.time() - started - interval))
+
+
+async def start_server(registry: Registry, port: int, host: str = '0.0.0.0') -> web.AppRunner:
+    async def metrics(_request):
+        return web.Response(text=registry.render(), content_type='text/plain', charset='utf-8')
+
+    async def healthz(_request):
+        return web.Response(text='ok')
+
+    app = web.Application()
+    app.router.add_get('/metrics', metrics)
+    app.router.add_get('/healthz', healthz)
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    await web.TCPSite(runner, host, port).start()
+    return runner
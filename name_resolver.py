@@ -0,0 +1,195 @@
+"""
+Typo-tolerant name lookup shared by every command that takes a name.
+
+Each kind of name (villager, building, fish, ...) gets a NameIndex built once
+at startup:
+- resolve(): normalized exact match through a dict ("mr. qi", "Big  Barn",
+  "chefs bundle" all hit).
+- suggest(): "did you mean" candidates for a miss. A trigram inverted index
+  shortlists names sharing the most trigrams with the query, then the
+  shortlist is re-ranked by (bounded) edit distance. Only the shortlist is
+  ever compared character by character, so a miss stays well under a
+  millisecond even for datasets many times the current size.
+- complete(): slash command autocomplete. Every word start of every name is
+  kept in one sorted list, so a prefix is a bisect plus a short walk.
+"""
+import bisect
+import heapq
+import re
+from collections import defaultdict
+
+_NON_ALNUM = re.compile(r'[^0-9a-z]+')
+
+
+def normalize(name: str) -> str:
+    """Case/space/punctuation-insensitive key: "Mr. Qi" -> "mr qi", "Chef's  Bundle" -> "chefs bundle"."""
+    s = name.casefold().replace("'", '').replace('’', '').replace('★', '')
+    return ' '.join(_NON_ALNUM.sub(' ', s).split())
+
+
+def _trigrams(key: str) -> set[str]:
+    padded = f"  {key} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def _word_starts(key: str) -> list[int]:
+    return [0] + [i + 1 for i, c in enumerate(key) if c == ' ']
+
+
+def edit_distance(a: str, b: str, max_dist: int) -> int:
+    """Levenshtein distance, giving up (returning max_dist + 1) once it must exceed max_dist."""
+    if abs(len(a) - len(b)) > max_dist:
+        return max_dist + 1
+    prev = list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        cur = [i]
+        row_min = i
+        for j, cb in enumerate(b, 1):
+            cost = min(prev[j] + 1, cur[j - 1] + 1, prev[j - 1] + (ca != cb))
+            cur.append(cost)
+            if cost < row_min:
+                row_min = cost
+        if row_min > max_dist:
+            return max_dist + 1
+        prev = cur
+    return prev[-1]
+
+
+class NameIndex:
+    """Exact and fuzzy lookup over one list of display names."""
+
+    # How many trigram-shortlisted names get an edit-distance check.
+    SHORTLIST = 12
+    # How many prefix matches complete() ranks at most; keeps one-letter queries cheap.
+    COMPLETE_SCAN = 200
+
+    def __init__(self, names):
+        self.names: list[str] = list(dict.fromkeys(names))
+        self._keys = [normalize(n) for n in self.names]
+        self._positions = {name: i for i, name in enumerate(self.names)}
+        self.exact: dict[str, str] = {}
+        for key, name in zip(self._keys, self.names):
+            self.exact.setdefault(key, name)
+        self._grams: dict[str, list[int]] = defaultdict(list)
+        self._gram_counts: list[int] = []
+        for i, key in enumerate(self._keys):
+            grams = _trigrams(key)
+            self._gram_counts.append(len(grams))
+            for g in grams:
+                self._grams[g].append(i)
+        # (key from a word start, index): "midnight carp" is found by "mid" and "carp".
+        self._starts: list[tuple[str, int]] = sorted(
+            (key[pos:], i) for i, key in enumerate(self._keys) for pos in _word_starts(key)
+        )
+
+    def resolve(self, query: str) -> str | None:
+        return self.exact.get(normalize(query))
+
+    def scored(self, query: str) -> list[tuple[int, float, str]]:
+        """(edit distance, -trigram similarity, name) for plausible matches, best first."""
+        key = normalize(query)
+        if not key:
+            return []
+        query_grams = _trigrams(key)
+        shared: dict[int, int] = defaultdict(int)
+        for g in query_grams:
+            for i in self._grams.get(g, ()):
+                shared[i] += 1
+        shortlist = heapq.nlargest(
+            self.SHORTLIST,
+            ((2 * count / (len(query_grams) + self._gram_counts[i]), i) for i, count in shared.items()),
+        )
+        max_dist = max(2, len(key) // 3)
+        out = []
+        for dice, i in shortlist:
+            dist = edit_distance(key, self._keys[i], max_dist)
+            # Close spelling, or shares most of its trigrams (e.g. "iridium" -> "Iridium Hoe").
+            if dist <= max_dist or dice >= 0.4:
+                out.append((dist, -dice, self.names[i]))
+        out.sort()
+        return out
+
+    def suggest(self, query: str, limit: int = 3) -> list[str]:
+        return [name for _, _, name in self.scored(query)[:limit]]
+
+    def completions(self, query: str, rank=None) -> list[tuple[int, int, str, str]]:
+        """
+        (rank, 0 if the whole name starts with the query else 1, key, name) for
+        names with a word starting with `query`, best first. `rank(name)`
+        (lower first) defaults to 0. Falls back to suggest() on no prefix hit.
+        """
+        key = normalize(query)
+        starts = self._starts
+        pos = bisect.bisect_left(starts, (key,))
+        hits: dict[int, int] = {}
+        while pos < len(starts) and len(hits) < self.COMPLETE_SCAN:
+            suffix, i = starts[pos]
+            if not suffix.startswith(key):
+                break
+            if i not in hits:
+                hits[i] = 0 if self._keys[i].startswith(key) else 1
+            pos += 1
+        if not hits and key:
+            hits = {self._positions[name]: 1 for name in self.suggest(query, limit=self.SHORTLIST)}
+        out = [(rank(self.names[i]) if rank else 0, whole, self._keys[i], self.names[i]) for i, whole in hits.items()]
+        out.sort()
+        return out
+
+    def complete(self, query: str, limit: int = 25, rank=None) -> list[str]:
+        return [name for *_, name in self.completions(query, rank)[:limit]]
+
+
+class NameResolver:
+    """One NameIndex per kind of name, e.g. 'villager', 'fish', 'bundle'."""
+
+    def __init__(self):
+        self.indexes: dict[str, NameIndex] = {}
+
+    def add(self, kind: str, names) -> None:
+        self.indexes[kind] = NameIndex(names)
+
+    def resolve(self, kind: str, query: str) -> str | None:
+        index = self.indexes.get(kind)
+        return index.resolve(query) if index else None
+
+    def suggest(self, kind: str, query: str, limit: int = 3) -> list[str]:
+        index = self.indexes.get(kind)
+        return index.suggest(query, limit) if index else []
+
+    def complete(self, kind: str, query: str, limit: int = 25, rank=None) -> list[str]:
+        index = self.indexes.get(kind)
+        return index.complete(query, limit, rank) if index else []
+
+    def complete_any(self, kinds, query: str, limit: int = 25, rank=None) -> list[tuple[str, str]]:
+        """Best (kind, name) completions across several kinds."""
+        merged = []
+        for kind in kinds:
+            index = self.indexes.get(kind)
+            if index:
+                merged.extend((*entry, kind) for entry in index.completions(query, rank))
+        merged.sort()
+        out, seen = [], set()
+        for *_, name, kind in merged:
+            if name not in seen:
+                seen.add(name)
+                out.append((kind, name))
+            if len(out) == limit:
+                break
+        return out
+
+    def suggest_any(self, kinds, query: str, limit: int = 3) -> list[tuple[str, str]]:
+        """Best (kind, name) suggestions across several kinds."""
+        merged = []
+        for kind in kinds:
+            index = self.indexes.get(kind)
+            if index:
+                merged.extend((dist, neg_dice, name, kind) for dist, neg_dice, name in index.scored(query))
+        merged.sort()
+        out, seen = [], set()
+        for _, _, name, kind in merged:
+            if name not in seen:
+                seen.add(name)
+                out.append((kind, name))
+            if len(out) == limit:
+                break
+        return out
@@ -0,0 +1,195 @@
+"""
+Finding where event loop time goes in production, for `!junimo profile`.
+
+SamplingProfiler: a daemon thread that, every `interval`, reads the event loop
+thread's current stack (sys._current_frames) and counts it. Nothing is
+installed on the loop thread, so commands run at full speed; the only cost is
+the GIL held while a stack is read. That cost is timed, and if it exceeds
+`max_overhead` of wall time the interval is doubled. The thread stops by
+itself at its deadline. Results: the top functions by inclusive samples
+(asyncio's own plumbing left out) and collapsed stacks ("a;b;c 12" per line)
+for flamegraph.pl, speedscope and friends.
+
+BlockWatch: a heartbeat callback on the loop and a watchdog thread. When the
+heartbeat is late by more than `threshold`, the watchdog grabs the loop
+thread's stack (the code that is blocking it, caught in the act) and the
+command running in the current task; when the loop comes back, the heartbeat
+logs the block with its full length.
+"""
+import asyncio
+import collections
+import os
+import sys
+import threading
+import time
+import traceback
+import weakref
+from typing import Callable
+
+_ASYNCIO_DIR = os.path.dirname(asyncio.__file__)
+
+
+def _frame_name(code) -> str:
+    return f"{os.path.basename(code.co_filename)}:{getattr(code, 'co_qualname', code.co_name)}"
+
+def _is_plumbing(code) -> bool:
+    """The event loop itself (bot.run, run_forever, _run_once, Handle._run, select) rather than work done on it."""
+    return (code.co_name == '<module>' or os.path.dirname(code.co_filename) == _ASYNCIO_DIR
+            or os.path.basename(code.co_filename) in ('selectors.py', 'threading.py', 'runners.py'))
+
+def _stack(frame) -> tuple:
+    """Code objects from the outermost call to `frame`."""
+    codes = []
+    while frame is not None:
+        codes.append(frame.f_code)
+        frame = frame.f_back
+    codes.reverse()
+    return tuple(codes)
+
+
+class ProfileResult:
+    """What a SamplingProfiler run saw."""
+    __slots__ = ('stacks', 'samples', 'busy', 'seconds', 'interval', 'overhead')
+
+    def __init__(self, stacks: collections.Counter, samples: int, busy: int, seconds: float, interval: float, overhead: float):
+        self.stacks = stacks            # tuple of code objects -> samples
+        self.samples = samples
+        self.busy = busy                # samples where the loop was running code, not waiting in select
+        self.seconds = seconds
+        self.interval = interval        # final interval, after any backing off
+        self.overhead = overhead        # fraction of wall time spent reading stacks
+
+    def top(self, n: int = 15) -> list[tuple[str, int, int]]:
+        """(function, inclusive samples, self samples), most inclusive first."""
+        inclusive: collections.Counter[str] = collections.Counter()
+        own: collections.Counter[str] = collections.Counter()
+        for stack, count in self.stacks.items():
+            names = [_frame_name(code) for code in stack if not _is_plumbing(code)]
+            if not names:
+                continue
+            for name in set(names):
+                inclusive[name] += count
+            if not _is_plumbing(stack[-1]):
+                own[names[-1]] += count
+        return [(name, count, own[name]) for name, count in inclusive.most_common(n)]
+
+    def collapsed(self) -> str:
+        """One "outer;...;inner count" line per distinct stack."""
+        lines = [f"{';'.join(_frame_name(code) for code in stack)} {count}"
+                 for stack, count in self.stacks.most_common()]
+        return '\n'.join(lines) + '\n'
+
+
+class SamplingProfiler:
+    """Samples one thread's stack from a daemon thread until `seconds` have passed (or stop())."""
+
+    def __init__(self, thread_id: int, seconds: float, interval: float = 0.005, max_overhead: float = 0.02,
+                 max_interval: float = 0.1):
+        self.thread_id = thread_id
+        self.seconds = seconds
+        self.interval = interval
+        self.max_overhead = max_overhead
+        self.max_interval = max_interval
+        self.stacks: collections.Counter[tuple] = collections.Counter()
+        self.samples = 0
+        self.busy = 0
+        self._cost = 0.0
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='sampling-profiler', daemon=True)
+        self._started = 0.0
+        self._elapsed = 0.0
+
+    def start(self) -> None:
+        self._started = time.perf_counter()
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stopped.set()
+
+    def _run(self) -> None:
+        deadline = self._started + self.seconds
+        while not self._stopped.wait(self.interval):
+            began = time.perf_counter()
+            if began >= deadline:
+                break
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None:
+                break
+            stack = _stack(frame)
+            del frame
+            self.stacks[stack] += 1
+            self.samples += 1
+            if not _is_plumbing(stack[-1]):
+                self.busy += 1
+            now = time.perf_counter()
+            self._cost += now - began
+            if self._cost > self.max_overhead * (now - self._started) and self.interval < self.max_interval:
+                self.interval = min(self.max_interval, self.interval * 2)
+        self._elapsed = time.perf_counter() - self._started
+
+    async def result(self) -> ProfileResult:
+        """Wait (without blocking the loop) for the run to finish."""
+        while self._thread.is_alive():
+            await asyncio.sleep(0.1)
+        elapsed = self._elapsed or 1e-9
+        return ProfileResult(self.stacks, self.samples, self.busy, elapsed, self.interval, self._cost / elapsed)
+
+
+class BlockWatch:
+    """
+    Logs the event loop being blocked longer than `threshold` seconds. Call
+    start() on the loop thread; mark a task with the command it runs via
+    `running[task] = name` (entries go away with their tasks).
+    """
+
+    def __init__(self, threshold: float, on_block: Callable[[str, float, str], None], history: int = 20):
+        self.threshold = threshold
+        self.on_block = on_block
+        self.running: weakref.WeakKeyDictionary[asyncio.Task, str] = weakref.WeakKeyDictionary()
+        self.recent: collections.deque[tuple[float, str, float]] = collections.deque(maxlen=history)
+        self.blocks = 0
+        self._period = min(0.1, max(0.01, threshold / 2))
+        self._beat = 0.0
+        self._caught: tuple[str, str] | None = None
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._handle: asyncio.TimerHandle | None = None
+        self._stopped = threading.Event()
+
+    def start(self) -> None:
+        self._loop = asyncio.get_running_loop()
+        thread_id = threading.get_ident()
+        self._heartbeat()
+        threading.Thread(target=self._watch, args=(thread_id,), name='block-watch', daemon=True).start()
+
+    def stop(self) -> None:
+        self._stopped.set()
+        if self._handle is not None:
+            self._handle.cancel()
+
+    def _heartbeat(self) -> None:
+        now = time.monotonic()
+        if self._caught is not None:
+            command, stack = self._caught
+            self._caught = None
+            blocked = now - self._beat - self._period
+            self.blocks += 1
+            self.recent.append((time.time(), command, blocked))
+            self.on_block(command, blocked, stack)
+        self._beat = now
+        self._handle = self._loop.call_later(self._period, self._heartbeat)
+
+    def _watch(self, thread_id: int) -> None:
+        reported = None
+        while not self._stopped.wait(self._period / 2):
+            beat = self._beat
+            if beat == reported or time.monotonic() - beat - self._period < self.threshold:
+                continue
+            frame = sys._current_frames().get(thread_id)
+            if frame is None:
+                return
+            stack = ''.join(traceback.format_stack(frame))
+            del frame
+            task = asyncio.current_task(self._loop)
+            command = self.running.get(task, 'unknown') if task is not None else 'unknown'
+            self._caught = (command, stack)
+            reported = beat
@@ -0,0 +1,280 @@
+"""
+Typed records for the crop, fish, tree, building/upgrade and season tables.
+
+The JSON keeps everything as display strings ("80g", "Summer, Fall",
+"6am - 11am and 6pm - 2am"). Records hold the parsed values instead:
+integers for prices and days, bitmasks for seasons and weather, hour
+windows for fishing times. Repeated strings (locations, names) are interned.
+
+The original text is kept only where the parsed value can't reproduce it
+(e.g. "100g (Oasis)", "5 Dragon Tooth"); the *_text properties give the
+string to show either way. seasons.json repeats every crop and fish from
+crops.json/fish.json, so a Season only holds names into those tables.
+"""
+import re
+import sys
+
+SEASONS = ('Spring', 'Summer', 'Fall', 'Winter')
+SEASON_BITS = {name: 1 << i for i, name in enumerate(SEASONS)}
+ALL_SEASONS = (1 << len(SEASONS)) - 1
+
+WEATHER_SUN, WEATHER_RAIN, WEATHER_WIND = 1, 2, 4
+ANY_WEATHER = WEATHER_SUN | WEATHER_RAIN | WEATHER_WIND
+_WEATHER_WORDS = {'sun': WEATHER_SUN, 'rain': WEATHER_RAIN, 'wind': WEATHER_WIND}
+
+# Fishing hours run 6am (6) to 2am (26), as in the game clock.
+DAY_START, DAY_END = 6, 26
+
+_INT = re.compile(r'\d[\d,]*')
+_HOUR = re.compile(r'(\d{1,2})\s*(am|pm)', re.I)
+_REGROW = re.compile(r'(\d+)\s+Additional', re.I)
+_YIELD = re.compile(r'Yields\s+(\d+)', re.I)
+# Commas outside parentheses: "Mines (F20, F60), Volcano Caldera" is two locations.
+_LIST_SPLIT = re.compile(r',(?![^()]*\))')
+
+
+########################
+# Parsing
+########################
+
+def parse_int(text: str) -> int | None:
+    """First integer in the text: "6,000g" -> 6000, "10 Initial Harvest / 3 ..." -> 10."""
+    m = _INT.search(text or '')
+    return int(m.group().replace(',', '')) if m else None
+
+def parse_gold(text: str) -> int | None:
+    """A gold amount: "2,500g (Traveling Cart)" -> 2500; "5 Dragon Tooth" -> None."""
+    m = re.match(r'\s*(\d[\d,]*)g\b', text or '')
+    return int(m.group(1).replace(',', '')) if m else None
+
+def format_gold(amount: int) -> str:
+    return f"{amount:,}g"
+
+def parse_seasons(text: str) -> int:
+    """"Spring, Summer Fall" -> Spring|Summer|Fall bits; "All Seasons" -> all four."""
+    if 'all seasons' in (text or '').lower():
+        return ALL_SEASONS
+    mask = 0
+    for word in re.findall(r'[A-Za-z]+', text or ''):
+        mask |= SEASON_BITS.get(word.capitalize(), 0)
+    return mask
+
+def format_seasons(mask: int) -> str:
+    if mask == ALL_SEASONS:
+        return 'All Seasons'
+    return ', '.join(name for name in SEASONS if mask & SEASON_BITS[name])
+
+def _hour(number: str, half: str) -> int:
+    hour = int(number) % 12 + (12 if half.lower() == 'pm' else 0)
+    # After midnight belongs to the same in-game day: 12am is 24, 2am is 26.
+    return hour + 24 if hour < DAY_START else hour
+
+def parse_hours(text: str) -> tuple[tuple[int, int], ...]:
+    """"6am - 11am and 6pm - 2am" -> ((6, 11), (18, 26)); "Anytime" -> ((6, 26),)."""
+    if not text or 'anytime' in text.lower():
+        return ((DAY_START, DAY_END),)
+    hours = [_hour(n, h) for n, h in _HOUR.findall(text)]
+    return tuple(zip(hours[0::2], hours[1::2]))
+
+def format_hour(hour: int) -> str:
+    hour %= 24
+    return f"{hour % 12 or 12}{'am' if hour < 12 else 'pm'}"
+
+def format_hours(windows: tuple[tuple[int, int], ...]) -> str:
+    if windows == ((DAY_START, DAY_END),):
+        return 'Anytime'
+    return ' and '.join(f"{format_hour(start)} - {format_hour(end)}" for start, end in windows)
+
+def parse_weather(text: str) -> int:
+    """"Sun Wind" -> SUN|WIND; "Any Weather" -> all."""
+    if 'any' in (text or '').lower():
+        return ANY_WEATHER
+    mask = 0
+    for word in re.findall(r'[A-Za-z]+', text or ''):
+        mask |= _WEATHER_WORDS.get(word.lower(), 0)
+    return mask
+
+def format_weather(mask: int) -> str:
+    if mask == ANY_WEATHER:
+        return 'Any Weather'
+    return ' '.join(word.capitalize() for word, bit in _WEATHER_WORDS.items() if mask & bit)
+
+def _override(raw: str | None, formatted: str) -> str | None:
+    """The raw text if the parsed value doesn't reproduce it, else None (nothing stored)."""
+    return None if raw is None or raw == formatted else sys.intern(raw)
+
+
+########################
+# Records
+########################
+
+class Crop:
+    __slots__ = ('name', 'seasons', 'regrows', 'growth_days', 'regrow_days', 'harvest_yield', 'max_harvests',
+                 'seed_price', 'sell_price', 'bundle', 'image', '_texts')
+
+    def __init__(self, name: str, raw: dict):
+        self.name = name
+        self.seasons = parse_seasons(raw.get('Season', ''))
+        self.regrows = raw.get('Type') == 'Multi Harvest'
+        growth = raw.get('Growth Time', '')
+        self.growth_days = parse_int(growth)
+        regrow = _REGROW.search(growth) if self.regrows else None
+        self.regrow_days = int(regrow.group(1)) if regrow else None
+        # "(Yields 4 beans)": items per harvest; part of the growth text, so no override needed.
+        harvest_yield = _YIELD.search(growth)
+        self.harvest_yield = int(harvest_yield.group(1)) if harvest_yield else 1
+        self.max_harvests = parse_int(raw.get('Max Harvests', ''))
+        self.seed_price = parse_gold(raw.get('Seed Price', ''))
+        # One crop spells the key "Sells Price".
+        self.sell_price = parse_gold(raw.get('Base Sell Price', raw.get('Sells Price', '')))
+        self.bundle = bool(raw.get('Bundle'))
+        self.image = raw.get('image')
+        texts = (
+            _override(raw.get('Season'), format_seasons(self.seasons)),
+            _override(growth, self._format_growth()),
+            _override(raw.get('Max Harvests'), str(self.max_harvests)),
+            _override(raw.get('Seed Price'), format_gold(self.seed_price) if self.seed_price is not None else ''),
+            _override(raw.get('Base Sell Price', raw.get('Sells Price')), format_gold(self.sell_price) if self.sell_price is not None else ''),
+        )
+        self._texts = texts if any(texts) else None
+
+    def _format_growth(self) -> str:
+        if self.regrow_days is not None:
+            return f"{self.growth_days} Initial Harvest / {self.regrow_days} Additional Harvests"
+        return str(self.growth_days)
+
+    def _text(self, i: int) -> str | None:
+        return self._texts[i] if self._texts else None
+
+    @property
+    def type_text(self) -> str:
+        return 'Multi Harvest' if self.regrows else 'Single Harvest'
+
+    @property
+    def season_text(self) -> str:
+        return self._text(0) or format_seasons(self.seasons)
+
+    @property
+    def growth_text(self) -> str:
+        return self._text(1) or self._format_growth()
+
+    @property
+    def max_harvests_text(self) -> str:
+        return self._text(2) or str(self.max_harvests)
+
+    @property
+    def seed_price_text(self) -> str:
+        return self._text(3) or (format_gold(self.seed_price) if self.seed_price is not None else '—')
+
+    @property
+    def sell_price_text(self) -> str:
+        return self._text(4) or (format_gold(self.sell_price) if self.sell_price is not None else '—')
+
+
+class Fish:
+    __slots__ = ('name', 'locations', 'seasons', 'hours', 'weather', 'sell_price', 'bundle', 'image', '_texts')
+
+    def __init__(self, name: str, raw: dict):
+        self.name = name
+        self.locations = tuple(sys.intern(loc.strip()) for loc in _LIST_SPLIT.split(raw.get('Location', '')) if loc.strip())
+        self.seasons = parse_seasons(raw.get('Season', ''))
+        self.hours = parse_hours(raw.get('Time', ''))
+        self.weather = parse_weather(raw.get('Weather', ''))
+        self.sell_price = parse_gold(raw.get('Base Sell Price', ''))
+        self.bundle = bool(raw.get('Bundle'))
+        self.image = raw.get('image')
+        texts = (
+            _override(raw.get('Time'), format_hours(self.hours)),
+            _override(raw.get('Base Sell Price'), format_gold(self.sell_price) if self.sell_price is not None else ''),
+        )
+        self._texts = texts if any(texts) else None
+
+    def _text(self, i: int) -> str | None:
+        return self._texts[i] if self._texts else None
+
+    @property
+    def location_text(self) -> str:
+        return ', '.join(self.locations) or '—'
+
+    @property
+    def season_text(self) -> str:
+        return format_seasons(self.seasons) or '—'
+
+    @property
+    def hours_text(self) -> str:
+        return self._text(0) or format_hours(self.hours)
+
+    @property
+    def weather_text(self) -> str:
+        return format_weather(self.weather) or '—'
+
+    @property
+    def sell_price_text(self) -> str:
+        return self._text(1) or (format_gold(self.sell_price) if self.sell_price is not None else '—')
+
+
+class Tree:
+    """A fruit tree (only listed in seasons.json); `season` is when it fruits."""
+    __slots__ = ('name', 'season', 'sapling_price', 'growth_days', 'sell_price', 'bundle', '_sapling_text')
+
+    def __init__(self, name: str, season: str, raw: dict):
+        self.name = name
+        self.season = SEASON_BITS.get(season, 0)
+        self.sapling_price = parse_gold(raw.get('Sapling Price', ''))
+        self.growth_days = parse_int(raw.get('Growth Time', ''))
+        self.sell_price = parse_gold(raw.get('Base Sell Price', ''))
+        self.bundle = bool(raw.get('Bundle'))
+        formatted = format_gold(self.sapling_price) if self.sapling_price is not None else ''
+        self._sapling_text = _override(raw.get('Sapling Price'), formatted)
+
+    @property
+    def sapling_price_text(self) -> str:
+        return self._sapling_text or format_gold(self.sapling_price)
+
+
+class Purchase:
+    """A farm building or upgrade: (quantity, material) pairs in listed order; material '' is gold."""
+    __slots__ = ('name', 'cost', 'image', '_cost_text')
+
+    def __init__(self, name: str, raw: dict):
+        self.name = name
+        cost = []
+        for line in raw.get('cost', []):
+            gold = parse_gold(line)
+            if gold is not None:
+                cost.append((gold, ''))
+                continue
+            quantity, _, material = line.partition(' ')
+            cost.append((parse_int(quantity) or 1, sys.intern(material.strip())))
+        self.cost = tuple(cost)
+        self.image = raw.get('image')
+        raw_cost = tuple(raw.get('cost', []))
+        self._cost_text = raw_cost if raw_cost != self._format_cost() else None
+
+    @property
+    def gold(self) -> int:
+        return sum(quantity for quantity, material in self.cost if not material)
+
+    @property
+    def materials(self) -> tuple[tuple[int, str], ...]:
+        return tuple((quantity, material) for quantity, material in self.cost if material)
+
+    def _format_cost(self) -> tuple[str, ...]:
+        return tuple(f"{quantity} {material}" if material else format_gold(quantity) for quantity, material in self.cost)
+
+    @property
+    def cost_lines(self) -> tuple[str, ...]:
+        return self._cost_text or self._format_cost()
+
+
+class Season:
+    """Names into the crop/fish/tree tables, plus foraging as written (with where-to-find notes)."""
+    __slots__ = ('name', 'crops', 'fish', 'foraging', 'trees')
+
+    def __init__(self, name: str, raw: dict):
+        self.name = name
+        crops = raw.get('Crops', {})
+        self.crops = tuple(crops.get('Single Harvest', {})) + tuple(crops.get('Multi Harvest', {}))
+        self.fish = tuple(raw.get('Fish', {}))
+        self.foraging = tuple(sys.intern(x) for x in raw.get('Foraging', []))
+        self.trees = tuple(raw.get('Trees', {}))
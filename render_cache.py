@@ -0,0 +1,75 @@
+"""
+Prebuilt replies for commands whose output depends only on the static JSON
+data (gift, char, build, fish, crop, upgrade, events, season, junimo help).
+
+Each kind registers a keys() function and a build(key) function. All
+payloads are built once at startup, so a handler only does a dict lookup and
+a send. The key space is the datasets themselves (a few hundred entries), so
+everything is kept rather than evicted. invalidate() rebuilds from whatever
+the data is now, for when the JSON is reloaded.
+
+Payloads are shared between sends: never mutate a Rendered's embed.
+"""
+import time
+from typing import Callable, Iterable
+
+import discord
+
+
+class Rendered:
+    """One ready-to-send message: an embed plus optional link buttons."""
+    __slots__ = ('embed', 'links', '_view')
+
+    def __init__(self, embed: discord.Embed, links: tuple[tuple[str, str], ...] = ()):
+        self.embed = embed
+        self.links = links            # (label, url) per button
+        self._view: discord.ui.View | None = None
+
+    def view(self) -> discord.ui.View | None:
+        # Views need a running loop, so the (shared) view is built on first send.
+        if self.links and self._view is None:
+            view = discord.ui.View(timeout=None)
+            for label, url in self.links:
+                view.add_item(discord.ui.Button(label=label, url=url))
+            # Link buttons never dispatch anything. A stopped view is still sent, but
+            # discord.py doesn't register it in its view store for every message.
+            view.stop()
+            self._view = view
+        return self._view
+
+    def kwargs(self) -> dict:
+        """Keyword arguments for ctx.send()."""
+        view = self.view()
+        return {'embed': self.embed, 'view': view} if view else {'embed': self.embed}
+
+
+class RenderCache:
+    """(kind, key) -> Rendered, for every key of every registered kind."""
+
+    def __init__(self):
+        self._kinds: dict[str, tuple[Callable[[], Iterable[str]], Callable[[str], Rendered]]] = {}
+        self._payloads: dict[tuple[str, str], Rendered] = {}
+        self.build_seconds = 0.0      # total time spent building payloads
+
+    def register(self, kind: str, keys: Callable[[], Iterable[str]], build: Callable[[str], Rendered]) -> None:
+        self._kinds[kind] = (keys, build)
+        self._build(kind)
+
+    def get(self, kind: str, key: str = '') -> Rendered | None:
+        return self._payloads.get((kind, key))
+
+    def invalidate(self, kind: str | None = None) -> None:
+        """Rebuild one kind (or all of them) from the current data."""
+        for name in ([kind] if kind else list(self._kinds)):
+            self._payloads = {k: v for k, v in self._payloads.items() if k[0] != name}
+            self._build(name)
+
+    def _build(self, kind: str) -> None:
+        started = time.perf_counter()
+        keys, build = self._kinds[kind]
+        for key in keys():
+            self._payloads[(kind, key)] = build(key)
+        self.build_seconds += time.perf_counter() - started
+
+    def __len__(self) -> int:
+        return len(self._payloads)
@@ -0,0 +1,183 @@
+"""
+Read Community Center progress out of a Stardew Valley save file.
+
+A save (the `Farm_123456789` file, not `SaveGameInfo`) is one XML document
+that reaches several MB late in a game. Only two small parts matter here:
+
+- <bundleData>: "Pantry/0" -> "Spring Crops/O 465 20/24 1 0 188 1 0 ..."
+  (bundle name / reward / ingredient triplets "id quantity quality" / ...)
+- <bundles>: bundle index -> one <boolean> per ingredient, true once deposited
+
+parse_save() streams the file with iterparse, keeps only those records and
+clears everything else as soon as it has been read, so memory stays flat
+however big the farm is. match_progress() then maps deposited ingredients
+onto the bundle names/items in communitycenter.json by item id.
+"""
+import io
+import time
+import xml.etree.ElementTree as ET
+
+import metrics
+from bundle_progress import BundleLayout
+from game_data import bundle_base_name
+from name_resolver import NameResolver
+
+# Object id -> bundle item name as communitycenter.json spells it (lowercase,
+# no quantity/quality marks). -1 is money, used by the Vault bundles.
+ITEM_NAMES: dict[str, str] = {
+    '-1': 'gold',
+    # Foraging
+    '16': 'wild horseradish', '18': 'daffodil', '20': 'leek', '22': 'dandelion',
+    '396': 'spice berry', '398': 'grape', '402': 'sweet pea',
+    '404': 'common mushroom', '406': 'wild plum', '408': 'hazelnut', '410': 'blackberry',
+    '412': 'winter root', '414': 'crystal fruit', '416': 'snow yam', '418': 'crocus',
+    '388': 'wood', '390': 'stone', '709': 'hardwood',
+    '88': 'coconut', '90': 'cactus fruit', '78': 'cave carrot', '420': 'red mushroom', '422': 'purple mushroom',
+    '724': 'maple syrup', '725': 'oak resin', '726': 'pine tar', '257': 'morel',
+    # Crops & animal products
+    '24': 'parsnip', '188': 'green bean', '190': 'cauliflower', '192': 'potato',
+    '254': 'melon', '256': 'tomato', '258': 'blueberry', '260': 'hot pepper',
+    '270': 'corn', '272': 'eggplant', '276': 'pumpkin', '280': 'yam',
+    '186': 'large milk', '438': 'large goat milk', '174': 'large egg', '182': 'large egg (brown)',
+    '442': 'duck egg', '440': 'wool',
+    '340': 'honey', '344': 'jelly', '428': 'cloth', '432': 'truffle oil', '424': 'cheese', '426': 'goat cheese',
+    '613': 'apple', '634': 'apricot', '635': 'orange', '636': 'peach', '637': 'pomegranate', '638': 'cherry',
+    # Fish
+    '145': 'sunfish', '143': 'catfish', '706': 'shad', '699': 'tiger trout',
+    '136': 'largemouth bass', '142': 'carp', '698': 'sturgeon', '700': 'bullhead',
+    '131': 'sardine', '130': 'tuna', '150': 'red snapper', '701': 'tilapia',
+    '140': 'walleye', '132': 'bream', '148': 'eel',
+    '715': 'lobster', '716': 'crayfish', '717': 'crab', '718': 'cockle', '719': 'mussel',
+    '720': 'shrimp', '721': 'snail', '722': 'periwinkle', '723': 'oyster', '372': 'clam',
+    '128': 'pufferfish', '156': 'ghostfish', '164': 'sandfish', '734': 'woodskip',
+    # Boiler room
+    '334': 'copper bar', '335': 'iron bar', '336': 'gold bar',
+    '766': 'slime', '767': 'bat wing', '768': 'solar essence', '769': 'void essence',
+    '80': 'quartz', '86': 'earth crystal', '84': 'frozen tear', '82': 'fire quartz',
+    # Bulletin board
+    '259': 'fiddlehead fern', '430': 'truffle', '376': 'poppy', '228': 'maki roll', '194': 'fried egg',
+    '266': 'red cabbage', '397': 'sea urchin', '421': 'sunflower', '62': 'aquamarine', '444': 'duck feather',
+    '536': 'frozen geode', '392': 'nautilus shell', '702': 'chub',
+    '348': 'wine', '446': "rabbit's foot",
+    '262': 'wheat', '178': 'hay',
+    # Abandoned JojaMart
+    '807': 'dinosaur mayonnaise', '74': 'prismatic shard', '454': 'ancient fruit', '795': 'void salmon', '445': 'caviar',
+}
+
+class SaveImportError(ValueError):
+    """The upload isn't a save file with Community Center data."""
+
+
+def _item_key(item: str) -> str:
+    """"5 Parsnip★" -> "parsnip", "Large Egg (Brown)" -> "large egg (brown)" (parenthetical kept)."""
+    s = item.replace('★', '').strip()
+    head, _, rest = s.partition(' ')
+    if head.replace(',', '').isdigit() and rest:
+        s = rest
+    return s.lower()
+
+
+def parse_save(fileobj) -> tuple[dict[int, tuple[str, list[str]]], dict[int, list[bool]]]:
+    """
+    Stream a save file. Returns ({bundle index: (bundle name, ingredient ids)},
+    {bundle index: deposited flags}).
+    """
+    definitions: dict[int, tuple[str, list[str]]] = {}
+    deposited: dict[int, list[bool]] = {}
+    path: list[str] = []
+    record_depth = None  # depth of the <item> record being read, if any
+    try:
+        for event, elem in ET.iterparse(fileobj, events=('start', 'end')):
+            if event == 'start':
+                if not path and elem.tag != 'SaveGame':
+                    if elem.tag == 'SaveGameInfo':
+                        raise SaveImportError("That's the SaveGameInfo file. Upload the other file in the save folder (named like `Farm_123456789`).")
+                    raise SaveImportError("That doesn't look like a Stardew Valley save file.")
+                if record_depth is None and elem.tag == 'item' and path and path[-1] in ('bundleData', 'bundles'):
+                    record_depth = len(path)
+                path.append(elem.tag)
+                continue
+
+            path.pop()
+            if record_depth is not None:
+                if len(path) > record_depth:
+                    continue  # part of the record; read when the record ends
+                record_depth = None
+                if path[-1] == 'bundleData':
+                    key, value = elem.findtext('key/string'), elem.findtext('value/string')
+                    if key and value and '/' in key:
+                        fields = value.split('/')
+                        ids = fields[2].split() if len(fields) > 2 else []
+                        # Ingredients are "id quantity quality" triplets; 1.6 may qualify ids as "(O)24".
+                        definitions[int(key.rsplit('/', 1)[1])] = (fields[0], [i.removeprefix('(O)') for i in ids[0::3]])
+                else:
+                    key, flags = elem.findtext('key/int'), elem.find('value/ArrayOfBoolean')
+                    if key is not None and flags is not None:
+                        deposited[int(key)] = [b.text == 'true' for b in flags]
+            elem.clear()
+    except ET.ParseError as e:
+        raise SaveImportError(f"Couldn't read that save file ({e}).") from None
+    if not definitions or not deposited:
+        raise SaveImportError("No Community Center bundle data found in that save.")
+    return definitions, deposited
+
+
+def match_progress(layout: BundleLayout, names: NameResolver, definitions: dict[int, tuple[str, list[str]]],
+                   deposited: dict[int, list[bool]]) -> tuple[list[tuple[str, str, str]], list[str]]:
+    """
+    Map deposited ingredients onto layout items. Returns ((room, bundle, item)
+    for each checked item, names of save bundles or items that didn't match).
+    """
+    checked: list[tuple[str, str, str]] = []
+    unmatched: list[str] = []
+    for index, (save_name, ids) in sorted(definitions.items()):
+        bundle_name = names.resolve('bundle', f"{save_name} Bundle") or names.resolve('bundle', save_name)
+        if bundle_name is None:
+            unmatched.append(f"{save_name} Bundle")
+            continue
+        slot = layout.bundle_by_name[bundle_name]
+        free = [layout.items[bit][2] for bit in range(slot.start, slot.stop)]
+        for item_id, done in zip(ids, deposited.get(index, ())):
+            if not done:
+                continue
+            key = ITEM_NAMES.get(item_id)
+            # Exact name first ("large egg (brown)"), then ignoring variants ("99 Wood (2)" is the second wood).
+            match = next((i for i in free if _item_key(i) == key), None) if key else None
+            if match is None and key:
+                match = next((i for i in free if bundle_base_name(i) == bundle_base_name(key)), None)
+            if match is None:
+                unmatched.append(f"{bundle_name}: item {item_id}")
+                continue
+            free.remove(match)
+            checked.append((slot.room, bundle_name, match))
+    return checked, unmatched
+
+
+class SaveImport:
+    """Result of read_save(): what to check, what didn't match, and what it cost."""
+    __slots__ = ('checked', 'unmatched', 'seconds', 'rss_growth_bytes')
+
+    def __init__(self, checked, unmatched, seconds: float, rss_growth_bytes: int | None):
+        self.checked = checked
+        self.unmatched = unmatched
+        self.seconds = seconds
+        self.rss_growth_bytes = rss_growth_bytes
+
+
+def read_save(data: bytes, layout: BundleLayout, names: NameResolver) -> SaveImport:
+    """
+    parse_save() + match_progress(), timed, with how much the process's RSS
+    grew meanwhile (None without /proc). Blocking: run it in an executor.
+
+    RSS is read rather than tracing allocations with tracemalloc, which is
+    process-wide: it would slow every command on the event loop during the
+    parse and stop any tracing already running.
+    """
+    rss_before = metrics.process_rss_bytes()
+    started = time.perf_counter()
+    definitions, deposited = parse_save(io.BytesIO(data))
+    checked, unmatched = match_progress(layout, names, definitions, deposited)
+    seconds = time.perf_counter() - started
+    rss_after = metrics.process_rss_bytes()
+    growth = max(0, rss_after - rss_before) if rss_before is not None and rss_after is not None else None
+    return SaveImport(checked, unmatched, seconds, growth)
@@ -0,0 +1,119 @@
+"""
+Full-text search over every game data table, for `!search`.
+
+Each villager, building, upgrade, fish, crop, tree, forageable, room, bundle
+and event is one document whose fields are its JSON fields, flattened to text
+("cost": "350 Wood, 150 Stone"; a true "Bundle" flag becomes the word
+"Bundle"). Image and wiki URLs are left out. Words are lowercased, stripped
+of accents and plural "s", and "6,000g" stays one word.
+
+The index maps each word to its postings: (document, BM25 weight, bit mask
+of the fields it occurs in). Since documents never change, each weight is
+final when the index is built, so a query only adds up the postings of its
+words. Documents matching more of the query's words rank first, then by
+score. The name field counts NAME_BOOST times, so "salmon" puts Salmon ahead
+of the villagers who love Salmon Dinner.
+"""
+import heapq
+import math
+import re
+import unicodedata
+
+# BM25 term frequency saturation and length normalization.
+K1, B = 1.2, 0.75
+NAME_BOOST = 3
+_SKIP_FIELDS = frozenset({'image', 'schedule', 'completed'})
+_WORD = re.compile(r'[a-z0-9]+')
+_THOUSANDS = re.compile(r'(?<=\d),(?=\d{3})')
+
+
+def tokenize(text: str) -> list[str]:
+    """"Sells for 6,000g; Rainy days" -> ['sell', 'for', '6000g', 'rainy', 'day']."""
+    plain = unicodedata.normalize('NFKD', text).encode('ascii', 'ignore').decode('ascii').lower()
+    words = _WORD.findall(_THOUSANDS.sub('', plain.replace("'", '')))
+    return [w[:-1] if len(w) > 3 and w.endswith('s') and not w.endswith('ss') else w for w in words]
+
+def flatten_fields(entry: dict) -> list[tuple[str, str]]:
+    """(label, text) for every field of a JSON object worth searching."""
+    out = []
+    for key, value in entry.items():
+        if key.lower() in _SKIP_FIELDS:
+            continue
+        if value is True:
+            out.append((key, key))
+        elif isinstance(value, str) and value:
+            out.append((key, value))
+        elif isinstance(value, list) and value:
+            out.append((key, ', '.join(str(v) for v in value)))
+        elif isinstance(value, dict) and value:
+            # {"Parsnip": false, ...} (bundle items) or nested objects.
+            out.append((key, ', '.join(value)))
+    return out
+
+
+class SearchDoc:
+    """One searchable entity; fields[0] is its name."""
+    __slots__ = ('kind', 'name', 'fields')
+
+    def __init__(self, kind: str, name: str, fields: list[tuple[str, str]]):
+        self.kind = kind
+        self.name = name
+        self.fields = (('Name', name), *fields)
+
+
+class SearchHit:
+    """A ranked result: `matched` of the query's words, in the fields set in `field_bits`."""
+    __slots__ = ('doc', 'score', 'matched', 'field_bits')
+
+    def __init__(self, doc: SearchDoc, score: float, matched: int, field_bits: int):
+        self.doc = doc
+        self.score = score
+        self.matched = matched
+        self.field_bits = field_bits
+
+    def matched_fields(self) -> list[tuple[str, str]]:
+        """The document's (label, text) fields the query words occur in, name excluded."""
+        return [field for i, field in enumerate(self.doc.fields) if i and self.field_bits >> i & 1]
+
+
+class SearchIndex:
+    """word -> ((doc index, BM25 weight, field bits), ...) over a fixed list of documents."""
+
+    def __init__(self, docs: list[SearchDoc]):
+        self.docs = docs
+        counts: dict[str, dict[int, list]] = {}     # word -> doc -> [weighted term frequency, field bits]
+        lengths = []
+        for doc_id, doc in enumerate(docs):
+            length = 0
+            for field_no, (_, text) in enumerate(doc.fields):
+                weight = NAME_BOOST if field_no == 0 else 1
+                for word in tokenize(text):
+                    entry = counts.setdefault(word, {}).setdefault(doc_id, [0, 0])
+                    entry[0] += weight
+                    entry[1] |= 1 << field_no
+                    length += weight
+            lengths.append(length)
+        average = sum(lengths) / len(lengths) if lengths else 1.0
+        total = len(docs)
+        self.postings: dict[str, tuple[tuple[int, float, int], ...]] = {}
+        for word, by_doc in counts.items():
+            idf = math.log(1 + (total - len(by_doc) + 0.5) / (len(by_doc) + 0.5))
+            self.postings[word] = tuple(
+                (doc_id, idf * tf * (K1 + 1) / (tf + K1 * (1 - B + B * lengths[doc_id] / average)), bits)
+                for doc_id, (tf, bits) in by_doc.items()
+            )
+
+    def search(self, query: str, limit: int = 30) -> list[SearchHit]:
+        """Best `limit` documents for the query, most words matched first, then by score."""
+        found: dict[int, list] = {}     # doc -> [score, words matched, field bits]
+        for word in dict.fromkeys(tokenize(query)):
+            for doc_id, weight, bits in self.postings.get(word, ()):
+                entry = found.get(doc_id)
+                if entry is None:
+                    found[doc_id] = [weight, 1, bits]
+                else:
+                    entry[0] += weight
+                    entry[1] += 1
+                    entry[2] |= bits
+        ranked = heapq.nsmallest(limit, found.items(), key=lambda kv: (-kv[1][1], -kv[1][0], kv[0]))
+        return [SearchHit(self.docs[doc_id], score, matched, bits) for doc_id, (score, matched, bits) in ranked]
@@ -0,0 +1,431 @@
+"""
+Sharded deployment: shard maths, per-shard load reporting, and a launcher
+that runs the bot as several shard-cluster processes.
+
+Discord sends a guild's events to shard (guild_id >> 22) % shard_count.
+main.py always runs an AutoShardedBot; SHARD_COUNT and SHARD_IDS (e.g.
+"0-3") pin it to part of the shards. The launcher splits 0..shards-1 into
+contiguous ranges and runs one process per range:
+
+    python sharding.py launch --shards 8 --clusters 2
+    python sharding.py launch --shards 8 --clusters 2 --fake-gateway 20
+
+Every cluster opens the same SQLite store (WAL mode lets several processes
+share it). A guild maps to exactly one shard, so exactly one cluster caches
+and writes it. The launcher only changes the split by stopping every
+cluster (which flushes its pending writes) before starting new ones, and a
+guild's new owner reads it back from the store.
+
+Clusters publish per-shard load (guilds, messages, commands, command time,
+gateway latency) to a shard_load table in that database every few seconds;
+the launcher prints it.
+
+--fake-gateway N replaces Discord with synthetic traffic for N seconds:
+guilds are spread over the shards and each cluster checks and unchecks
+random bundle items in its own guilds through the real command handlers.
+When every cluster has exited, the launcher checks that the store holds
+exactly the progress each cluster ended with.
+"""
+import argparse
+import asyncio
+import hashlib
+import os
+import random
+import signal
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import types
+
+from state_store import SqliteStateStore, default_store_path
+
+# Seconds between a cluster's load reports.
+REPORT_INTERVAL = 5.0
+# Seconds to wait before restarting a cluster that exited on its own.
+RESTART_DELAY = 5.0
+# Fake guild i is snowflake (FAKE_GUILD_BASE + i) << 22, so it lands on shard (FAKE_GUILD_BASE + i) % shards.
+FAKE_GUILD_BASE = 1_000_000
+
+########################
+# Shard maths
+########################
+
+def shard_for_guild(guild_id: int, shard_count: int) -> int:
+    return (int(guild_id) >> 22) % shard_count
+
+def parse_shard_ids(spec: str) -> list[int]:
+    """"0-3,6" -> [0, 1, 2, 3, 6]"""
+    ids: list[int] = []
+    for part in spec.replace(' ', '').split(','):
+        if not part:
+            continue
+        first, sep, last = part.partition('-')
+        ids.extend(range(int(first), int(last) + 1) if sep else [int(first)])
+    return sorted(set(ids))
+
+def format_shard_ids(ids) -> str:
+    """[0, 1, 2, 3, 6] -> "0-3,6" """
+    ids = sorted(ids)
+    parts, i = [], 0
+    while i < len(ids):
+        j = i
+        while j + 1 < len(ids) and ids[j + 1] == ids[j] + 1:
+            j += 1
+        parts.append(str(ids[i]) if i == j else f"{ids[i]}-{ids[j]}")
+        i = j + 1
+    return ','.join(parts)
+
+def split_shards(shard_count: int, clusters: int) -> list[list[int]]:
+    """Contiguous, near-equal shard id ranges, one per cluster."""
+    if not 0 < clusters <= shard_count:
+        raise ValueError(f"Need between 1 and {shard_count} clusters for {shard_count} shards")
+    size, extra = divmod(shard_count, clusters)
+    ranges, start = [], 0
+    for i in range(clusters):
+        stop = start + size + (i < extra)
+        ranges.append(list(range(start, stop)))
+        start = stop
+    return ranges
+
+########################
+# Load reporting
+########################
+
+class ShardLoad:
+    """Per-shard counters for one process, published with ShardBoard.publish()."""
+
+    def __init__(self):
+        self.started = time.time()
+        self.messages: dict[int, int] = {}
+        self.commands: dict[int, int] = {}
+        self.command_seconds: dict[int, float] = {}
+
+    def message(self, shard_id: int) -> None:
+        self.messages[shard_id] = self.messages.get(shard_id, 0) + 1
+
+    def command(self, shard_id: int, seconds: float) -> None:
+        self.commands[shard_id] = self.commands.get(shard_id, 0) + 1
+        self.command_seconds[shard_id] = self.command_seconds.get(shard_id, 0.0) + seconds
+
+    def rows(self, cluster: int, guilds: dict[int, int], latencies: dict[int, float | None]) -> list[tuple]:
+        shard_ids = set(guilds) | set(latencies) | set(self.messages) | set(self.commands)
+        now = time.time()
+        return [
+            (shard_id, cluster, os.getpid(), guilds.get(shard_id, 0), self.messages.get(shard_id, 0),
+             self.commands.get(shard_id, 0), self.command_seconds.get(shard_id, 0.0),
+             latencies.get(shard_id), self.started, now)
+            for shard_id in sorted(shard_ids)
+        ]
+
+
+class ShardBoard:
+    """
+    The shard_load table every cluster reports to, plus fake-gateway results.
+    Lives in the shared SQLite store file, on its own connection.
+    """
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS shard_load (
+            shard_id        INTEGER PRIMARY KEY,
+            cluster         INTEGER NOT NULL,
+            pid             INTEGER NOT NULL,
+            guilds          INTEGER NOT NULL,
+            messages        INTEGER NOT NULL,
+            commands        INTEGER NOT NULL,
+            command_seconds REAL NOT NULL,
+            latency         REAL,
+            started         REAL NOT NULL,
+            updated         REAL NOT NULL
+        );
+        CREATE TABLE IF NOT EXISTS fake_gateway_results (
+            cluster INTEGER PRIMARY KEY,
+            guilds  INTEGER NOT NULL,
+            checked INTEGER NOT NULL,
+            digest  TEXT NOT NULL
+        );
+    """
+    COLUMNS = ('shard_id', 'cluster', 'pid', 'guilds', 'messages', 'commands', 'command_seconds', 'latency', 'started', 'updated')
+
+    def __init__(self, path: str):
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA busy_timeout=5000")
+        self._conn.executescript(self.SCHEMA)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM shard_load")
+            self._conn.execute("DELETE FROM fake_gateway_results")
+
+    def publish(self, rows: list[tuple]) -> None:
+        with self._lock:
+            self._conn.executemany(f"INSERT OR REPLACE INTO shard_load VALUES ({', '.join('?' * len(self.COLUMNS))})", rows)
+
+    def read(self) -> list[dict]:
+        with self._lock:
+            rows = self._conn.execute(f"SELECT {', '.join(self.COLUMNS)} FROM shard_load ORDER BY shard_id").fetchall()
+        return [dict(zip(self.COLUMNS, row)) for row in rows]
+
+    def publish_result(self, cluster: int, guilds: int, checked: int, digest: str) -> None:
+        with self._lock:
+            self._conn.execute("INSERT OR REPLACE INTO fake_gateway_results VALUES (?, ?, ?, ?)", (cluster, guilds, checked, digest))
+
+    def results(self) -> dict[int, tuple[int, int, str]]:
+        with self._lock:
+            rows = self._conn.execute("SELECT cluster, guilds, checked, digest FROM fake_gateway_results").fetchall()
+        return {cluster: (guilds, checked, digest) for cluster, guilds, checked, digest in rows}
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+def format_load(rows: list[dict]) -> str:
+    lines = [f"{'shard':>5} {'cluster':>7} {'pid':>7} {'guilds':>7} {'msg/s':>8} {'cmd/s':>8} {'cmd ms':>7} {'gw ms':>7} {'age s':>6}"]
+    now = time.time()
+    for r in rows:
+        uptime = max(r['updated'] - r['started'], 1e-9)
+        cmd_ms = r['command_seconds'] / r['commands'] * 1000 if r['commands'] else 0.0
+        gateway = f"{r['latency'] * 1000:.0f}" if r['latency'] is not None else '—'
+        lines.append(f"{r['shard_id']:>5} {r['cluster']:>7} {r['pid']:>7} {r['guilds']:>7} "
+                     f"{r['messages'] / uptime:>8.1f} {r['commands'] / uptime:>8.1f} {cmd_ms:>7.2f} {gateway:>7} {now - r['updated']:>6.0f}")
+    return '\n'.join(lines)
+
+########################
+# Fake gateway
+########################
+
+def fake_guild_ids(count: int) -> list[int]:
+    return [(FAKE_GUILD_BASE + i) << 22 for i in range(count)]
+
+def progress_digest(checked_by_guild: dict[int, list[tuple[str, str, str]]]) -> tuple[int, str]:
+    """(checked items, hash of every checked (guild, room, bundle, item))."""
+    digest = hashlib.sha256()
+    checked = 0
+    for gid in sorted(checked_by_guild):
+        rows = sorted(checked_by_guild[gid])
+        checked += len(rows)
+        for row in rows:
+            digest.update('\x1f'.join((str(gid),) + tuple(row)).encode() + b'\x1e')
+    return checked, digest.hexdigest()
+
+def stored_checked(store, guild_id: int) -> list[tuple[str, str, str]]:
+    return [
+        (room, bundle, item)
+        for room, bundles in store.load_guild(str(guild_id)).items()
+        for bundle, state in bundles.items()
+        for item, done in state['items'].items() if done
+    ]
+
+
+class _FakeContext:
+    """Just enough of commands.Context for the bundle commands; replies are dropped."""
+
+    def __init__(self, guild_id: int, shard_id: int):
+        self.guild = types.SimpleNamespace(id=guild_id, shard_id=shard_id)
+        self.author = types.SimpleNamespace(id=0)
+        self.command = None
+
+    async def send(self, content=None, **kwargs):
+        pass
+
+
+async def _fake_cluster(cluster: int, shard_ids: list[int], shard_count: int, guilds: int, seconds: float, rate: float) -> None:
+    import main  # reads SHARD_* and the store location from the environment set by the launcher
+
+    board = ShardBoard(main.BUNDLES_DB_PATH)
+    mine = [gid for gid in fake_guild_ids(guilds) if shard_for_guild(gid, shard_count) in shard_ids]
+    per_shard = {shard_id: 0 for shard_id in shard_ids}
+    for gid in mine:
+        per_shard[shard_for_guild(gid, shard_count)] += 1
+    publish = lambda: board.publish(main.SHARD_LOAD.rows(cluster, per_shard, {}))
+
+    main.STATE_CACHE.start()
+    rng = random.Random(cluster)
+    items = main.BUNDLE_LAYOUT.items
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + seconds
+    next_event = next_report = loop.time()
+    while mine and loop.time() < deadline:
+        gid = rng.choice(mine)
+        _, bundle, item = rng.choice(items)
+        shard_id = shard_for_guild(gid, shard_count)
+        command = main.bundle_check if rng.random() < 0.6 else main.bundle_uncheck
+        main.SHARD_LOAD.message(shard_id)
+        started = time.perf_counter()
+        await command.callback(_FakeContext(gid, shard_id), bundle, item_name=item)
+        main.SHARD_LOAD.command(shard_id, time.perf_counter() - started)
+        if loop.time() >= next_report:
+            await loop.run_in_executor(None, publish)
+            next_report += REPORT_INTERVAL
+        next_event += 1 / rate
+        await asyncio.sleep(max(0.0, next_event - loop.time()))
+    await main.STATE_CACHE.stop()
+    publish()
+
+    # What this cluster believes, from memory; the launcher compares it with the store.
+    checked, digest = progress_digest({
+        gid: list(main.BUNDLE_LAYOUT.checked_items(progress))
+        for gid in mine if (progress := main.STATE_CACHE.peek(gid)) is not None
+    })
+    board.publish_result(cluster, len(mine), checked, digest)
+    board.close()
+    main.STATE_STORE.close()
+
+########################
+# Launcher
+########################
+
+def _store_paths(env: dict[str, str]) -> tuple[str, str]:
+    """(bundles_state.json, SQLite store) as main.py would pick them from `env`."""
+    backend = env.get('BUNDLES_STATE_BACKEND') or 'sqlite'
+    if backend != 'sqlite':
+        raise ValueError("Sharded clusters share the store, which needs BUNDLES_STATE_BACKEND=sqlite.")
+    json_path = env.get('BUNDLES_STATE_PATH') or os.path.join(os.path.dirname(os.path.abspath(__file__)), 'bundles_state.json')
+    return json_path, env.get('BUNDLES_DB_PATH') or default_store_path(json_path, backend)
+
+
+class Launcher:
+    """Runs one process per shard range and prints their load until stopped (or, with a fake gateway, until done)."""
+
+    def __init__(self, shard_count: int, clusters: int, fake_seconds: float | None = None, fake_guilds: int = 1000,
+                 fake_rate: float = 200.0, report_every: float = REPORT_INTERVAL):
+        self.shard_count = shard_count
+        self.ranges = split_shards(shard_count, clusters)
+        self.fake_seconds = fake_seconds
+        self.fake_guilds = fake_guilds
+        self.fake_rate = fake_rate
+        self.report_every = report_every
+        self.env = dict(os.environ)
+        if fake_seconds is not None and not os.getenv('BUNDLES_DB_PATH'):
+            # Synthetic progress never goes near the real store.
+            tmp = tempfile.mkdtemp(prefix='sdv-shards-')
+            self.env['BUNDLES_STATE_PATH'] = os.path.join(tmp, 'bundles_state.json')
+            self.env['BUNDLES_DB_PATH'] = os.path.join(tmp, 'bundles_state.sqlite3')
+        self.json_path, self.db_path = _store_paths(self.env)
+        self.env.update(BUNDLES_STATE_BACKEND='sqlite', BUNDLES_DB_PATH=self.db_path)
+        # Each cluster serves its own metrics, on consecutive ports.
+        self.metrics_base = self.env.pop('METRICS_PORT', None) or self.env.pop('PORT', None)
+        self.children: dict[int, subprocess.Popen] = {}
+        self.exit_codes: dict[int, int] = {}
+        self.stopping = False
+
+    def _command(self) -> list[str]:
+        here = os.path.dirname(os.path.abspath(__file__))
+        if self.fake_seconds is not None:
+            return [sys.executable, os.path.join(here, 'sharding.py'), 'fake-cluster']
+        return [sys.executable, os.path.join(here, 'main.py')]
+
+    def spawn(self, cluster: int) -> None:
+        env = dict(self.env, SHARD_COUNT=str(self.shard_count), SHARD_IDS=format_shard_ids(self.ranges[cluster]),
+                   CLUSTER_ID=str(cluster))
+        if self.metrics_base:
+            env['METRICS_PORT'] = str(int(self.metrics_base) + cluster)
+        if self.fake_seconds is not None:
+            env.update(FAKE_GATEWAY_SECONDS=str(self.fake_seconds), FAKE_GATEWAY_GUILDS=str(self.fake_guilds),
+                       FAKE_GATEWAY_RATE=str(self.fake_rate))
+        self.children[cluster] = subprocess.Popen(self._command(), env=env)
+        print(f"Cluster {cluster}: shards {env['SHARD_IDS']} of {self.shard_count}, pid {self.children[cluster].pid}")
+
+    def stop(self, *_args) -> None:
+        self.stopping = True
+        for child in self.children.values():
+            if child.poll() is None:
+                child.terminate()
+
+    def run(self) -> int:
+        # Import bundles_state.json once here rather than racing it in every cluster.
+        store = SqliteStateStore(self.db_path)
+        store.import_legacy_json(self.json_path)
+        store.close()
+        board = ShardBoard(self.db_path)
+        board.clear()
+
+        signal.signal(signal.SIGTERM, self.stop)
+        signal.signal(signal.SIGINT, self.stop)
+        for cluster in range(len(self.ranges)):
+            self.spawn(cluster)
+
+        restart_at: dict[int, float] = {}
+        next_report = time.monotonic() + self.report_every
+        while self.children or restart_at:
+            time.sleep(0.2)
+            for cluster, child in list(self.children.items()):
+                code = child.poll()
+                if code is None:
+                    continue
+                del self.children[cluster]
+                self.exit_codes[cluster] = code
+                if not self.stopping and self.fake_seconds is None:
+                    print(f"Cluster {cluster} exited with {code}; restarting in {RESTART_DELAY:.0f}s")
+                    restart_at[cluster] = time.monotonic() + RESTART_DELAY
+            for cluster, when in list(restart_at.items()):
+                if self.stopping:
+                    restart_at.clear()
+                elif time.monotonic() >= when:
+                    del restart_at[cluster]
+                    self.spawn(cluster)
+            if time.monotonic() >= next_report:
+                print(format_load(board.read()), flush=True)
+                next_report += self.report_every
+
+        print(format_load(board.read()))
+        ok = all(code == 0 for code in self.exit_codes.values())
+        if self.fake_seconds is not None:
+            ok = self._verify(board) and ok
+        board.close()
+        return 0 if ok else 1
+
+    def _verify(self, board: ShardBoard) -> bool:
+        """Every cluster's in-memory progress must match what the shared store holds for its guilds."""
+        results = board.results()
+        store = SqliteStateStore(self.db_path)
+        ok = True
+        try:
+            for cluster, shard_ids in enumerate(self.ranges):
+                mine = [gid for gid in fake_guild_ids(self.fake_guilds) if shard_for_guild(gid, self.shard_count) in shard_ids]
+                stored = progress_digest({gid: stored_checked(store, gid) for gid in mine})
+                reported = results.get(cluster)
+                match = reported is not None and reported[1:] == stored
+                ok = ok and match
+                print(f"Cluster {cluster}: {len(mine)} guilds, {stored[0]} checked items in store, "
+                      f"{'matches' if match else 'DOES NOT MATCH'} the cluster's memory")
+        finally:
+            store.close()
+        return ok
+
+
+def _cli(argv: list[str]) -> int:
+    parser = argparse.ArgumentParser(description="Run StardewSavant as several shard-cluster processes.")
+    sub = parser.add_subparsers(dest='cmd', required=True)
+    launch = sub.add_parser('launch', help="start the clusters and report per-shard load")
+    launch.add_argument('--shards', type=int, required=True, help="total shard count")
+    launch.add_argument('--clusters', type=int, default=1, help="processes to split the shards over")
+    launch.add_argument('--fake-gateway', type=float, metavar='SECONDS',
+                        help="drive the clusters with synthetic traffic for this long instead of connecting to Discord")
+    launch.add_argument('--fake-guilds', type=int, default=1000)
+    launch.add_argument('--fake-rate', type=float, default=200.0, help="synthetic commands per second per cluster")
+    launch.add_argument('--report-every', type=float, default=REPORT_INTERVAL)
+    sub.add_parser('fake-cluster', help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.cmd == 'fake-cluster':
+        asyncio.run(_fake_cluster(
+            int(os.environ['CLUSTER_ID']), parse_shard_ids(os.environ['SHARD_IDS']), int(os.environ['SHARD_COUNT']),
+            int(os.environ['FAKE_GATEWAY_GUILDS']), float(os.environ['FAKE_GATEWAY_SECONDS']), float(os.environ['FAKE_GATEWAY_RATE']),
+        ))
+        return 0
+    try:
+        launcher = Launcher(args.shards, args.clusters, args.fake_gateway, args.fake_guilds, args.fake_rate, args.report_every)
+    except ValueError as e:
+        print(e)
+        return 2
+    return launcher.run()
+
+
+if __name__ == '__main__':
+    sys.exit(_cli(sys.argv[1:]))
@@ -0,0 +1,918 @@
+"""
+Bundle progress storage for StardewSavant.
+
+Progress is server-based, so every backend stores one checkmark per
+(guild, bundle, item). main.py only talks to the StateStore interface below;
+pick a backend with BUNDLES_STATE_BACKEND (default: sqlite).
+
+Every check/uncheck/reset/undo is also recorded as a BundleOp in a per-guild
+operation log, which backs `!bundle history` and `!bundle undo`.
+
+The store also keeps each guild's farm calendar settings (`!calendar`, see
+farm_calendar.py) as one small JSON object per guild.
+
+Backends:
+- sqlite:  one row per (guild, bundle, item) plus a bundle_ops table, WAL mode.
+- journal: append-only log file, periodically compacted into a snapshot.
+
+bundles_state.json is no longer written on every check. It is imported once
+into the store on first start and can still be produced as an export:
+
+    python state_store.py export bundles_state.json
+    python state_store.py import bundles_state.json
+"""
+import asyncio
+import json
+import os
+import sqlite3
+import sys
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Callable
+
+from bundle_progress import BundleLayout, GuildProgress
+
+########################
+# JSON import / export
+########################
+
+def read_json_state(path: str) -> dict:
+    """Load a bundles_state.json-shaped file or return empty dict if missing/corrupt."""
+    if not os.path.exists(path):
+        return {}
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except Exception:
+        # If the file is malformed, don't crash the bot; start fresh.
+        return {}
+
+
+def write_json_state(path: str, state: dict, indent: int | None = 2) -> None:
+    """Write a bundles_state.json-shaped export atomically (temp file + rename)."""
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(state, f, ensure_ascii=False, indent=indent)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+def iter_json_checks(state: dict):
+    """Yield (guild_id, room, bundle, item, checked) from a bundles_state.json dict."""
+    for gid, rooms in state.items():
+        if not isinstance(rooms, dict):
+            continue
+        for room_name, bundles in rooms.items():
+            if not isinstance(bundles, dict):
+                continue
+            for bundle_name, bundle_state in bundles.items():
+                items = bundle_state.get('items') if isinstance(bundle_state, dict) else None
+                if not isinstance(items, dict):
+                    continue
+                for item_name, checked in items.items():
+                    yield str(gid), room_name, bundle_name, item_name, bool(checked)
+
+########################
+# Operation log
+########################
+
+class BundleOp:
+    """
+    One recorded change to a guild's bundle progress.
+
+    changes: (room, bundle, item, checked) applied by this op (after clearing
+             the guild, for 'reset').
+    prev:    (room, bundle, item, checked) values before the op, used by undo.
+    target:  for 'undo', the seq of the op it reverted.
+    """
+    __slots__ = ('guild_id', 'seq', 'action', 'changes', 'prev', 'user_id', 'ts', 'target')
+
+    def __init__(self, guild_id: str, seq: int, action: str, changes: list, prev: list,
+                 user_id: int | None = None, ts: float | None = None, target: int | None = None):
+        self.guild_id = guild_id
+        self.seq = seq
+        self.action = action
+        self.changes = changes
+        self.prev = prev
+        self.user_id = user_id
+        self.ts = time.time() if ts is None else ts
+        self.target = target
+
+    @classmethod
+    def from_row(cls, row) -> 'BundleOp':
+        gid, seq, action, changes, prev, user_id, ts, target = row
+        return cls(gid, seq, action, [tuple(c) for c in changes], [tuple(p) for p in prev], user_id, ts, target)
+
+
+def nest_items(items: dict[tuple[str, str, str], bool]) -> dict:
+    """{(room, bundle, item): checked} -> {room: {bundle: {'items': {item: checked}}}}"""
+    guild: dict = {}
+    for (room, bundle, item), checked in items.items():
+        guild.setdefault(room, {}).setdefault(bundle, {'items': {}})['items'][item] = checked
+    return guild
+
+########################
+# Store interface
+########################
+
+class StateStore:
+    """
+    Backend-agnostic bundle progress store.
+
+    Guild state uses the same nesting as bundles_state.json:
+    {room: {bundle: {'items': {item: bool}}}}. Items that were never
+    touched may be missing; callers treat missing as unchecked.
+    """
+
+    def load_guild(self, guild_id: str) -> dict:
+        raise NotImplementedError
+
+    def history(self, guild_id: str, limit: int) -> list[BundleOp]:
+        """The guild's most recent ops, oldest first."""
+        raise NotImplementedError
+
+    def write_batch(self, changes: dict[str, 'GuildChanges']) -> int:
+        """Apply coalesced changes and append ops for many guilds in one go. Returns rows written."""
+        raise NotImplementedError
+
+    def export_state(self) -> dict:
+        """Every guild's stored checkmarks, shaped like bundles_state.json."""
+        raise NotImplementedError
+
+    def import_state(self, state: dict) -> int:
+        """Merge a bundles_state.json-shaped dict into the store. Returns rows written."""
+        raise NotImplementedError
+
+    def import_legacy_json(self, path: str) -> int:
+        """One-time import of the old bundles_state.json. Returns rows written (0 if already done)."""
+        raise NotImplementedError
+
+    def load_calendars(self) -> dict[str, dict]:
+        """Every guild's calendar settings."""
+        raise NotImplementedError
+
+    def save_calendar(self, guild_id: str, settings: dict | None) -> None:
+        """Replace a guild's calendar settings; None deletes them."""
+        raise NotImplementedError
+
+    def close(self) -> None:
+        pass
+
+########################
+# SQLite backend
+########################
+
+class SqliteStateStore(StateStore):
+    """
+    One row per (guild, bundle, item) in a WAL-mode SQLite database.
+
+    A check/uncheck is a single-row upsert, so its cost does not depend on
+    how many guilds use the bot, and a crash mid-write cannot take other
+    servers' progress with it.
+
+    bundle_items is the snapshot; bundle_ops is the per-guild log, keyed by
+    (guild_id, seq) so the history tail is an index range scan. Ops older
+    than the newest `ops_retain` per guild are pruned as batches are written.
+    """
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS bundle_items (
+            guild_id TEXT NOT NULL,
+            room     TEXT NOT NULL,
+            bundle   TEXT NOT NULL,
+            item     TEXT NOT NULL,
+            checked  INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (guild_id, bundle, item)
+        ) WITHOUT ROWID;
+        CREATE TABLE IF NOT EXISTS bundle_ops (
+            guild_id TEXT NOT NULL,
+            seq      INTEGER NOT NULL,
+            action   TEXT NOT NULL,
+            payload  TEXT NOT NULL,
+            user_id  INTEGER,
+            ts       REAL NOT NULL,
+            PRIMARY KEY (guild_id, seq)
+        ) WITHOUT ROWID;
+        CREATE TABLE IF NOT EXISTS meta (
+            key   TEXT PRIMARY KEY,
+            value TEXT NOT NULL
+        );
+        CREATE TABLE IF NOT EXISTS guild_calendars (
+            guild_id TEXT PRIMARY KEY,
+            settings TEXT NOT NULL
+        ) WITHOUT ROWID;
+    """
+
+    UPSERT_ITEM = (
+        "INSERT INTO bundle_items (guild_id, room, bundle, item, checked) VALUES (?, ?, ?, ?, ?) "
+        "ON CONFLICT (guild_id, bundle, item) DO UPDATE SET room = excluded.room, checked = excluded.checked"
+    )
+
+    def __init__(self, path: str, ops_retain: int = 50):
+        self.path = path
+        self.ops_retain = ops_retain
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        # The connection is shared across threads, so guard it with a lock.
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("PRAGMA busy_timeout=5000")
+        self._conn.executescript(self.SCHEMA)
+
+    def load_guild(self, guild_id: str) -> dict:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT room, bundle, item, checked FROM bundle_items WHERE guild_id = ?",
+                (str(guild_id),),
+            ).fetchall()
+        guild: dict = {}
+        for room_name, bundle_name, item_name, checked in rows:
+            items = guild.setdefault(room_name, {}).setdefault(bundle_name, {'items': {}})['items']
+            items[item_name] = bool(checked)
+        return guild
+
+    def history(self, guild_id: str, limit: int) -> list[BundleOp]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT seq, action, payload, user_id, ts FROM bundle_ops WHERE guild_id = ? ORDER BY seq DESC LIMIT ?",
+                (str(guild_id), limit),
+            ).fetchall()
+        ops = []
+        for seq, action, payload, user_id, ts in reversed(rows):
+            changes, prev, target = json.loads(payload)
+            ops.append(BundleOp.from_row([str(guild_id), seq, action, changes, prev, user_id, ts, target]))
+        return ops
+
+    def write_batch(self, changes: dict[str, 'GuildChanges']) -> int:
+        rows = [
+            (gid, room, bundle, item, int(checked))
+            for gid, change in changes.items()
+            for (room, bundle, item), checked in change.items.items()
+        ]
+        resets = [(gid,) for gid, change in changes.items() if change.reset]
+        ops = [
+            (op.guild_id, op.seq, op.action, json.dumps([op.changes, op.prev, op.target], ensure_ascii=False), op.user_id, op.ts)
+            for change in changes.values()
+            for op in change.ops
+        ]
+        prune = [(gid, change.ops[-1].seq - self.ops_retain) for gid, change in changes.items() if change.ops]
+        with self._lock:
+            with self._transaction():
+                if resets:
+                    self._conn.executemany("DELETE FROM bundle_items WHERE guild_id = ?", resets)
+                self._conn.executemany(self.UPSERT_ITEM, rows)
+                self._conn.executemany(
+                    "INSERT OR REPLACE INTO bundle_ops (guild_id, seq, action, payload, user_id, ts) VALUES (?, ?, ?, ?, ?, ?)",
+                    ops,
+                )
+                self._conn.executemany("DELETE FROM bundle_ops WHERE guild_id = ? AND seq <= ?", prune)
+        return len(rows) + len(ops)
+
+    def export_state(self) -> dict:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT guild_id, room, bundle, item, checked FROM bundle_items ORDER BY guild_id"
+            ).fetchall()
+        state: dict = {}
+        for gid, room_name, bundle_name, item_name, checked in rows:
+            items = state.setdefault(gid, {}).setdefault(room_name, {}).setdefault(bundle_name, {'items': {}})['items']
+            items[item_name] = bool(checked)
+        return state
+
+    def import_state(self, state: dict) -> int:
+        rows = [(gid, room, bundle, item, int(checked)) for gid, room, bundle, item, checked in iter_json_checks(state)]
+        with self._lock:
+            with self._transaction():
+                self._conn.executemany(self.UPSERT_ITEM, rows)
+        return len(rows)
+
+    def import_legacy_json(self, path: str) -> int:
+        if self._get_meta('legacy_json_imported'):
+            return 0
+        written = self.import_state(read_json_state(path))
+        self._set_meta('legacy_json_imported', os.path.abspath(path))
+        return written
+
+    def load_calendars(self) -> dict[str, dict]:
+        with self._lock:
+            rows = self._conn.execute("SELECT guild_id, settings FROM guild_calendars").fetchall()
+        return {gid: json.loads(settings) for gid, settings in rows}
+
+    def save_calendar(self, guild_id: str, settings: dict | None) -> None:
+        with self._lock:
+            if settings is None:
+                self._conn.execute("DELETE FROM guild_calendars WHERE guild_id = ?", (str(guild_id),))
+            else:
+                self._conn.execute(
+                    "INSERT INTO guild_calendars (guild_id, settings) VALUES (?, ?) "
+                    "ON CONFLICT (guild_id) DO UPDATE SET settings = excluded.settings",
+                    (str(guild_id), json.dumps(settings)),
+                )
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+    @contextmanager
+    def _transaction(self):
+        self._conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield
+        except BaseException:
+            self._conn.execute("ROLLBACK")
+            raise
+        self._conn.execute("COMMIT")
+
+    def _get_meta(self, key: str) -> str | None:
+        with self._lock:
+            row = self._conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def _set_meta(self, key: str, value: str) -> None:
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO meta (key, value) VALUES (?, ?) ON CONFLICT (key) DO UPDATE SET value = excluded.value",
+                (key, value),
+            )
+
+########################
+# Journal backend
+########################
+
+class JournalStateStore(StateStore):
+    """
+    Append-only op log with periodic compaction.
+
+    <path>           one op per line (see _encode_op)
+    <path>.snapshot  checked items, last seq and history tail per guild
+
+    A write appends only the new ops, so it costs O(1) bytes no matter how
+    many guilds are stored. Once `compact_every` entries pile up the whole
+    state is written to the snapshot and the log is truncated. On startup
+    the snapshot is loaded and the log replayed; ops already covered by the
+    snapshot (crash between snapshot and truncate) are skipped by seq.
+
+    Lines are tab-separated rather than JSON: replay only has to split
+    strings, which is several times faster than building nested lists for
+    hundreds of thousands of entries. History tails keep the raw lines and
+    are only decoded when someone asks for them.
+
+    Calendar settings are logged as `@calendar<TAB>guild<TAB>json` lines
+    (empty json: deleted) and kept whole in the snapshot.
+    """
+
+    SNAPSHOT_VERSION = 2
+    # Separators inside a line: tabs between fields, then records/units for change lists.
+    FIELD, RECORD, UNIT = '\t', '\x1e', '\x1f'
+    CALENDAR_TAG = '@calendar'
+
+    def __init__(self, path: str, ops_retain: int = 50, compact_every: int = 50_000):
+        self.path = path
+        self.snapshot_path = f"{path}.snapshot"
+        self.ops_retain = ops_retain
+        self.compact_every = compact_every
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._lock = threading.Lock()
+        self._items: dict[str, dict[tuple[str, str, str], bool]] = {}
+        self._seqs: dict[str, int] = {}
+        self._tails: dict[str, deque] = {}
+        self._meta: dict[str, str] = {}
+        self._calendars: dict[str, dict] = {}
+        self._journal_entries = 0
+        self._load_snapshot()
+        self._replay_journal()
+        self._fh = open(path, 'a', encoding='utf-8', newline='\n')
+
+    # ----- line format -----
+
+    @classmethod
+    def _encode_changes(cls, changes) -> str:
+        return cls.RECORD.join(cls.UNIT.join((room, bundle, item, '1' if checked else '0')) for room, bundle, item, checked in changes)
+
+    @classmethod
+    def _decode_changes(cls, text: str) -> list[tuple[str, str, str, bool]]:
+        if not text:
+            return []
+        out = []
+        for record in text.split(cls.RECORD):
+            room, bundle, item, checked = record.split(cls.UNIT)
+            out.append((room, bundle, item, checked == '1'))
+        return out
+
+    @classmethod
+    def _encode_op(cls, op: BundleOp) -> str:
+        # guild, seq, action, user, ts, target, changes, prev
+        return cls.FIELD.join((
+            op.guild_id, str(op.seq), op.action,
+            '' if op.user_id is None else str(op.user_id),
+            repr(op.ts),
+            '' if op.target is None else str(op.target),
+            cls._encode_changes(op.changes),
+            cls._encode_changes(op.prev),
+        ))
+
+    @classmethod
+    def _decode_op(cls, line: str) -> BundleOp:
+        gid, seq, action, user_id, ts, target, changes, prev = line.split(cls.FIELD)
+        return BundleOp(
+            gid, int(seq), action, cls._decode_changes(changes), cls._decode_changes(prev),
+            int(user_id) if user_id else None, float(ts), int(target) if target else None,
+        )
+
+    # ----- startup -----
+
+    def _load_snapshot(self) -> None:
+        snapshot = read_json_state(self.snapshot_path)
+        if snapshot.get('version') != self.SNAPSHOT_VERSION:
+            return
+        self._meta = snapshot.get('meta', {})
+        self._calendars = snapshot.get('calendars', {})
+        self._seqs = {gid: int(seq) for gid, seq in snapshot.get('seqs', {}).items()}
+        for gid, packed in snapshot.get('items', {}).items():
+            self._items[gid] = {(room, bundle, item): checked for room, bundle, item, checked in self._decode_changes(packed)}
+        for gid, lines in snapshot.get('tails', {}).items():
+            self._tails[gid] = deque(lines, maxlen=self.ops_retain)
+
+    def _replay_journal(self) -> None:
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, 'rb') as f:
+            data = f.read()
+        # A crash mid-append can leave a torn last line; drop it so new appends start clean.
+        if data and not data.endswith(b'\n'):
+            data = data[:data.rfind(b'\n') + 1]
+            with open(self.path, 'r+b') as f:
+                f.truncate(len(data))
+        applied = 0
+        for line in data.decode('utf-8').split('\n'):
+            if line:
+                self._apply_line(line)
+                applied += 1
+        self._journal_entries = applied
+
+    def _apply_line(self, line: str) -> None:
+        fields = line.split(self.FIELD)
+        if fields[0] == self.CALENDAR_TAG:
+            if fields[2]:
+                self._calendars[fields[1]] = json.loads(fields[2])
+            else:
+                self._calendars.pop(fields[1], None)
+            return
+        gid, seq = fields[0], int(fields[1])
+        if seq <= self._seqs.get(gid, 0):
+            return
+        self._seqs[gid] = seq
+        items = self._items.get(gid)
+        if items is None:
+            items = self._items[gid] = {}
+        if fields[2] == 'reset':
+            items.clear()
+        if fields[6]:
+            for record in fields[6].split(self.RECORD):
+                room, bundle, item, checked = record.split(self.UNIT)
+                items[(room, bundle, item)] = checked == '1'
+        tail = self._tails.get(gid)
+        if tail is None:
+            tail = self._tails[gid] = deque(maxlen=self.ops_retain)
+        tail.append(line)
+
+    # ----- StateStore -----
+
+    def load_guild(self, guild_id: str) -> dict:
+        with self._lock:
+            return nest_items(dict(self._items.get(str(guild_id), {})))
+
+    def history(self, guild_id: str, limit: int) -> list[BundleOp]:
+        with self._lock:
+            lines = list(self._tails.get(str(guild_id), ()))[-limit:]
+        return [self._decode_op(line) for line in lines]
+
+    def write_batch(self, changes: dict[str, 'GuildChanges']) -> int:
+        lines = [self._encode_op(op) for change in changes.values() for op in change.ops]
+        if not lines:
+            return 0
+        with self._lock:
+            self._fh.write('\n'.join(lines) + '\n')
+            self._fh.flush()
+            os.fsync(self._fh.fileno())
+            for line in lines:
+                self._apply_line(line)
+            self._journal_entries += len(lines)
+            if self._journal_entries >= self.compact_every:
+                self._compact_locked()
+        return len(lines)
+
+    def export_state(self) -> dict:
+        with self._lock:
+            return {gid: nest_items(dict(items)) for gid, items in self._items.items() if items}
+
+    def import_state(self, state: dict) -> int:
+        written = 0
+        with self._lock:
+            for gid, room, bundle, item, checked in iter_json_checks(state):
+                self._items.setdefault(gid, {})[(room, bundle, item)] = checked
+                written += 1
+            self._compact_locked()
+        return written
+
+    def import_legacy_json(self, path: str) -> int:
+        if self._meta.get('legacy_json_imported'):
+            return 0
+        with self._lock:
+            self._meta['legacy_json_imported'] = os.path.abspath(path)
+        return self.import_state(read_json_state(path))
+
+    def load_calendars(self) -> dict[str, dict]:
+        with self._lock:
+            return dict(self._calendars)
+
+    def save_calendar(self, guild_id: str, settings: dict | None) -> None:
+        line = self.FIELD.join((self.CALENDAR_TAG, str(guild_id), '' if settings is None else json.dumps(settings)))
+        with self._lock:
+            self._fh.write(line + '\n')
+            self._fh.flush()
+            os.fsync(self._fh.fileno())
+            self._apply_line(line)
+            self._journal_entries += 1
+
+    def compact(self) -> None:
+        with self._lock:
+            self._compact_locked()
+
+    def close(self) -> None:
+        with self._lock:
+            self._fh.close()
+
+    def _compact_locked(self) -> None:
+        snapshot = {
+            'version': self.SNAPSHOT_VERSION,
+            'meta': self._meta,
+            'calendars': self._calendars,
+            'seqs': self._seqs,
+            'items': {
+                gid: self._encode_changes((room, bundle, item, True) for (room, bundle, item), checked in items.items() if checked)
+                for gid, items in self._items.items()
+            },
+            'tails': {gid: list(tail) for gid, tail in self._tails.items()},
+        }
+        write_json_state(self.snapshot_path, snapshot, indent=None)
+        # The snapshot now covers every logged op, so the log can start over.
+        self._fh.seek(0)
+        self._fh.truncate()
+        self._journal_entries = 0
+
+########################
+# In-memory cache + write-behind
+########################
+
+class GuildChanges:
+    """Pending writes for one guild. Later toggles of the same item overwrite earlier ones; ops are kept in order."""
+    __slots__ = ('reset', 'items', 'ops')
+
+    def __init__(self):
+        self.reset = False
+        self.items: dict[tuple[str, str, str], bool] = {}
+        self.ops: list[BundleOp] = []
+
+
+class BundleStateCache:
+    """
+    Keeps every loaded guild's bundle state in memory as the source of truth.
+
+    Checks update memory immediately and mark the guild dirty. A single
+    background task waits `flush_delay` seconds after the first change so a
+    burst of checks is coalesced, then writes all dirty guilds in one
+    store.write_batch() call on an executor thread. flush() forces a write
+    (used on shutdown).
+
+    The newest `history_size` ops per guild are kept in memory as well, so
+    history and undo never read the log.
+
+    Guild state is a GuildProgress bitmask over `layout`; the store keeps
+    using item names, so it does not care how items are numbered.
+    """
+
+    def __init__(self, store: StateStore, layout: BundleLayout, flush_delay: float = 2.0, history_size: int = 50):
+        self.store = store
+        self.layout = layout
+        self._layouts: dict[int, BundleLayout] = {layout.version: layout}
+        self.flush_delay = flush_delay
+        self.history_size = history_size
+        self._guilds: dict[str, GuildProgress] = {}
+        self._tails: dict[str, deque] = {}
+        self._seqs: dict[str, int] = {}
+        self._pending: dict[str, GuildChanges] = {}
+        self._dirty_since: float | None = None
+        self._wakeup: asyncio.Event | None = None
+        self._flush_lock: asyncio.Lock | None = None
+        self._task: asyncio.Task | None = None
+        # Tuning stats
+        self.flushes = 0
+        self.rows_written = 0
+        self.changes_coalesced = 0
+        self.last_flush_lag = 0.0
+        self.max_flush_lag = 0.0
+        self.last_flush_duration = 0.0
+        self.flush_errors = 0
+        # Optional fn(op, seconds) for store timings; op is 'load' or 'write'.
+        self.on_timing: Callable[[str, float], None] | None = None
+
+    # ----- reads -----
+
+    async def get(self, guild_id: str) -> GuildProgress:
+        gid = str(guild_id)
+        if gid not in self._guilds:
+            started = time.monotonic()
+            stored, ops = await asyncio.get_running_loop().run_in_executor(None, self._load, gid)
+            if self.on_timing:
+                self.on_timing('load', time.monotonic() - started)
+            # Another command may have loaded this guild while we waited.
+            if gid not in self._guilds:
+                self._guilds[gid] = self.layout.from_stored(stored)
+                self._tails[gid] = deque(ops, maxlen=self.history_size)
+                self._seqs[gid] = ops[-1].seq if ops else 0
+        return self._current(gid)
+
+    def peek(self, guild_id: str) -> GuildProgress | None:
+        """A guild's progress if it is already in memory; never touches the store."""
+        gid = str(guild_id)
+        return self._current(gid) if gid in self._guilds else None
+
+    def _current(self, gid: str) -> GuildProgress:
+        """A loaded guild's progress over the current layout, remapped by item name if the layout changed since."""
+        progress = self._guilds[gid]
+        if progress.version != self.layout.version:
+            progress = self._guilds[gid] = self.layout.migrate(progress, self._layouts[progress.version])
+        return progress
+
+    def seed(self, guild_id: str, progress: GuildProgress) -> None:
+        """Put a guild's progress in memory as if it had been loaded, without reading the store (benchmarks)."""
+        gid = str(guild_id)
+        self._guilds[gid] = progress
+        self._tails[gid] = deque(maxlen=self.history_size)
+        self._seqs.setdefault(gid, 0)
+
+    def set_layout(self, layout: BundleLayout) -> None:
+        """Switch to a new item numbering; cached guilds are remapped the next time they are read."""
+        self._layouts[layout.version] = layout
+        self.layout = layout
+
+    def _load(self, gid: str) -> tuple[dict, list[BundleOp]]:
+        return self.store.load_guild(gid), self.store.history(gid, self.history_size)
+
+    def history(self, guild_id: str, limit: int) -> list[BundleOp]:
+        """Newest-first ops for a loaded guild."""
+        tail = self._tails.get(str(guild_id), ())
+        return list(reversed(tail))[:limit]
+
+    # ----- writes (guild must be loaded with get() first) -----
+
+    def set_item(self, guild_id: str, room: str, bundle: str, item: str, checked: bool, user_id: int | None = None) -> BundleOp:
+        gid = str(guild_id)
+        bit = self.layout.bit(bundle, item)
+        prev = self._current(gid).set(self.layout.item_slots[bit], bit, checked)
+        change = self._pending_for(gid)
+        key = (room, bundle, item)
+        if key in change.items:
+            self.changes_coalesced += 1
+        change.items[key] = checked
+        return self._record(gid, change, 'check' if checked else 'uncheck', [(room, bundle, item, checked)], [(room, bundle, item, prev)], user_id)
+
+    def reset_guild(self, guild_id: str, user_id: int | None = None) -> BundleOp:
+        gid = str(guild_id)
+        prev = [(room, bundle, item, True) for room, bundle, item in self.layout.checked_items(self._current(gid))]
+        self._guilds[gid] = self.layout.empty()
+        change = self._pending_for(gid)
+        self.changes_coalesced += len(change.items)
+        change.items.clear()
+        change.reset = True
+        return self._record(gid, change, 'reset', [], prev, user_id)
+
+    def replace_guild(self, guild_id: str, checked, user_id: int | None = None, action: str = 'import') -> BundleOp:
+        """
+        Make `checked` ((room, bundle, item) names) the guild's whole progress
+        as one op, e.g. after reading a save file. Only items that change are
+        written, and the op can be undone like any other.
+        """
+        gid = str(guild_id)
+        progress = self.layout.from_checked(checked)
+        diff = self._current(gid).mask ^ progress.mask
+        change = self._pending_for(gid)
+        changes, prev = [], []
+        while diff:
+            low = diff & -diff
+            bit = low.bit_length() - 1
+            diff ^= low
+            room, bundle, item = self.layout.items[bit]
+            now = progress.is_checked(bit)
+            change.items[(room, bundle, item)] = now
+            changes.append((room, bundle, item, now))
+            prev.append((room, bundle, item, not now))
+        self._guilds[gid] = progress
+        return self._record(gid, change, action, changes, prev, user_id)
+
+    def undo(self, guild_id: str, user_id: int | None = None) -> tuple[BundleOp, BundleOp] | None:
+        """Revert the guild's newest op that hasn't been undone. Returns (undo_op, reverted_op)."""
+        gid = str(guild_id)
+        tail = self._tails[gid]
+        undone = {op.target for op in tail if op.action == 'undo'}
+        target = next((op for op in reversed(tail) if op.action != 'undo' and op.seq not in undone), None)
+        if target is None:
+            return None
+        progress = self._current(gid)
+        change = self._pending_for(gid)
+        applied, prev = [], []
+        # Undo goes newest-first, so anything checked after a reset has already
+        # been undone; restoring the reset's pre-reset checks is enough.
+        for room, bundle, item, checked in target.prev:
+            bit = self.layout.bit(bundle, item)
+            if bit is None:
+                # Item no longer exists in the bundle data.
+                continue
+            prev.append((room, bundle, item, progress.set(self.layout.item_slots[bit], bit, checked)))
+            change.items[(room, bundle, item)] = checked
+            applied.append((room, bundle, item, checked))
+        return self._record(gid, change, 'undo', applied, prev, user_id, target=target.seq), target
+
+    def _record(self, gid: str, change: GuildChanges, action: str, changes: list, prev: list,
+                user_id: int | None, target: int | None = None) -> BundleOp:
+        seq = self._seqs[gid] = self._seqs.get(gid, 0) + 1
+        op = BundleOp(gid, seq, action, changes, prev, user_id, target=target)
+        change.ops.append(op)
+        self._tails[gid].append(op)
+        return op
+
+    def _pending_for(self, gid: str) -> GuildChanges:
+        change = self._pending.get(gid)
+        if change is None:
+            change = self._pending[gid] = GuildChanges()
+        if self._dirty_since is None:
+            self._dirty_since = time.monotonic()
+        if self._wakeup is not None:
+            self._wakeup.set()
+        return change
+
+    # ----- flushing -----
+
+    def start(self) -> None:
+        """Start the background flusher on the running loop."""
+        if self._task is None:
+            self._wakeup = asyncio.Event()
+            self._flush_lock = asyncio.Lock()
+            if self._pending:
+                self._wakeup.set()
+            self._task = asyncio.get_running_loop().create_task(self._flusher())
+
+    async def _flusher(self) -> None:
+        while True:
+            await self._wakeup.wait()
+            await asyncio.sleep(self.flush_delay)
+            try:
+                await self.flush()
+            except Exception as e:
+                # Changes were put back into _pending; try again next round.
+                print("Bundle state flush failed:", repr(e))
+
+    async def flush(self) -> None:
+        """Write every pending change now (off the event loop)."""
+        if self._flush_lock is None:
+            return self.flush_sync()
+        async with self._flush_lock:
+            batch, dirty_since = self._take_batch()
+            if not batch:
+                return
+            started = time.monotonic()
+            try:
+                written = await asyncio.get_running_loop().run_in_executor(None, self.store.write_batch, batch)
+            except Exception:
+                self._restore_batch(batch, dirty_since)
+                raise
+            self._record_flush(written, dirty_since, started)
+
+    def flush_sync(self) -> None:
+        """Blocking flush for use outside the event loop (e.g. after it has stopped)."""
+        batch, dirty_since = self._take_batch()
+        if not batch:
+            return
+        started = time.monotonic()
+        try:
+            written = self.store.write_batch(batch)
+        except Exception:
+            self._restore_batch(batch, dirty_since)
+            raise
+        self._record_flush(written, dirty_since, started)
+
+    async def stop(self) -> None:
+        """Cancel the flusher and write anything still pending."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.flush()
+
+    def _take_batch(self) -> tuple[dict[str, GuildChanges], float | None]:
+        batch, self._pending = self._pending, {}
+        dirty_since, self._dirty_since = self._dirty_since, None
+        if self._wakeup is not None:
+            self._wakeup.clear()
+        return batch, dirty_since
+
+    def _restore_batch(self, batch: dict[str, GuildChanges], dirty_since: float | None) -> None:
+        self.flush_errors += 1
+        # Anything changed since the batch was taken is newer and wins.
+        for gid, change in batch.items():
+            newer = self._pending.get(gid)
+            if newer is None:
+                self._pending[gid] = change
+                continue
+            newer.ops = change.ops + newer.ops
+            if not newer.reset:
+                merged = dict(change.items)
+                merged.update(newer.items)
+                newer.items = merged
+                newer.reset = change.reset
+        if dirty_since is not None and (self._dirty_since is None or dirty_since < self._dirty_since):
+            self._dirty_since = dirty_since
+        if self._wakeup is not None and self._pending:
+            self._wakeup.set()
+
+    def _record_flush(self, written: int, dirty_since: float | None, started: float) -> None:
+        finished = time.monotonic()
+        self.flushes += 1
+        self.rows_written += written
+        self.last_flush_duration = finished - started
+        if self.on_timing:
+            self.on_timing('write', self.last_flush_duration)
+        if dirty_since is not None:
+            self.last_flush_lag = finished - dirty_since
+            self.max_flush_lag = max(self.max_flush_lag, self.last_flush_lag)
+
+    def stats(self) -> dict:
+        """Numbers for tuning flush_delay: how far behind the store is and how much is coalesced."""
+        return {
+            'cached_guilds': len(self._guilds),
+            'pending_dirty_guilds': len(self._pending),
+            'pending_changes': sum(len(c.items) + c.reset for c in self._pending.values()),
+            'pending_ops': sum(len(c.ops) for c in self._pending.values()),
+            'oldest_pending_age': (time.monotonic() - self._dirty_since) if self._dirty_since is not None else 0.0,
+            'flush_delay': self.flush_delay,
+            'flushes': self.flushes,
+            'rows_written': self.rows_written,
+            'changes_coalesced': self.changes_coalesced,
+            'last_flush_lag': self.last_flush_lag,
+            'max_flush_lag': self.max_flush_lag,
+            'last_flush_duration': self.last_flush_duration,
+            'flush_errors': self.flush_errors,
+        }
+
+########################
+# Backend selection
+########################
+
+STATE_BACKENDS: dict[str, type[StateStore]] = {
+    'sqlite': SqliteStateStore,
+    'journal': JournalStateStore,
+}
+
+
+def default_store_path(json_path: str, backend: str) -> str:
+    """Place the store next to bundles_state.json, e.g. /data/bundles_state.sqlite3."""
+    return f"{os.path.splitext(json_path)[0]}.{backend if backend != 'sqlite' else 'sqlite3'}"
+
+
+def open_state_store(backend: str, path: str) -> StateStore:
+    try:
+        store_cls = STATE_BACKENDS[backend.lower()]
+    except KeyError:
+        raise ValueError(f"Unknown BUNDLES_STATE_BACKEND '{backend}'. Choose one of: {', '.join(STATE_BACKENDS)}")
+    return store_cls(path)
+
+
+def _cli(argv: list[str]) -> int:
+    if len(argv) != 2 or argv[0] not in ('export', 'import'):
+        print("Usage: python state_store.py export|import <bundles_state.json>")
+        return 2
+    json_path = os.getenv('BUNDLES_STATE_PATH') or os.path.join(os.path.dirname(os.path.abspath(__file__)), 'bundles_state.json')
+    backend = os.getenv('BUNDLES_STATE_BACKEND') or 'sqlite'
+    store = open_state_store(backend, os.getenv('BUNDLES_DB_PATH') or default_store_path(json_path, backend))
+    try:
+        if argv[0] == 'export':
+            write_json_state(argv[1], store.export_state())
+            print(f"Exported bundle progress to {argv[1]}")
+        else:
+            print(f"Imported {store.import_state(read_json_state(argv[1]))} checkmarks from {argv[1]}")
+    finally:
+        store.close()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(_cli(sys.argv[1:]))
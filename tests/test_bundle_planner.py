@@ -0,0 +1,64 @@
+from bundle_planner import ANY_TIME, CROP, FISH, FORAGE, BundlePlanner
+from bundle_progress import BundleLayout
+from farm_calendar import DAYS_PER_YEAR, day_number
+from game_data import bundle_base_name
+from records import Crop, Fish, Season
+
+COMMUNITY = {
+    'Pantry': {'Bundles': {'Spring Crops Bundle': {'items': dict.fromkeys(['Parsnip', 'Cauliflower', 'Melon'], False), 'amount': 2}}},
+    'Fish Tank': {'Bundles': {'River Fish Bundle': {'items': {'Catfish': False}, 'amount': 1}}},
+    'Boiler Room': {'Bundles': {"Blacksmith's Bundle": {'items': {'Copper Bar': False}, 'amount': 1}}},
+    'Crafts Room': {'Bundles': {'Spring Foraging Bundle': {'items': {'Salmonberry': False}, 'amount': 1}}},
+    'Vault': {'Bundles': {'Odd Bundle': {'items': {'Slow Squash': False}, 'amount': 1}}},
+}
+CROPS = {name: Crop(name, {'Season': season, 'Type': 'Single Harvest', 'Growth Time': str(days)})
+         for name, season, days in (('Parsnip', 'Spring', 4), ('Cauliflower', 'Spring', 12),
+                                    ('Melon', 'Summer', 12), ('Slow Squash', 'Spring', 40))}
+FISH_DATA = {'Catfish': Fish('Catfish', {'Season': 'Spring, Fall', 'Weather': 'Rain', 'Time': '6am - 12am'})}
+SEASONS = {'Spring': Season('Spring', {'Foraging': ['Salmonberry (Spring 15-18)']})}
+
+LAYOUT = BundleLayout(COMMUNITY)
+PLANNER = BundlePlanner(LAYOUT, CROPS, FISH_DATA, {}, SEASONS, bundle_base_name)
+
+
+def _steps(plan) -> dict[str, tuple]:
+    return {step.item: (step.kind, step.day, step.ready) for step in plan.steps}
+
+
+def test_plan_from_spring_1():
+    plan = PLANNER.plan(0, 0)
+    assert _steps(plan) == {
+        'Catfish': (FISH, 0, 0),
+        'Parsnip': (CROP, 0, 4),
+        'Cauliflower': (CROP, 0, 12),
+        'Salmonberry': (FORAGE, 14, 14),
+    }
+    assert [step.item for step in plan.steps if step.rain_only] == ['Catfish']
+    assert [(step.item, step.kind) for step in plan.any_time] == [('Copper Bar', ANY_TIME)]
+    # A 40-day spring crop can never be grown, so its room can't be finished.
+    assert [step.item for step in plan.blocked] == ['Slow Squash']
+    assert dict(plan.rooms) == {'Pantry': 12, 'Fish Tank': 0, 'Boiler Room': 0, 'Crafts Room': 14, 'Vault': None}
+    assert plan.next_year == []
+
+
+def test_late_start_picks_the_soonest_items_and_flags_next_year():
+    start = day_number('Spring', 20)
+    plan = PLANNER.plan(0, start)
+    steps = _steps(plan)
+    # Cauliflower no longer fits in spring; Summer's Melon is ready before next spring's Cauliflower.
+    assert steps['Parsnip'] == (CROP, start, start + 4)
+    assert steps['Melon'] == (CROP, day_number('Summer', 1), day_number('Summer', 13))
+    assert 'Cauliflower' not in steps
+    assert steps['Salmonberry'] == (FORAGE, DAYS_PER_YEAR + 14, DAYS_PER_YEAR + 14)
+    assert [step.item for step in plan.next_year] == ['Salmonberry']
+    assert dict(plan.rooms)['Pantry'] == day_number('Summer', 13)
+
+
+def test_checked_items_and_complete_rooms_are_left_out():
+    progress = LAYOUT.from_checked([('Pantry', 'Spring Crops Bundle', 'Parsnip'), ('Fish Tank', 'River Fish Bundle', 'Catfish')])
+    plan = PLANNER.plan(progress.mask, 0)
+    steps = _steps(plan)
+    assert 'Parsnip' not in steps and 'Catfish' not in steps
+    # One more crop finishes the Spring Crops Bundle: the soonest, Cauliflower.
+    assert steps['Cauliflower'] == (CROP, 0, 12) and 'Melon' not in steps
+    assert 'Fish Tank' not in dict(plan.rooms)
@@ -0,0 +1,51 @@
+from bundle_progress import BundleLayout
+
+
+def _community(bundles: dict[str, tuple[int, list[str]]]) -> dict:
+    return {'Pantry': {'Bundles': {
+        name: {'items': dict.fromkeys(items, False), 'amount': amount} for name, (amount, items) in bundles.items()
+    }}}
+
+OLD = BundleLayout(_community({'Spring Crops Bundle': (2, ['Parsnip', 'Potato', 'Kale']),
+                               'Animal Bundle': (2, ['Large Egg', 'Wool'])}))
+
+
+def test_checked_items_round_trip():
+    progress = OLD.from_checked([('Pantry', 'Spring Crops Bundle', 'Parsnip'), ('Pantry', 'Animal Bundle', 'Wool')])
+    assert OLD.checked_items(progress) == [('Pantry', 'Spring Crops Bundle', 'Parsnip'), ('Pantry', 'Animal Bundle', 'Wool')]
+    assert progress.completed(OLD.bundle_by_name['Spring Crops Bundle']) == 1
+
+
+def test_from_stored_ignores_unknown_items():
+    progress = OLD.from_stored({'Pantry': {'Spring Crops Bundle': {'items': {'Parsnip': True, 'Gold Bar': True, 'Kale': False}}}})
+    assert OLD.checked_items(progress) == [('Pantry', 'Spring Crops Bundle', 'Parsnip')]
+
+
+def test_migrate_keeps_items_by_name_when_items_are_added_and_removed():
+    # Potato is gone, Cauliflower and a whole bundle are new, and every bit after them moves.
+    new = BundleLayout(_community({'Quality Crops Bundle': (1, ['Melon']),
+                                   'Spring Crops Bundle': (2, ['Parsnip', 'Cauliflower', 'Kale']),
+                                   'Animal Bundle': (2, ['Large Egg', 'Wool'])}))
+    assert new.version != OLD.version
+    progress = OLD.from_checked([('Pantry', 'Spring Crops Bundle', 'Parsnip'), ('Pantry', 'Spring Crops Bundle', 'Potato'),
+                                 ('Pantry', 'Animal Bundle', 'Wool')])
+    migrated = new.migrate(progress, OLD)
+    assert migrated.version == new.version
+    assert new.checked_items(migrated) == [('Pantry', 'Spring Crops Bundle', 'Parsnip'), ('Pantry', 'Animal Bundle', 'Wool')]
+    # Counts follow the remapped bits: Spring Crops lost Potato.
+    assert migrated.completed(new.bundle_by_name['Spring Crops Bundle']) == 1
+    assert migrated.completed(new.bundle_by_name['Animal Bundle']) == 1
+    assert migrated.completed(new.bundle_by_name['Quality Crops Bundle']) == 0
+
+
+def test_migrate_to_the_same_layout_changes_nothing():
+    progress = OLD.from_checked([('Pantry', 'Animal Bundle', 'Large Egg')])
+    migrated = BundleLayout(_community({'Spring Crops Bundle': (2, ['Parsnip', 'Potato', 'Kale']),
+                                        'Animal Bundle': (2, ['Large Egg', 'Wool'])})).migrate(progress, OLD)
+    assert (migrated.version, migrated.mask, bytes(migrated.counts)) == (progress.version, progress.mask, bytes(progress.counts))
+
+
+def test_needed_mask_skips_complete_bundles():
+    progress = OLD.from_checked([('Pantry', 'Spring Crops Bundle', 'Parsnip'), ('Pantry', 'Spring Crops Bundle', 'Kale')])
+    needed = [OLD.items[bit][2] for bit in range(len(OLD.items)) if OLD.needed_mask(progress) >> bit & 1]
+    assert needed == ['Large Egg', 'Wool']
@@ -0,0 +1,79 @@
+import asyncio
+import time
+
+from farm_calendar import DAY_SECONDS, DigestScheduler, FarmCalendar, date_parts, day_number
+
+# Midnight UTC, then the date is set at 08:00 with a 09:00 digest.
+MIDNIGHT = 1_700_006_400
+SET_AT = MIDNIGHT + 8 * 3600
+DIGEST = MIDNIGHT + 9 * 3600
+
+
+def test_day_number_round_trip():
+    assert day_number('Summer', 1) == 28
+    assert date_parts(day_number('Winter', 28, 3)) == ('Winter', 28, 3)
+
+
+def test_first_digest_shows_the_date_that_was_set_then_the_next_day():
+    calendar = FarmCalendar(day_number('Spring', 10), SET_AT, channel_id=1, digest_minute=9 * 60)
+    assert calendar.next_digest(SET_AT) == DIGEST
+    assert calendar.today(SET_AT + 60) == day_number('Spring', 10)
+    assert calendar.today(DIGEST) == day_number('Spring', 10)
+    assert calendar.today(DIGEST + DAY_SECONDS) == day_number('Spring', 11)
+    assert calendar.today(DIGEST + 2 * DAY_SECONDS - 1) == day_number('Spring', 11)
+
+
+def test_without_a_digest_the_date_stays_put():
+    calendar = FarmCalendar(day_number('Fall', 3), SET_AT)
+    assert calendar.next_digest(SET_AT) is None
+    assert calendar.today(SET_AT + 30 * DAY_SECONDS) == day_number('Fall', 3)
+
+
+def test_with_digest_before_any_digest_keeps_today():
+    calendar = FarmCalendar(day_number('Spring', 10), SET_AT)
+    moved = calendar.with_digest(1, 9 * 60, now=SET_AT + 60)
+    assert moved.today(DIGEST) == day_number('Spring', 10)
+
+
+def test_with_digest_after_a_digest_showed_today_starts_tomorrow():
+    calendar = FarmCalendar(day_number('Spring', 10), SET_AT, channel_id=1, digest_minute=9 * 60)
+    moved = calendar.with_digest(2, 20 * 60, now=DIGEST + 60)
+    assert moved.channel_id == 2
+    assert moved.today(MIDNIGHT + 20 * 3600) == day_number('Spring', 11)
+
+
+def test_with_digest_off_freezes_the_current_date():
+    calendar = FarmCalendar(day_number('Spring', 10), SET_AT, channel_id=1, digest_minute=9 * 60)
+    off = calendar.with_digest(None, None, now=DIGEST + DAY_SECONDS + 60)
+    assert not off.has_digest
+    assert off.today(DIGEST + 10 * DAY_SECONDS) == day_number('Spring', 11)
+
+
+def test_rescheduled_guild_fires_once_and_cancelled_guild_never():
+    fired = []
+
+    async def go():
+        done = asyncio.Event()
+
+        async def fire(guild_id, due):
+            fired.append((guild_id, due))
+            done.set()
+
+        scheduler = DigestScheduler(fire)
+        now = time.time()
+        scheduler.schedule(1, now + 0.02)
+        scheduler.schedule(1, now + 0.05)     # the first entry is now outdated
+        scheduler.schedule(2, now + 0.02)
+        scheduler.schedule(2, None)
+        assert 1 in scheduler and 2 not in scheduler
+        task = asyncio.create_task(scheduler.run())
+        try:
+            await asyncio.wait_for(done.wait(), 5)
+        finally:
+            task.cancel()
+        return scheduler, now
+
+    scheduler, now = asyncio.run(go())
+    # Guild 2's entry and guild 1's outdated one were due first, so they were already dropped.
+    assert fired == [(1, now + 0.05)]
+    assert (len(scheduler), scheduler.next_due()) == (0, None)
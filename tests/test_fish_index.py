@@ -0,0 +1,29 @@
+from fish_index import FishIndex, parse_clock
+from records import Fish
+
+FISH = {
+    'Catfish': Fish('Catfish', {'Location': 'Cindersap Forest River, Town River', 'Season': 'Spring, Fall', 'Time': '6am - 12am', 'Weather': 'Rain'}),
+    'Carp': Fish('Carp', {'Location': 'Mountain Lake', 'Season': 'Spring, Summer, Fall', 'Time': '6am - 2am', 'Weather': 'Any'}),
+}
+INDEX = FishIndex(FISH, {})
+
+
+def _names(bits: int) -> list[str]:
+    return [name for i, name in enumerate(INDEX.names) if bits >> i & 1]
+
+
+def test_location_mask_matches_parts_of_names():
+    assert _names(INDEX.location_mask('river')) == ['Catfish']
+    assert _names(INDEX.location_mask('Mountain-Lake')) == ['Carp']
+    assert INDEX.location_mask('ocean') == 0
+
+
+def test_location_without_letters_matches_nothing():
+    assert INDEX.location_mask('.') == 0
+    assert INDEX.location_mask(' !! ') == 0
+
+
+def test_available_by_season_hour_and_location():
+    assert _names(INDEX.available('Summer', parse_clock('2pm'))) == ['Carp']
+    assert _names(INDEX.available('Spring', parse_clock('1am'))) == ['Carp']
+    assert _names(INDEX.available('Fall', 14, location_bits=INDEX.location_mask('town'))) == ['Catfish']
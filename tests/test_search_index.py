@@ -0,0 +1,45 @@
+from search_index import SearchDoc, SearchIndex, flatten_fields, tokenize
+
+DOCS = [
+    SearchDoc('villager', 'Linus', flatten_fields({'Loves': ['Blueberry Tart', 'Cactus Fruit', 'Salmon Dinner'], 'Image': 'linus.png'})),
+    SearchDoc('fish', 'Salmon', flatten_fields({'Location': 'River', 'Season': 'Fall', 'Bundle': True})),
+    SearchDoc('villager', 'Gus', flatten_fields({'Loves': ['Diamond', 'Escargot', 'Tropical Curry']})),
+    SearchDoc('building', 'Fish Pond', flatten_fields({'Cost': '5,000g, 200 Stone', 'Description': 'Raise fish from the River'})),
+]
+INDEX = SearchIndex(DOCS)
+
+
+def _names(query: str) -> list[str]:
+    return [hit.doc.name for hit in INDEX.search(query)]
+
+
+def test_tokenize():
+    assert tokenize("Sells for 6,000g; Rainy days") == ['sell', 'for', '6000g', 'rainy', 'day']
+    assert tokenize("Abigail's Café, Glass") == ['abigail', 'cafe', 'glass']
+
+
+def test_flatten_fields_skips_images_and_names_flags():
+    assert flatten_fields({'Image': 'x.png', 'Bundle': True, 'Items': {'Parsnip': False, 'Potato': True}}) == [
+        ('Bundle', 'Bundle'), ('Items', 'Parsnip, Potato')]
+
+
+def test_name_match_ranks_first():
+    assert _names('salmon') == ['Salmon', 'Linus']
+
+
+def test_more_matched_words_rank_first():
+    # "river" alone matches Salmon and Fish Pond; "fish" only the pond.
+    assert _names('river fish') == ['Fish Pond', 'Salmon']
+    assert _names('5000g') == ['Fish Pond']
+
+
+def test_matched_fields_exclude_the_name():
+    hits = INDEX.search('salmon dinner')
+    assert hits[0].doc.name == 'Linus' and hits[0].matched == 2
+    assert hits[0].matched_fields() == [('Loves', 'Blueberry Tart, Cactus Fruit, Salmon Dinner')]
+    assert hits[1].doc.name == 'Salmon' and hits[1].matched_fields() == []
+
+
+def test_unknown_word_finds_nothing():
+    assert INDEX.search('zzyzx') == []
+    assert SearchIndex([]).search('salmon') == []
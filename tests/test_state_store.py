@@ -0,0 +1,325 @@
+import asyncio
+import json
+import sqlite3
+import threading
+
+import pytest
+
+from bundle_progress import BundleLayout
+from state_store import BundleOp, BundleStateCache, GuildChanges, JournalStateStore, SqliteStateStore, StateStore
+
+GUILD, OTHER = '111', '222'
+LAYOUT = BundleLayout({'Pantry': {'Bundles': {
+    'Spring Crops Bundle': {'items': dict.fromkeys(['Parsnip', 'Potato', 'Kale', 'Cauliflower'], False), 'amount': 4},
+    'Animal Bundle': {'items': dict.fromkeys(['Large Egg', 'Wool'], False), 'amount': 2},
+}}})
+
+
+def _changes(gid: str, ops: list[tuple], reset: bool = False, seq: int = 0) -> GuildChanges:
+    """A batch for one guild: `ops` are (room, bundle, item, checked), one op each, from seq+1 on."""
+    change = GuildChanges()
+    change.reset = reset
+    for room, bundle, item, checked in ops:
+        change.items[(room, bundle, item)] = checked
+        seq += 1
+        change.ops.append(BundleOp(gid, seq, 'check' if checked else 'uncheck', [(room, bundle, item, checked)],
+                                   [(room, bundle, item, not checked)], user_id=7, ts=1000.0 + seq))
+    return change
+
+
+def test_write_batch_round_trip_with_reset_and_later_checks(tmp_path):
+    store = SqliteStateStore(str(tmp_path / 'state.sqlite3'))
+    store.write_batch({
+        GUILD: _changes(GUILD, [('Pantry', 'Spring Crops Bundle', 'Parsnip', True), ('Pantry', 'Animal Bundle', 'Wool', True)]),
+        OTHER: _changes(OTHER, [('Pantry', 'Animal Bundle', 'Wool', True)]),
+    })
+    # A reset followed by more checks in the same batch: only the later checks survive.
+    store.write_batch({GUILD: _changes(GUILD, [('Pantry', 'Spring Crops Bundle', 'Kale', True)], reset=True, seq=2)})
+    assert store.load_guild(GUILD) == {'Pantry': {'Spring Crops Bundle': {'items': {'Kale': True}}}}
+    assert store.load_guild(OTHER) == {'Pantry': {'Animal Bundle': {'items': {'Wool': True}}}}
+    history = store.history(GUILD, 10)
+    assert [(op.seq, op.action, op.changes, op.prev, op.user_id, op.ts) for op in history] == [
+        (1, 'check', [('Pantry', 'Spring Crops Bundle', 'Parsnip', True)], [('Pantry', 'Spring Crops Bundle', 'Parsnip', False)], 7, 1001.0),
+        (2, 'check', [('Pantry', 'Animal Bundle', 'Wool', True)], [('Pantry', 'Animal Bundle', 'Wool', False)], 7, 1002.0),
+        (3, 'check', [('Pantry', 'Spring Crops Bundle', 'Kale', True)], [('Pantry', 'Spring Crops Bundle', 'Kale', False)], 7, 1003.0),
+    ]
+    assert [op.seq for op in store.history(GUILD, 2)] == [2, 3]
+    assert store.export_state() == {GUILD: store.load_guild(GUILD), OTHER: store.load_guild(OTHER)}
+    store.close()
+
+
+def test_ops_are_pruned_to_ops_retain(tmp_path):
+    store = SqliteStateStore(str(tmp_path / 'state.sqlite3'), ops_retain=3)
+    items = [('Pantry', 'Spring Crops Bundle', name, True) for name in ('Parsnip', 'Potato', 'Kale', 'Cauliflower')]
+    store.write_batch({GUILD: _changes(GUILD, items), OTHER: _changes(OTHER, items[:2])})
+    store.write_batch({GUILD: _changes(GUILD, [('Pantry', 'Animal Bundle', 'Wool', True)], seq=4)})
+    assert [op.seq for op in store.history(GUILD, 50)] == [3, 4, 5]
+    assert [op.seq for op in store.history(OTHER, 50)] == [1, 2]
+    # Pruning only trims the log; every checkmark is still there.
+    assert len(store.load_guild(GUILD)['Pantry']['Spring Crops Bundle']['items']) == 4
+    store.close()
+
+
+def test_legacy_json_is_imported_only_once(tmp_path):
+    legacy = tmp_path / 'bundles_state.json'
+    legacy.write_text(json.dumps({GUILD: {'Pantry': {'Animal Bundle': {'items': {'Wool': True, 'Large Egg': False}}}}}))
+    path = str(tmp_path / 'state.sqlite3')
+    store = SqliteStateStore(path)
+    assert store.import_legacy_json(str(legacy)) == 2
+    store.write_batch({GUILD: _changes(GUILD, [('Pantry', 'Animal Bundle', 'Wool', False)])})
+    assert store.import_legacy_json(str(legacy)) == 0
+    store.close()
+    # The flag is kept in the database, so a restart doesn't bring the old checkmark back either.
+    store = SqliteStateStore(path)
+    assert store.import_legacy_json(str(legacy)) == 0
+    assert store.load_guild(GUILD) == {'Pantry': {'Animal Bundle': {'items': {'Wool': False, 'Large Egg': False}}}}
+    store.close()
+
+
+def test_calendars_are_saved_replaced_and_deleted(tmp_path):
+    path = str(tmp_path / 'state.sqlite3')
+    store = SqliteStateStore(path)
+    store.save_calendar(GUILD, {'day': 3, 'set_at': 1000.0})
+    store.save_calendar(OTHER, {'day': 40, 'set_at': 2000.0, 'channel_id': 5})
+    store.save_calendar(GUILD, {'day': 4, 'set_at': 1500.0})
+    store.save_calendar(OTHER, None)
+    store.save_calendar('333', None)
+    store.close()
+    store = SqliteStateStore(path)
+    assert store.load_calendars() == {GUILD: {'day': 4, 'set_at': 1500.0}}
+    store.close()
+
+
+class _FlakyStore(SqliteStateStore):
+    """Fails the next `failures` writes; with `gate` set, each failing write waits for it before raising."""
+
+    def __init__(self, path: str):
+        super().__init__(path)
+        self.failures = 0
+        self.entered = threading.Event()
+        self.gate: threading.Event | None = None
+
+    def write_batch(self, changes):
+        if self.failures:
+            self.failures -= 1
+            self.entered.set()
+            if self.gate is not None:
+                self.gate.wait(5)
+            raise sqlite3.OperationalError('disk I/O error')
+        return super().write_batch(changes)
+
+
+def _cache(tmp_path) -> tuple[_FlakyStore, BundleStateCache]:
+    store = _FlakyStore(str(tmp_path / 'state.sqlite3'))
+    return store, BundleStateCache(store, LAYOUT, flush_delay=60)
+
+
+def _stored(store: StateStore, gid: str = GUILD) -> list[tuple[str, str, str]]:
+    return LAYOUT.checked_items(LAYOUT.from_stored(store.load_guild(gid)))
+
+
+def _ops(store: StateStore, gid: str = GUILD) -> list[tuple[int, str]]:
+    return [(op.seq, op.action) for op in store.history(gid, 50)]
+
+
+async def _fail_flush_while(store: _FlakyStore, cache: BundleStateCache, mutate) -> None:
+    """Flush once with the write failing, calling mutate() while the write is in flight."""
+    store.failures, store.gate = 1, threading.Event()
+    store.entered.clear()
+    flushing = asyncio.create_task(cache.flush())
+    await asyncio.to_thread(store.entered.wait, 5)
+    mutate()
+    store.gate.set()
+    with pytest.raises(sqlite3.OperationalError):
+        await flushing
+
+
+def test_newer_pending_items_win_over_a_failed_batch(tmp_path):
+    async def go():
+        store, cache = _cache(tmp_path)
+        cache.start()
+        await cache.get(GUILD)
+        cache.set_item(GUILD, 'Pantry', 'Spring Crops Bundle', 'Parsnip', True)
+        cache.set_item(GUILD, 'Pantry', 'Spring Crops Bundle', 'Kale', True)
+        await _fail_flush_while(store, cache, lambda: cache.set_item(GUILD, 'Pantry', 'Spring Crops Bundle', 'Parsnip', False))
+        assert (store.load_guild(GUILD), cache.flush_errors) == ({}, 1)
+        await cache.flush()
+        return store
+
+    store = asyncio.run(go())
+    assert _stored(store) == [('Pantry', 'Spring Crops Bundle', 'Kale')]
+    assert _ops(store) == [(1, 'check'), (2, 'check'), (3, 'uncheck')]
+
+
+def test_newer_reset_drops_the_failed_items_but_keeps_their_ops(tmp_path):
+    def reset_then_check():
+        cache.reset_guild(GUILD)
+        cache.set_item(GUILD, 'Pantry', 'Spring Crops Bundle', 'Kale', True)
+
+    async def go():
+        cache.start()
+        await cache.get(GUILD)
+        cache.set_item(GUILD, 'Pantry', 'Spring Crops Bundle', 'Parsnip', True)
+        await cache.flush()
+        cache.set_item(GUILD, 'Pantry', 'Animal Bundle', 'Wool', True)
+        await _fail_flush_while(store, cache, reset_then_check)
+        await cache.flush()
+
+    store, cache = _cache(tmp_path)
+    asyncio.run(go())
+    assert _stored(store) == [('Pantry', 'Spring Crops Bundle', 'Kale')]
+    assert _ops(store) == [(1, 'check'), (2, 'check'), (3, 'reset'), (4, 'check')]
+
+
+def test_a_failed_batch_keeps_the_oldest_dirty_time(tmp_path):
+    async def go():
+        store, cache = _cache(tmp_path)
+        cache.start()
+        await cache.get(GUILD)
+        cache.set_item(GUILD, 'Pantry', 'Spring Crops Bundle', 'Parsnip', True)
+        first_dirty = cache._dirty_since
+        newer_dirty = []
+
+        def check_wool():
+            # A change made while the write is in flight starts a newer dirty period...
+            cache.set_item(GUILD, 'Pantry', 'Animal Bundle', 'Wool', True)
+            newer_dirty.append(cache._dirty_since)
+
+        await _fail_flush_while(store, cache, check_wool)
+        assert newer_dirty[0] > first_dirty
+        # ...but the failed batch's changes are older, so the lag counts from them.
+        assert cache._dirty_since == first_dirty
+        assert cache.stats()['pending_ops'] == 2
+        await cache.stop()
+        return store, cache
+
+    store, cache = asyncio.run(go())
+    assert _stored(store) == [('Pantry', 'Spring Crops Bundle', 'Parsnip'), ('Pantry', 'Animal Bundle', 'Wool')]
+    assert _ops(store) == [(1, 'check'), (2, 'check')]
+    assert cache.stats()['pending_dirty_guilds'] == 0
+
+
+def test_stop_flushes_whatever_is_pending(tmp_path):
+    async def go():
+        store, cache = _cache(tmp_path)
+        cache.start()
+        await cache.get(GUILD)
+        await cache.get(OTHER)
+        cache.set_item(GUILD, 'Pantry', 'Animal Bundle', 'Wool', True)
+        cache.set_item(OTHER, 'Pantry', 'Animal Bundle', 'Large Egg', True)
+        assert store.load_guild(GUILD) == {}
+        await cache.stop()
+        return store
+
+    store = asyncio.run(go())
+    assert _stored(store) == [('Pantry', 'Animal Bundle', 'Wool')]
+    assert _stored(store, OTHER) == [('Pantry', 'Animal Bundle', 'Large Egg')]
+
+
+class _Both(StateStore):
+    """Writes every batch to two stores and reads from the first."""
+
+    def __init__(self, first: StateStore, second: StateStore):
+        self.first, self.second = first, second
+
+    def load_guild(self, guild_id):
+        return self.first.load_guild(guild_id)
+
+    def history(self, guild_id, limit):
+        return self.first.history(guild_id, limit)
+
+    def write_batch(self, changes):
+        self.second.write_batch(changes)
+        return self.first.write_batch(changes)
+
+
+def _op_tuples(store: StateStore) -> list[tuple]:
+    return [(op.seq, op.action, op.changes, op.prev, op.user_id, op.ts, op.target) for op in store.history(GUILD, 50)]
+
+
+def test_journal_line_encoding_round_trips():
+    op = BundleOp(GUILD, 12, 'import', [('Boiler Room', "Blacksmith's Bundle", 'Gold Bar', True), ('Pantry', 'Crème Bundle', 'Café', False)],
+                  [], user_id=None, ts=1700000000.123456, target=None)
+    line = JournalStateStore._encode_op(op)
+    assert '\n' not in line and line.count('\t') == 7
+    back = JournalStateStore._decode_op(line)
+    assert (back.guild_id, back.seq, back.action, back.changes, back.prev, back.user_id, back.ts, back.target) == (
+        op.guild_id, op.seq, op.action, op.changes, op.prev, op.user_id, op.ts, op.target)
+    undo = JournalStateStore._decode_op(JournalStateStore._encode_op(BundleOp(GUILD, 13, 'undo', [], [], 42, 5.0, target=12)))
+    assert (undo.changes, undo.prev, undo.user_id, undo.target) == ([], [], 42, 12)
+
+
+def test_undo_walk_across_a_reset_matches_sqlite_after_compaction_and_reopen(tmp_path):
+    journal_path = str(tmp_path / 'state.journal')
+    sqlite = SqliteStateStore(str(tmp_path / 'state.sqlite3'))
+    journal = JournalStateStore(journal_path)
+
+    async def go():
+        cache = BundleStateCache(_Both(sqlite, journal), LAYOUT)
+        await cache.get(GUILD)
+        cache.set_item(GUILD, 'Pantry', 'Spring Crops Bundle', 'Parsnip', True, user_id=7)     # 1
+        cache.set_item(GUILD, 'Pantry', 'Animal Bundle', 'Wool', True, user_id=7)              # 2
+        cache.set_item(GUILD, 'Pantry', 'Spring Crops Bundle', 'Parsnip', False, user_id=8)    # 3
+        await cache.flush()
+        cache.reset_guild(GUILD, user_id=8)                                                   # 4
+        cache.set_item(GUILD, 'Pantry', 'Spring Crops Bundle', 'Kale', True, user_id=7)        # 5
+        await cache.flush()
+        # Newest first: the check after the reset, the reset itself, then the uncheck before it.
+        assert [cache.undo(GUILD, user_id=9)[1].seq for _ in range(3)] == [5, 4, 3]             # 6, 7, 8
+        await cache.flush()
+        assert LAYOUT.checked_items(await cache.get(GUILD)) == [('Pantry', 'Spring Crops Bundle', 'Parsnip'), ('Pantry', 'Animal Bundle', 'Wool')]
+
+    asyncio.run(go())
+    journal.compact()
+    journal.save_calendar(GUILD, {'day': 3, 'set_at': 1000.0})
+    journal.save_calendar(OTHER, {'day': 9, 'set_at': 1000.0})
+    journal.compact()
+    journal.save_calendar(OTHER, None)
+    journal.write_batch({GUILD: _changes(GUILD, [('Pantry', 'Animal Bundle', 'Large Egg', True)], seq=8)})
+    sqlite.write_batch({GUILD: _changes(GUILD, [('Pantry', 'Animal Bundle', 'Large Egg', True)], seq=8)})
+    journal.close()
+
+    # The snapshot plus the ops logged after it rebuild the same state SQLite holds.
+    journal = JournalStateStore(journal_path)
+    assert _stored(journal) == _stored(sqlite) == [
+        ('Pantry', 'Spring Crops Bundle', 'Parsnip'), ('Pantry', 'Animal Bundle', 'Large Egg'), ('Pantry', 'Animal Bundle', 'Wool')]
+    assert _op_tuples(journal) == _op_tuples(sqlite)
+    assert [(op.seq, op.action, op.target) for op in journal.history(GUILD, 50)] == [
+        (1, 'check', None), (2, 'check', None), (3, 'uncheck', None), (4, 'reset', None), (5, 'check', None),
+        (6, 'undo', 5), (7, 'undo', 4), (8, 'undo', 3), (9, 'check', None)]
+    assert journal.load_calendars() == {GUILD: {'day': 3, 'set_at': 1000.0}}
+
+    async def keep_undoing():
+        # A fresh cache reads the undo chain back from the store and carries on where it left off.
+        cache = BundleStateCache(_Both(journal, sqlite), LAYOUT)
+        await cache.get(GUILD)
+        reverted = []
+        while (undone := cache.undo(GUILD)) is not None:
+            reverted.append(undone[1].seq)
+        await cache.flush()
+        return reverted
+
+    assert asyncio.run(keep_undoing()) == [9, 2, 1]
+    assert _stored(journal) == _stored(sqlite) == []
+    assert _op_tuples(journal) == _op_tuples(sqlite)
+    journal.close()
+    sqlite.close()
+
+
+def test_journal_replay_skips_ops_already_in_the_snapshot_and_a_torn_line(tmp_path):
+    path = str(tmp_path / 'state.journal')
+    journal = JournalStateStore(path)
+    journal.write_batch({GUILD: _changes(GUILD, [('Pantry', 'Animal Bundle', 'Wool', True), ('Pantry', 'Animal Bundle', 'Wool', False)])})
+    with open(path, encoding='utf-8') as f:
+        logged = f.read()
+    journal.compact()
+    journal.close()
+    # A crash between writing the snapshot and truncating the log, mid-way through the next append.
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(logged + logged.splitlines()[0][:9])
+    journal = JournalStateStore(path)
+    assert _stored(journal) == []
+    assert [op.seq for op in journal.history(GUILD, 50)] == [1, 2]
+    journal.write_batch({GUILD: _changes(GUILD, [('Pantry', 'Animal Bundle', 'Large Egg', True)], seq=2)})
+    journal.close()
+    assert _stored(JournalStateStore(path)) == [('Pantry', 'Animal Bundle', 'Large Egg')]